@@ -151,6 +151,16 @@ def check() -> None:
     test_cov()
 
 
+@command
+def hex_metadata() -> None:
+    """Generate the metadata files of the bundled hex files."""
+    code = (
+        "from micropython_microbit_fs.hexes import write_bundled_metadata\n"
+        "for path in write_bundled_metadata(): print(f'Written: {path}')"
+    )
+    run([sys.executable, "-c", code])
+
+
 @command
 def build() -> None:
     """Build the package."""
@@ -7,16 +7,48 @@ embedded in Intel Hex files for the BBC micro:bit.
 
 Main functions:
     - add_files: Add files to a MicroPython hex file
+    - add_files_bytes: Add files to a MicroPython hex file, returning bytes
+    - update_files: Replace the files in a MicroPython hex file, rewriting
+      only the changed files
+    - get_page_delta: Get the flash pages that differ after updating the files
+    - get_fs_image, set_fs_image: Get and replace the filesystem region of a
+      MicroPython hex file as raw bytes
+    - add_files_batch: Add many sets of files to the same hex file in parallel
+    - add_files_universal: Add files to every board of a Universal Hex file
+    - split_universal_hex, create_universal_hex: Split and combine the
+      per-board hex files of a Universal Hex file
     - get_files: Read files from a MicroPython hex file
     - get_device_info: Get device memory information from a hex file
+    - plan_layout: Check if files fit in the filesystem without a hex file
+    - add_files_from_path, get_files_from_path, get_device_info_from_path:
+      Same as above, memory-mapping a hex file from disk
+    - add_files_async, get_files_async, get_device_info_async: asyncio
+      variants running the work in an executor
+    - FirmwareCache: Cache of parsed firmware for repeated calls
+    - FirmwareTemplate: Prepared firmware to render hex files with new files
+    - MicroPythonFilesystem: Editable in-memory filesystem of a hex file
     - get_bundled_hex: Get a bundled MicroPython hex file
     - list_bundled_versions: List available bundled hex versions
 """
 
 from micropython_microbit_fs.api import (
     add_files,
+    add_files_async,
+    add_files_batch,
+    add_files_bytes,
+    add_files_from_path,
+    add_files_universal,
     get_device_info,
+    get_device_info_async,
+    get_device_info_from_path,
     get_files,
+    get_files_async,
+    get_files_from_path,
+    get_fs_image,
+    get_page_delta,
+    plan_layout,
+    set_fs_image,
+    update_files,
 )
 from micropython_microbit_fs.device_info import DeviceInfo, DeviceVersion
 from micropython_microbit_fs.exceptions import (
@@ -28,19 +60,48 @@ from micropython_microbit_fs.exceptions import (
     StorageFullError,
 )
 from micropython_microbit_fs.file import File
+from micropython_microbit_fs.filesystem import LayoutPlan
+from micropython_microbit_fs.firmware import FirmwareCache, FirmwareTemplate
 from micropython_microbit_fs.hexes import (
     MicroPythonHex,
     get_bundled_hex,
     list_bundled_versions,
 )
+from micropython_microbit_fs.micropython_filesystem import MicroPythonFilesystem
+from micropython_microbit_fs.universal_hex import (
+    create_universal_hex,
+    is_universal_hex,
+    split_universal_hex,
+)
 
 __version__ = "0.1.2"
 
 __all__ = [
     # Main API functions
     "add_files",
+    "add_files_bytes",
+    "add_files_batch",
+    "update_files",
+    "get_page_delta",
+    "get_fs_image",
+    "set_fs_image",
     "get_files",
     "get_device_info",
+    "plan_layout",
+    "add_files_from_path",
+    "get_files_from_path",
+    "get_device_info_from_path",
+    "add_files_async",
+    "get_files_async",
+    "get_device_info_async",
+    "FirmwareCache",
+    "FirmwareTemplate",
+    "MicroPythonFilesystem",
+    # Universal Hex functions
+    "add_files_universal",
+    "is_universal_hex",
+    "split_universal_hex",
+    "create_universal_hex",
     # Bundled hex functions
     "MicroPythonHex",
     "get_bundled_hex",
@@ -49,6 +110,7 @@ __all__ = [
     "File",
     "DeviceInfo",
     "DeviceVersion",
+    "LayoutPlan",
     # Exceptions
     "FilesystemError",
     "InvalidHexError",
@@ -6,19 +6,59 @@ This module provides the main functions for working with micro:bit MicroPython
 filesystems in Intel Hex files.
 """
 
+import asyncio
+import functools
+import os
+from collections.abc import AsyncIterable
+from concurrent.futures import Executor
+from typing import Any, Callable, Optional, TypeVar, Union
+
 from micropython_microbit_fs.device_info import DeviceInfo, get_device_info_ih
-from micropython_microbit_fs.exceptions import InvalidFileError, InvalidHexError
-from micropython_microbit_fs.file import File
+from micropython_microbit_fs.exceptions import FilesystemError, InvalidHexError
+from micropython_microbit_fs.file import File, files_to_dict
 from micropython_microbit_fs.filesystem import (
+    CHUNK_SIZE,
+    LayoutPlan,
     add_files_to_hex,
+    get_fs_end_address,
+    get_fs_start_address,
+    plan_file_chunks,
     read_files_from_hex,
 )
-from micropython_microbit_fs.hex_utils import hex_to_string, load_hex
+from micropython_microbit_fs.firmware import (
+    FirmwareCache,
+    FirmwareTemplate,
+    load_firmware,
+)
+from micropython_microbit_fs.hex_image import HexData, HexImage
+from micropython_microbit_fs.hex_index import HexIndex
+from micropython_microbit_fs.hex_utils import hex_to_string, map_hex_file
+from micropython_microbit_fs.hexes import MicroPythonHex
+from micropython_microbit_fs.micropython_filesystem import MicroPythonFilesystem
+from micropython_microbit_fs.universal_hex import (
+    create_universal_hex,
+    split_universal_hex,
+)
+
+_T = TypeVar("_T")
+
+
+def _load(
+    hex_data: Union[HexData, MicroPythonHex], cache: Optional[FirmwareCache]
+) -> tuple[HexImage, DeviceInfo]:
+    """Parse the hex data, or get it from the cache if one is provided."""
+    if isinstance(hex_data, MicroPythonHex):
+        # Bundled firmware is loaded from its binary image instead
+        return hex_data.load_firmware()
+    if cache is not None:
+        return cache.get(hex_data)
+    return load_firmware(hex_data)
 
 
 def add_files(
-    hex_data: str,
+    hex_data: Union[HexData, MicroPythonHex],
     files: list[File],
+    cache: Optional[FirmwareCache] = None,
 ) -> str:
     """
     Add files to a micro:bit MicroPython Intel Hex file.
@@ -26,8 +66,10 @@ def add_files(
     Takes a micro:bit MicroPython hex file and a list of files to add,
     returning a new hex file with the files encoded in the filesystem region.
 
-    :param hex_data: Intel Hex file content as a string.
+    :param hex_data: Intel Hex file content as a string or ASCII bytes, or
+        a bundled MicroPythonHex loaded with its load_firmware() method.
     :param files: List of File objects to inject into the filesystem.
+    :param cache: Optional FirmwareCache to reuse previously parsed firmware.
     :returns: New Intel Hex file content with the files injected.
 
     :raises InvalidHexError: If the hex data is invalid.
@@ -41,30 +83,282 @@ def add_files(
         >>> files = [micropython.File.from_text("main.py", "print('Hello!')")]
         >>> new_hex = micropython.add_files(micropython_hex, files)
     """
-    try:
-        ih = load_hex(hex_data)
-    except Exception as e:
-        raise InvalidHexError(f"Failed to parse Intel Hex data: {e}") from e
-    device_info = get_device_info_ih(ih)
-
-    files_dict = {}
-    for file in files:
-        if file.name in files_dict:
-            raise InvalidFileError(f"Duplicate file name: {file.name}")
-        files_dict[file.name] = file.content
-    add_files_to_hex(ih, device_info, files_dict)
+    ih, device_info = _load(hex_data, cache)
+    add_files_to_hex(ih, device_info, files_to_dict(files))
 
     return hex_to_string(ih)
 
 
-def get_files(hex_data: str) -> list[File]:
+def add_files_bytes(
+    hex_data: Union[HexData, MicroPythonHex],
+    files: list[File],
+    cache: Optional[FirmwareCache] = None,
+) -> bytes:
+    """
+    Add files to a micro:bit MicroPython Intel Hex file, returning bytes.
+
+    Same as add_files(), but the new hex file is returned as ASCII encoded
+    bytes, ready to be written to a binary file or socket. The records are
+    encoded into the output without creating the hex file as a string
+    first. The input can be bytes, a memoryview, or an mmap of a hex file.
+
+    :param hex_data: Intel Hex file content as ASCII bytes or a string, or
+        a bundled MicroPythonHex loaded with its load_firmware() method.
+    :param files: List of File objects to inject into the filesystem.
+    :param cache: Optional FirmwareCache to reuse previously parsed firmware.
+    :returns: New Intel Hex file content with the files injected, as bytes.
+
+    :raises InvalidHexError: If the hex data is invalid.
+    :raises NotMicroPythonError: If the hex does not contain MicroPython.
+    :raises InvalidFileError: If a file has invalid name or content.
+    :raises StorageFullError: If the files don't fit in the filesystem.
+
+    Example::
+
+        >>> import micropython_microbit_fs as micropython
+        >>> with open("micropython.hex", "rb") as f:
+        ...     hex_bytes = f.read()
+        >>> files = [micropython.File.from_text("main.py", "print('Hello!')")]
+        >>> new_hex = micropython.add_files_bytes(hex_bytes, files)
+    """
+    ih, device_info = _load(hex_data, cache)
+    add_files_to_hex(ih, device_info, files_to_dict(files))
+    return ih.to_bytes()
+
+
+def add_files_batch(
+    hex_data: HexData,
+    file_lists: list[list[File]],
+    workers: Optional[int] = None,
+) -> list[str]:
+    """
+    Add different sets of files to the same MicroPython Intel Hex file.
+
+    The firmware is parsed once, and the hex files are generated by a pool
+    of worker processes that only encode the filesystem region records.
+
+    :param hex_data: Intel Hex file content as a string or ASCII bytes.
+    :param file_lists: Lists of File objects, one per new hex file.
+    :param workers: Number of worker processes, defaults to the number of
+        CPUs. With one worker the hex files are generated in this process.
+    :returns: New Intel Hex file contents, in the same order as file_lists.
+
+    :raises InvalidHexError: If the hex data is invalid.
+    :raises NotMicroPythonError: If the hex does not contain MicroPython.
+    :raises InvalidFileError: If a file has invalid name or content.
+    :raises StorageFullError: If the files don't fit in the filesystem.
+
+    Example::
+
+        >>> import micropython_microbit_fs as micropython
+        >>> file_lists = [
+        ...     [micropython.File.from_text("main.py", f"print('Student {i}')")]
+        ...     for i in range(30)
+        ... ]
+        >>> new_hexes = micropython.add_files_batch(micropython_hex, file_lists)
+    """
+    return FirmwareTemplate(hex_data).render_batch(file_lists, workers)
+
+
+def add_files_universal(
+    hex_data: HexData,
+    files: list[File],
+    cache: Optional[FirmwareCache] = None,
+) -> str:
+    """
+    Add files to each board section of a micro:bit Universal Hex file.
+
+    The Universal Hex is split into the MicroPython hex file of each board,
+    the files are added to every one of them, and the sections are combined
+    into a new Universal Hex.
+
+    :param hex_data: Universal Hex file content as a string or ASCII bytes.
+    :param files: List of File objects to inject into the filesystems.
+    :param cache: Optional FirmwareCache to reuse previously parsed firmware.
+    :returns: New Universal Hex file content with the files injected.
+
+    :raises InvalidHexError: If the hex data is not a valid Universal Hex.
+    :raises NotMicroPythonError: If a section does not contain MicroPython.
+    :raises InvalidFileError: If a file has invalid name or content.
+    :raises StorageFullError: If the files don't fit in a filesystem.
+
+    Example::
+
+        >>> import micropython_microbit_fs as micropython
+        >>> files = [micropython.File.from_text("main.py", "print('Hello!')")]
+        >>> new_hex = micropython.add_files_universal(universal_hex, files)
+    """
+    sections = split_universal_hex(hex_data)
+    return create_universal_hex(
+        [
+            (board_id, add_files(board_hex, files, cache))
+            for board_id, board_hex in sections.items()
+        ]
+    )
+
+
+def update_files(
+    hex_data: HexData,
+    files: list[File],
+    cache: Optional[FirmwareCache] = None,
+) -> str:
+    """
+    Replace the files in a micro:bit MicroPython Intel Hex file.
+
+    Unlike add_files(), the hex file can already contain files. The new
+    files are compared with the files in the hex, and only the filesystem
+    chunks of the files that have been added, changed or removed are
+    rewritten, so unchanged files stay in the same flash pages.
+
+    :param hex_data: Intel Hex file content as a string or ASCII bytes.
+    :param files: List of File objects the filesystem should contain.
+    :param cache: Optional FirmwareCache to reuse previously parsed firmware.
+    :returns: New Intel Hex file content with the files updated.
+
+    :raises InvalidHexError: If the hex data is invalid.
+    :raises NotMicroPythonError: If the hex does not contain MicroPython.
+    :raises FilesystemError: If the filesystem structure is corrupted.
+    :raises InvalidFileError: If a file has invalid name or content.
+    :raises StorageFullError: If the files don't fit in the filesystem.
+
+    Example::
+
+        >>> import micropython_microbit_fs as micropython
+        >>> files = micropython.get_files(hex_with_files)
+        >>> files[0] = micropython.File.from_text("main.py", "print('Bye!')")
+        >>> new_hex = micropython.update_files(hex_with_files, files)
+    """
+    fs = MicroPythonFilesystem(hex_data, cache)
+    fs.sync(files)
+    return fs.to_hex()
+
+
+def get_page_delta(
+    hex_data: HexData,
+    files: list[File],
+    cache: Optional[FirmwareCache] = None,
+) -> list[tuple[int, bytes]]:
+    """
+    Get the flash pages to write to update the files of a flashed board.
+
+    The files are updated in the hex like update_files(), and the flash
+    pages of the filesystem region that differ from the original hex file
+    are returned, so only those pages need to be flashed to a board that
+    already contains the original hex file.
+
+    :param hex_data: Intel Hex file content flashed on the board.
+    :param files: List of File objects the filesystem should contain.
+    :param cache: Optional FirmwareCache to reuse previously parsed firmware.
+    :returns: List of (page_address, page_bytes) tuples, sorted by address,
+        with the full content of each flash page that differs.
+
+    :raises InvalidHexError: If the hex data is invalid.
+    :raises NotMicroPythonError: If the hex does not contain MicroPython.
+    :raises FilesystemError: If the filesystem structure is corrupted.
+    :raises InvalidFileError: If a file has invalid name or content.
+    :raises StorageFullError: If the files don't fit in the filesystem.
+
+    Example::
+
+        >>> import micropython_microbit_fs as micropython
+        >>> files = [micropython.File.from_text("main.py", "print('Hello!')")]
+        >>> for address, page in micropython.get_page_delta(board_hex, files):
+        ...     print(f"Page 0x{address:08X}: {len(page)} bytes")
+    """
+    fs = MicroPythonFilesystem(hex_data, cache)
+    fs.sync(files)
+    return fs.page_delta()
+
+
+def get_fs_image(
+    hex_data: Union[HexData, MicroPythonHex], cache: Optional[FirmwareCache] = None
+) -> bytes:
+    """
+    Get the filesystem region of a micro:bit MicroPython Intel Hex file.
+
+    The region goes from the filesystem start address to the end address,
+    including the persistent data page, and addresses without data in the
+    hex file are filled with 0xFF, like erased flash.
+
+    :param hex_data: Intel Hex file content as a string or ASCII bytes, or
+        a bundled MicroPythonHex loaded with its load_firmware() method.
+    :param cache: Optional FirmwareCache to reuse previously parsed firmware.
+    :returns: The raw filesystem region bytes.
+
+    :raises InvalidHexError: If the hex data is invalid.
+    :raises NotMicroPythonError: If the hex does not contain MicroPython.
+
+    Example::
+
+        >>> import micropython_microbit_fs as micropython
+        >>> fs_image = micropython.get_fs_image(hex_with_files)
+        >>> new_hex = micropython.set_fs_image(other_micropython_hex, fs_image)
+    """
+    ih, device_info = _load(hex_data, cache)
+    fs_start = get_fs_start_address(device_info)
+    return ih.gets(fs_start, get_fs_end_address(device_info) - fs_start)
+
+
+def set_fs_image(
+    hex_data: Union[HexData, MicroPythonHex],
+    image: Union[bytes, bytearray, memoryview],
+    cache: Optional[FirmwareCache] = None,
+) -> str:
+    """
+    Replace the filesystem region of a micro:bit MicroPython Intel Hex file.
+
+    The image, usually from get_fs_image(), replaces all the filesystem
+    region data of the hex file. Only the chunks that are not erased (all
+    0xFF bytes) are written as records.
+
+    :param hex_data: Intel Hex file content as a string or ASCII bytes, or
+        a bundled MicroPythonHex loaded with its load_firmware() method.
+    :param image: Raw filesystem region bytes, with the same size as the
+        filesystem region of the hex file.
+    :param cache: Optional FirmwareCache to reuse previously parsed firmware.
+    :returns: New Intel Hex file content with the filesystem image.
+
+    :raises InvalidHexError: If the hex data is invalid.
+    :raises NotMicroPythonError: If the hex does not contain MicroPython.
+    :raises FilesystemError: If the image size doesn't match the filesystem
+        region of the hex file.
+
+    Example::
+
+        >>> import micropython_microbit_fs as micropython
+        >>> fs_image = micropython.get_fs_image(hex_with_files)
+        >>> new_hex = micropython.set_fs_image(other_micropython_hex, fs_image)
+    """
+    ih, device_info = _load(hex_data, cache)
+    fs_start = get_fs_start_address(device_info)
+    fs_end = get_fs_end_address(device_info)
+    if len(image) != fs_end - fs_start:
+        raise FilesystemError(
+            f"Filesystem image size ({len(image)} bytes) doesn't match the "
+            f"filesystem region of the hex file ({fs_end - fs_start} bytes)"
+        )
+
+    fs = HexImage()
+    data = memoryview(image)
+    for offset in range(0, len(data), CHUNK_SIZE):
+        chunk = data[offset : offset + CHUNK_SIZE]
+        if chunk != b"\xff" * len(chunk):
+            fs.puts(fs_start + offset, chunk.tobytes())
+    return ih.split_records(fs_start, fs_end).join(fs)
+
+
+def get_files(
+    hex_data: Union[HexData, MicroPythonHex], cache: Optional[FirmwareCache] = None
+) -> list[File]:
     """
     Get files from a micro:bit MicroPython Intel Hex file.
 
     Reads a micro:bit MicroPython hex file and returns all files found in the
     filesystem region.
 
-    :param hex_data: Intel Hex file content as a string.
+    :param hex_data: Intel Hex file content as a string or ASCII bytes, or
+        a bundled MicroPythonHex loaded with its load_firmware() method.
+    :param cache: Optional FirmwareCache to reuse previously parsed firmware.
     :returns: List of File objects found in the filesystem.
 
     :raises InvalidHexError: If the hex data is invalid.
@@ -78,23 +372,23 @@ def get_files(hex_data: str) -> list[File]:
         >>> for f in files:
         ...     print(f"{f.name}: {f.size} bytes")
     """
-    try:
-        ih = load_hex(hex_data)
-    except Exception as e:
-        raise InvalidHexError(f"Failed to parse Intel Hex data: {e}") from e
-    device_info = get_device_info_ih(ih)
+    ih, device_info = _load(hex_data, cache)
     files_dict = read_files_from_hex(ih, device_info)
     return [File(name=name, content=content) for name, content in files_dict.items()]
 
 
-def get_device_info(hex_data: str) -> DeviceInfo:
+def get_device_info(
+    hex_data: HexData, cache: Optional[FirmwareCache] = None
+) -> DeviceInfo:
     """
     Get device memory information from a MicroPython Intel Hex file.
 
     Extracts information about the flash memory layout, including
-    filesystem boundaries and MicroPython version.
+    filesystem boundaries and MicroPython version. Without a cache, only the
+    hex records containing the device data are decoded and validated.
 
-    :param hex_data: Intel Hex file content as a string.
+    :param hex_data: Intel Hex file content as a string or ASCII bytes.
+    :param cache: Optional FirmwareCache to reuse previously parsed firmware.
     :returns: DeviceInfo containing memory layout information.
 
     :raises InvalidHexError: If the hex data is invalid.
@@ -107,8 +401,214 @@ def get_device_info(hex_data: str) -> DeviceInfo:
         >>> print(f"FS Size: {info.fs_size} bytes")
         >>> print(f"MicroPython: {info.micropython_version}")
     """
+    if cache is not None:
+        return cache.get(hex_data)[1]
+    # Only decode the records needed to detect the device
     try:
-        ih = load_hex(hex_data)
-    except Exception as e:
+        return get_device_info_ih(HexIndex(hex_data))
+    except InvalidHexError as e:
+        # Same message as parsing the full hex with load_firmware()
         raise InvalidHexError(f"Failed to parse Intel Hex data: {e}") from e
-    return get_device_info_ih(ih)
+
+
+def plan_layout(device_info: DeviceInfo, files: list[File]) -> LayoutPlan:
+    """
+    Check if files fit in a MicroPython filesystem, without a hex file.
+
+    Only the file names and sizes are used to calculate the chunks needed,
+    so this is fast enough to be called after every edit.
+
+    :param device_info: Device information, for example from get_device_info().
+    :param files: List of File objects to check.
+    :returns: LayoutPlan with the chunks needed by each file, the total
+        chunks used, the chunks available, and if the files fit.
+
+    :raises InvalidFileError: If more than one file has the same name, or a
+        file would be rejected by add_files(), like a filename over 120 bytes
+        in UTF-8.
+
+    Example::
+
+        >>> import micropython_microbit_fs as micropython
+        >>> info = micropython.get_device_info(micropython_hex)
+        >>> plan = micropython.plan_layout(info, files)
+        >>> print(plan.fits, plan.free_bytes)
+    """
+    files_dict = files_to_dict(files)
+    return plan_file_chunks(
+        device_info, {name: len(content) for name, content in files_dict.items()}
+    )
+
+
+def add_files_from_path(
+    hex_path: Union[str, os.PathLike[str]],
+    files: list[File],
+    cache: Optional[FirmwareCache] = None,
+) -> str:
+    """
+    Add files to a micro:bit MicroPython Intel Hex file on disk.
+
+    Same as add_files(), but the hex file is memory-mapped and decoded
+    to a string once, instead of also being read into a bytes object.
+
+    :param hex_path: Path to the Intel Hex file.
+    :param files: List of File objects to inject into the filesystem.
+    :param cache: Optional FirmwareCache to reuse previously parsed firmware.
+    :returns: New Intel Hex file content with the files injected.
+
+    :raises OSError: If the hex file cannot be read.
+    :raises InvalidHexError: If the hex data is invalid.
+    :raises NotMicroPythonError: If the hex does not contain MicroPython.
+    :raises InvalidFileError: If a file has invalid name or content.
+    :raises StorageFullError: If the files don't fit in the filesystem.
+    """
+    with map_hex_file(hex_path) as hex_data:
+        return add_files(hex_data, files, cache)
+
+
+def get_files_from_path(
+    hex_path: Union[str, os.PathLike[str]], cache: Optional[FirmwareCache] = None
+) -> list[File]:
+    """
+    Get files from a micro:bit MicroPython Intel Hex file on disk.
+
+    Same as get_files(), but the hex file is memory-mapped and decoded
+    to a string once, instead of also being read into a bytes object.
+
+    :param hex_path: Path to the Intel Hex file.
+    :param cache: Optional FirmwareCache to reuse previously parsed firmware.
+    :returns: List of File objects found in the filesystem.
+
+    :raises OSError: If the hex file cannot be read.
+    :raises InvalidHexError: If the hex data is invalid.
+    :raises NotMicroPythonError: If the hex does not contain MicroPython.
+    :raises FilesystemError: If the filesystem structure is corrupted.
+
+    Example::
+
+        >>> import micropython_microbit_fs as micropython
+        >>> files = micropython.get_files_from_path("micropython.hex")
+    """
+    with map_hex_file(hex_path) as hex_data:
+        return get_files(hex_data, cache)
+
+
+def get_device_info_from_path(
+    hex_path: Union[str, os.PathLike[str]], cache: Optional[FirmwareCache] = None
+) -> DeviceInfo:
+    """
+    Get device memory information from a MicroPython Intel Hex file on disk.
+
+    Same as get_device_info(), but the hex file is memory-mapped and decoded
+    to a string once, instead of also being read into a bytes object.
+
+    :param hex_path: Path to the Intel Hex file.
+    :param cache: Optional FirmwareCache to reuse previously parsed firmware.
+    :returns: DeviceInfo containing memory layout information.
+
+    :raises OSError: If the hex file cannot be read.
+    :raises InvalidHexError: If the hex data is invalid.
+    :raises NotMicroPythonError: If the hex does not contain MicroPython.
+    """
+    with map_hex_file(hex_path) as hex_data:
+        return get_device_info(hex_data, cache)
+
+
+async def _run_in_executor(
+    executor: Optional[Executor], func: Callable[..., _T], *args: Any
+) -> _T:
+    """Run a function in an executor without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args))
+
+
+async def add_files_async(
+    hex_data: HexData,
+    files: Union[list[File], AsyncIterable[File]],
+    cache: Optional[FirmwareCache] = None,
+    executor: Optional[Executor] = None,
+) -> str:
+    """
+    Add files to a micro:bit MicroPython Intel Hex file without blocking.
+
+    Same as add_files(), but the hex parsing and encoding run in an executor
+    so the asyncio event loop is not blocked. The files can be provided by an
+    async iterable, which is consumed before the work is started.
+
+    Cancelling the task stops waiting for the result, but work already
+    running in a thread or process will finish in the background.
+
+    :param hex_data: Intel Hex file content as a string or ASCII bytes.
+    :param files: List or async iterable of File objects to inject.
+    :param cache: Optional FirmwareCache to reuse previously parsed firmware.
+        With a process executor the cache is not used, as it is sent empty
+        to the worker process.
+    :param executor: Thread or process pool executor to run the work in,
+        defaults to the event loop default executor (a thread pool).
+    :returns: New Intel Hex file content with the files injected.
+
+    :raises InvalidHexError: If the hex data is invalid.
+    :raises NotMicroPythonError: If the hex does not contain MicroPython.
+    :raises InvalidFileError: If a file has invalid name or content.
+    :raises StorageFullError: If the files don't fit in the filesystem.
+
+    Example::
+
+        >>> import micropython_microbit_fs as micropython
+        >>> files = [micropython.File.from_text("main.py", "print('Hello!')")]
+        >>> new_hex = await micropython.add_files_async(micropython_hex, files)
+    """
+    if not isinstance(files, list):
+        files = [file async for file in files]
+    return await _run_in_executor(executor, add_files, hex_data, files, cache)
+
+
+async def get_files_async(
+    hex_data: HexData,
+    cache: Optional[FirmwareCache] = None,
+    executor: Optional[Executor] = None,
+) -> list[File]:
+    """
+    Get files from a micro:bit MicroPython Intel Hex file without blocking.
+
+    Same as get_files(), but the hex is parsed in an executor so the asyncio
+    event loop is not blocked.
+
+    :param hex_data: Intel Hex file content as a string or ASCII bytes.
+    :param cache: Optional FirmwareCache to reuse previously parsed firmware.
+        With a process executor the cache is not used, as it is sent empty
+        to the worker process.
+    :param executor: Thread or process pool executor to run the work in,
+        defaults to the event loop default executor (a thread pool).
+    :returns: List of File objects found in the filesystem.
+
+    :raises InvalidHexError: If the hex data is invalid.
+    :raises NotMicroPythonError: If the hex does not contain MicroPython.
+    :raises FilesystemError: If the filesystem structure is corrupted.
+    """
+    return await _run_in_executor(executor, get_files, hex_data, cache)
+
+
+async def get_device_info_async(
+    hex_data: HexData,
+    cache: Optional[FirmwareCache] = None,
+    executor: Optional[Executor] = None,
+) -> DeviceInfo:
+    """
+    Get device memory information from a MicroPython hex without blocking.
+
+    Same as get_device_info(), but the hex is read in an executor so the
+    asyncio event loop is not blocked.
+
+    :param hex_data: Intel Hex file content as a string or ASCII bytes.
+    :param cache: Optional FirmwareCache to reuse previously parsed firmware.
+        With a process executor the cache is not used, as it is sent empty
+        to the worker process.
+    :param executor: Thread or process pool executor to run the work in,
+        defaults to the event loop default executor (a thread pool).
+    :returns: DeviceInfo containing memory layout information.
+
+    :raises InvalidHexError: If the hex data is invalid.
+    :raises NotMicroPythonError: If the hex does not contain MicroPython.
+    """
+    return await _run_in_executor(executor, get_device_info, hex_data, cache)
@@ -27,14 +27,60 @@ app = App(
 )
 
 
+def _resolve_version(version: str) -> Optional[str]:
+    """Convert a --v1/--v2 option value into a bundled hex version.
+
+    :param version: The version given on the command line, or 'latest'
+        (in any case) for the newest bundled version.
+    :returns: The version string, or None for the newest version.
+    """
+    return None if version.lower() == "latest" else version
+
+
 @app.command
-def info(hex_file: Path) -> None:
+def info(
+    hex_file: Optional[Path] = None,
+    v1: Annotated[
+        Optional[str],
+        Parameter(
+            help=(
+                "Show the bundled micro:bit V1 MicroPython hex information. "
+                "Specify a version (e.g., --v1=1.1) or 'latest' for the newest."
+            ),
+        ),
+    ] = None,
+    v2: Annotated[
+        Optional[str],
+        Parameter(
+            help=(
+                "Show the bundled micro:bit V2 MicroPython hex information. "
+                "Specify a version (e.g., --v2=1.2) or 'latest' for the newest."
+            ),
+        ),
+    ] = None,
+) -> None:
     """Display device and filesystem information from a MicroPython hex file.
 
     :param hex_file: Path to the Intel Hex file.
+    :param v1: Use bundled micro:bit V1 hex with specified version or 'latest'.
+    :param v2: Use bundled micro:bit V2 hex with specified version or 'latest'.
     """
-    hex_data = hex_file.read_text()
-    device_info = upyfs.get_device_info(hex_data)
+    if sum(arg is not None for arg in (hex_file, v1, v2)) != 1:
+        raise SystemExit("Error: Provide one of a hex file, --v1 or --v2.")
+
+    if hex_file is not None:
+        device_info = upyfs.get_device_info_from_path(hex_file)
+    else:
+        device_version, version = (1, v1) if v1 is not None else (2, v2)
+        try:
+            bundled_hex = get_bundled_hex(
+                device_version,
+                _resolve_version(version),  # type: ignore[arg-type]
+            )
+        except HexNotFoundError as e:
+            raise SystemExit(f"Error: {e}") from None
+        # The bundled hex information is precomputed, no need to parse it
+        device_info = bundled_hex.device_info
 
     print(f"Device: micro:bit {device_info.device_version.value}")
     print(f"MicroPython version: {device_info.micropython_version}")
@@ -50,8 +96,7 @@ def list_files(hex_file: Path) -> None:
 
     :param hex_file: Path to the Intel Hex file.
     """
-    hex_data = hex_file.read_text()
-    files = upyfs.get_files(hex_data)
+    files = upyfs.get_files_from_path(hex_file)
 
     if not files:
         print("No files found in filesystem.")
@@ -88,8 +133,7 @@ def get(
     :param filename: Extract only this specific file (default: extract all).
     :param force: Overwrite existing files without prompting (default: False).
     """
-    hex_data = hex_file.read_text()
-    files = upyfs.get_files(hex_data)
+    files = upyfs.get_files_from_path(hex_file)
 
     if not files:
         print("No files found in filesystem.")
@@ -182,25 +226,23 @@ def add(
             "Error: Cannot combine hex_file with --v1 or --v2, or use both --v1 and --v2."
         )
 
-    hex_content: str
+    hex_content: Optional[str] = None
     try:
-        # "latest" means use None to get the newest version
         if has_v1:
-            version = None if v1.lower() == "latest" else v1  # type: ignore
+            version = _resolve_version(v1)  # type: ignore[arg-type]
             bundled_hex = get_bundled_hex(1, version)
             hex_content = bundled_hex.content
             resolved_version = version or bundled_hex.version
             hex_path = bundled_hex.file_path
             print(f"Using bundled micro:bit V1 MicroPython v{resolved_version}")
         elif has_v2:
-            version = None if v2.lower() == "latest" else v2  # type: ignore
+            version = _resolve_version(v2)  # type: ignore[arg-type]
             bundled_hex = get_bundled_hex(2, version)
             hex_content = bundled_hex.content
             resolved_version = version or bundled_hex.version
             hex_path = bundled_hex.file_path
             print(f"Using bundled micro:bit V2 MicroPython v{resolved_version}")
         elif has_hex_file:
-            hex_content = hex_file.read_text()  # type: ignore
             hex_path = hex_file  # type: ignore
     except HexNotFoundError as e:
         raise SystemExit(f"Error: {e}") from None
@@ -211,7 +253,10 @@ def add(
         file_objects.append(upy_file)
         print(f"Adding: {file_path.name} ({upy_file.size_fs} bytes)")
 
-    new_hex = upyfs.add_files(hex_content, file_objects)
+    if hex_content is not None:
+        new_hex = upyfs.add_files(hex_content, file_objects)
+    else:
+        new_hex = upyfs.add_files_from_path(hex_path, file_objects)
 
     # Generate default output in cwd, filename: <name>_output.hex
     output_path = output if output else Path(f"{hex_path.stem}_output.hex")
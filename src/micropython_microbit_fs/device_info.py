@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """Device memory information data structures."""
 
+import dataclasses
 from dataclasses import dataclass
 from enum import Enum
 from typing import Any
@@ -91,6 +92,30 @@ class DeviceInfo:
         return self.fs_end_address - self.fs_start_address - self.flash_page_size
 
 
+def device_info_to_dict(device_info: DeviceInfo) -> dict[str, Any]:
+    """
+    Convert a DeviceInfo into a JSON serialisable dictionary.
+
+    :param device_info: The device information.
+    :returns: Dictionary with the DeviceInfo fields.
+    """
+    data = dataclasses.asdict(device_info)
+    data["device_version"] = device_info.device_version.value
+    return data
+
+
+def device_info_from_dict(data: dict[str, Any]) -> DeviceInfo:
+    """
+    Create a DeviceInfo from a dictionary created by device_info_to_dict().
+
+    :param data: Dictionary with the DeviceInfo fields.
+    :returns: The device information.
+    """
+    return DeviceInfo(
+        **{**data, "device_version": DeviceVersion(data["device_version"])}
+    )
+
+
 def get_device_info_ih(ih: Any) -> DeviceInfo:
     """
     Internal function to get device info from an already-loaded IntelHex.
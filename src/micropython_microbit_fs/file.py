@@ -60,3 +60,19 @@ class File:
     def size_fs(self) -> int:
         """Return the total size the file consumes in the filesystem storage."""
         return calculate_file_size(self.name, self.content)
+
+
+def files_to_dict(files: list[File]) -> dict[str, bytes]:
+    """
+    Convert a list of files into a dictionary of filenames to content.
+
+    :param files: List of File objects.
+    :returns: Dictionary mapping filenames to their content as bytes.
+    :raises InvalidFileError: If more than one file has the same name.
+    """
+    files_dict: dict[str, bytes] = {}
+    for file in files:
+        if file.name in files_dict:
+            raise InvalidFileError(f"Duplicate file name: {file.name}")
+        files_dict[file.name] = file.content
+    return files_dict
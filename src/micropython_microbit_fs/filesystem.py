@@ -6,7 +6,9 @@ This module provides functions to read and write files to the MicroPython
 filesystem embedded in an Intel Hex file.
 """
 
-from intelhex import IntelHex
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import NamedTuple
 
 from micropython_microbit_fs.device_info import DeviceInfo, DeviceVersion
 from micropython_microbit_fs.exceptions import (
@@ -14,6 +16,7 @@ from micropython_microbit_fs.exceptions import (
     InvalidFileError,
     StorageFullError,
 )
+from micropython_microbit_fs.hex_image import HexImage
 
 # =============================================================================
 # Chunk Constants
@@ -110,6 +113,16 @@ def get_fs_end_address(device_info: DeviceInfo) -> int:
     return end_address
 
 
+def get_chunk_count(device_info: DeviceInfo) -> int:
+    """Get the number of chunks available for files in the filesystem.
+
+    :param device_info: Device information from the hex file.
+    :returns: Number of chunks between the start and the persistent page.
+    """
+    fs_size = get_last_page_address(device_info) - get_fs_start_address(device_info)
+    return (fs_size + CHUNK_SIZE - 1) // CHUNK_SIZE
+
+
 def get_last_page_address(device_info: DeviceInfo) -> int:
     """Get the address of the last filesystem page (persistent page).
 
@@ -126,60 +139,77 @@ def get_last_page_address(device_info: DeviceInfo) -> int:
 # =============================================================================
 
 
-def read_chunk(ih: IntelHex, address: int) -> bytes:
+def read_chunk(ih: HexImage, address: int) -> bytes:
     """Read a full chunk from the Intel Hex at the given address.
 
-    :param ih: The Intel Hex object.
+    :param ih: The HexImage object.
     :param address: The start address of the chunk.
     :returns: The 128 bytes of the chunk.
     """
-    return bytes(ih[address + i] for i in range(CHUNK_SIZE))
+    return ih.gets(address, CHUNK_SIZE)
+
+
+class FileEntry(NamedTuple):
+    """A file in the filesystem and the chunks storing it."""
+
+    chunks: list[int]
+    """1-based indices of the file chunks, in chain order."""
+
+    content: bytes
+    """The file content."""
 
 
-def read_files_from_hex(ih: IntelHex, device_info: DeviceInfo) -> dict[str, bytes]:
+def read_files_from_hex(ih: HexImage, device_info: DeviceInfo) -> dict[str, bytes]:
     """Read all files from the MicroPython filesystem.
 
     This scans the filesystem area for file start markers (0xFE), then
     follows the chunk chain to extract the complete file content.
 
-    :param ih: The Intel Hex object containing MicroPython.
+    :param ih: The HexImage object containing MicroPython.
     :param device_info: Device information from the hex file.
     :returns: Dictionary mapping filenames to their content as bytes.
     :raises FilesystemError: If the filesystem structure is corrupted.
     """
-    start_address = get_fs_start_address(device_info)
-    end_address = get_last_page_address(device_info)
+    entries = read_file_entries(ih, device_info)
+    return {filename: entry.content for filename, entry in entries.items()}
 
-    # First pass: collect all used chunks and identify file starts
-    used_chunks: dict[int, bytes] = {}
-    start_chunk_indexes: list[int] = []
 
-    chunk_addr = start_address
-    chunk_index = 1
+def read_file_entries(ih: HexImage, device_info: DeviceInfo) -> dict[str, FileEntry]:
+    """Read all files from the MicroPython filesystem with their chunk chains.
+
+    :param ih: The HexImage object containing MicroPython.
+    :param device_info: Device information from the hex file.
+    :returns: Dictionary mapping filenames to their FileEntry.
+    :raises FilesystemError: If the filesystem structure is corrupted.
+    """
+    start_address = get_fs_start_address(device_info)
 
-    while chunk_addr < end_address:
-        chunk = read_chunk(ih, chunk_addr)
-        marker = chunk[0]
+    # Read the whole filesystem area at once, chunks are then memoryview slices
+    chunk_count = get_chunk_count(device_info)
+    fs_data = memoryview(ih.gets(start_address, chunk_count * CHUNK_SIZE))
+    markers = fs_data[::CHUNK_SIZE].tobytes()
 
-        # Skip unused, freed, and persistent data chunks
-        if marker not in (
-            ChunkMarker.UNUSED,
-            ChunkMarker.FREED,
-            ChunkMarker.PERSISTENT_DATA,
-        ):
-            used_chunks[chunk_index] = chunk
-            if marker == ChunkMarker.FILE_START:
-                start_chunk_indexes.append(chunk_index)
+    def get_chunk(chunk_index: int) -> memoryview:
+        offset = (chunk_index - 1) * CHUNK_SIZE
+        return fs_data[offset : offset + CHUNK_SIZE]
 
-        chunk_index += 1
-        chunk_addr += CHUNK_SIZE
+    # First pass: collect all used chunks and identify file starts
+    free_markers = (ChunkMarker.UNUSED, ChunkMarker.FREED, ChunkMarker.PERSISTENT_DATA)
+    used_chunks = {
+        i + 1 for i, marker in enumerate(markers) if marker not in free_markers
+    }
+    start_chunk_indexes: list[int] = []
+    position = markers.find(ChunkMarker.FILE_START)
+    while position >= 0:
+        start_chunk_indexes.append(position + 1)
+        position = markers.find(ChunkMarker.FILE_START, position + 1)
 
     # Second pass: follow chunk chains and extract file data
-    files: dict[str, bytes] = {}
+    files: dict[str, FileEntry] = {}
     seen_filenames: set[str] = set()
 
     for start_idx in start_chunk_indexes:
-        start_chunk = used_chunks[start_idx]
+        start_chunk = get_chunk(start_idx)
 
         # Parse file header:
         # Byte 0: FILE_START marker (0xFE)
@@ -189,7 +219,7 @@ def read_files_from_hex(ih: IntelHex, device_info: DeviceInfo) -> dict[str, byte
         end_offset = start_chunk[1]
         name_len = start_chunk[2]
         filename_bytes = start_chunk[3 : 3 + name_len]
-        filename = filename_bytes.decode("utf-8")
+        filename = str(filename_bytes, "utf-8")
 
         if filename in seen_filenames:
             raise FilesystemError(f"Found multiple files named: {filename}")
@@ -197,6 +227,7 @@ def read_files_from_hex(ih: IntelHex, device_info: DeviceInfo) -> dict[str, byte
 
         # Follow chunk chain and collect data
         data = bytearray()
+        chain = [start_idx]
         current_chunk = start_chunk
         current_index = start_idx
         # In first chunk, data starts after header
@@ -211,20 +242,18 @@ def read_files_from_hex(ih: IntelHex, device_info: DeviceInfo) -> dict[str, byte
 
             if next_index == ChunkMarker.UNUSED:
                 # This is the last chunk - extract data up to end_offset
-                data.extend(current_chunk[chunk_data_start : 1 + end_offset])
+                data += current_chunk[chunk_data_start : 1 + end_offset]
                 break
             else:
                 # Not the last chunk - extract all data bytes
-                data.extend(
-                    current_chunk[chunk_data_start : CHUNK_SIZE - 1]
-                )  # All but tail
+                data += current_chunk[chunk_data_start : CHUNK_SIZE - 1]  # All but tail
 
             # Move to next chunk
-            next_chunk = used_chunks.get(next_index)
-            if next_chunk is None:
+            if next_index not in used_chunks:
                 raise FilesystemError(
                     f"Chunk {current_index} points to unused index {next_index}"
                 )
+            next_chunk = get_chunk(next_index)
 
             # Verify the back-link
             if next_chunk[0] != current_index:
@@ -235,13 +264,14 @@ def read_files_from_hex(ih: IntelHex, device_info: DeviceInfo) -> dict[str, byte
 
             current_chunk = next_chunk
             current_index = next_index
+            chain.append(next_index)
             # After first chunk, data starts after the marker byte
             chunk_data_start = CHUNK_MARKER_SIZE
 
         if max_iterations <= 0:
             raise FilesystemError("Malformed file chunks did not link correctly")
 
-        files[filename] = bytes(data)
+        files[filename] = FileEntry(chain, bytes(data))
 
     return files
 
@@ -251,6 +281,44 @@ def read_files_from_hex(ih: IntelHex, device_info: DeviceInfo) -> dict[str, byte
 # =============================================================================
 
 
+def validate_file(filename: str, content_size: int) -> None:
+    """Check a file can be written to the filesystem.
+
+    :param filename: The name of the file.
+    :param content_size: The size of the file content in bytes.
+    :raises InvalidFileError: If the filename is empty or too long, or the
+        content is empty.
+    """
+    if not filename:
+        raise InvalidFileError("File must have a filename")
+
+    filename_size = len(filename.encode("utf-8"))
+    if filename_size > MAX_FILENAME_LENGTH:
+        raise InvalidFileError(
+            f"Filename '{filename}' is too long "
+            f"(max {MAX_FILENAME_LENGTH} bytes, got {filename_size})"
+        )
+
+    if content_size == 0:
+        raise InvalidFileError(f"File '{filename}' must have content")
+
+
+def calculate_file_chunks(filename: str, content_size: int) -> int:
+    """Calculate the number of chunks a file will occupy in the filesystem.
+
+    :param filename: The name of the file.
+    :param content_size: The size of the file content in bytes.
+    :returns: Number of chunks needed to store the file.
+    """
+    filename_bytes = filename.encode("utf-8") if isinstance(filename, str) else filename
+    header_size = 2 + len(filename_bytes)  # end_offset + name_len + name
+
+    # Total data: header + content + trailing 0xFF byte
+    total_data = header_size + content_size + 1
+
+    return (total_data + CHUNK_DATA_SIZE - 1) // CHUNK_DATA_SIZE
+
+
 def calculate_file_size(filename: str, content: bytes) -> int:
     """Calculate the size in bytes a file will occupy in the filesystem.
 
@@ -261,50 +329,197 @@ def calculate_file_size(filename: str, content: bytes) -> int:
     :param content: The file content as bytes.
     :returns: Size in bytes (always a multiple of 128).
     """
-    filename_bytes = filename.encode("utf-8") if isinstance(filename, str) else filename
-    header_size = 2 + len(filename_bytes)  # end_offset + name_len + name
+    return calculate_file_chunks(filename, len(content)) * CHUNK_SIZE
 
-    # Total data: header + content + trailing 0xFF byte
-    total_data = header_size + len(content) + 1
 
-    chunks_needed = (total_data + CHUNK_DATA_SIZE - 1) // CHUNK_DATA_SIZE
-    return chunks_needed * CHUNK_SIZE
+@dataclass(frozen=True)
+class LayoutPlan:
+    """Filesystem space needed by a set of files, see plan_file_chunks()."""
+
+    file_chunks: dict[str, int]
+    """Number of chunks needed by each file."""
+
+    used_chunks: int
+    """Total number of chunks needed by all the files."""
+
+    chunk_count: int
+    """Number of chunks available for files in the filesystem."""
+
+    @property
+    def free_chunks(self) -> int:
+        """Chunks left after adding the files, negative if they don't fit."""
+        return self.chunk_count - self.used_chunks
+
+    @property
+    def free_bytes(self) -> int:
+        """Filesystem bytes left after adding the files, comparable to size_fs."""
+        return max(self.free_chunks, 0) * CHUNK_SIZE
+
+    @property
+    def fits(self) -> bool:
+        """True if all the files fit in the filesystem."""
+        return self.used_chunks <= self.chunk_count
 
 
-def get_free_chunks(ih: IntelHex, device_info: DeviceInfo) -> list[int]:
+def plan_file_chunks(device_info: DeviceInfo, files: dict[str, int]) -> LayoutPlan:
+    """Calculate the filesystem chunks needed by files, without a hex file.
+
+    The files are validated like build_file_chunks() does when writing them.
+
+    :param device_info: Device information of the MicroPython firmware.
+    :param files: Dictionary mapping filenames to their content size in bytes.
+    :returns: LayoutPlan with the chunks needed and available.
+    :raises InvalidFileError: If a filename is empty or too long, or a file
+        has no content.
+    """
+    for filename, size in files.items():
+        validate_file(filename, size)
+    file_chunks = {
+        filename: calculate_file_chunks(filename, size)
+        for filename, size in files.items()
+    }
+    return LayoutPlan(
+        file_chunks=file_chunks,
+        used_chunks=sum(file_chunks.values()),
+        chunk_count=get_chunk_count(device_info),
+    )
+
+
+def get_free_chunks(ih: HexImage, device_info: DeviceInfo) -> list[int]:
     """Get a list of free chunk indices in the filesystem.
 
     Scans the filesystem area and returns indices of chunks that are
     either unused (0xFF) or freed (0x00).
 
-    :param ih: The Intel Hex object.
+    :param ih: The HexImage object.
     :param device_info: Device information from the hex file.
     :returns: List of 1-based chunk indices that are free.
     """
     start_address = get_fs_start_address(device_info)
-    end_address = get_last_page_address(device_info)
+    chunk_count = get_chunk_count(device_info)
 
-    free_chunks: list[int] = []
-    chunk_addr = start_address
-    chunk_index = 1
+    fs_data = ih.gets(start_address, chunk_count * CHUNK_SIZE)
+    return [
+        i + 1
+        for i, marker in enumerate(fs_data[::CHUNK_SIZE])
+        if marker == ChunkMarker.UNUSED or marker == ChunkMarker.FREED
+    ]
 
-    while chunk_addr < end_address:
-        marker = ih[chunk_addr]
-        if marker == ChunkMarker.UNUSED or marker == ChunkMarker.FREED:
-            free_chunks.append(chunk_index)
-        chunk_index += 1
-        chunk_addr += CHUNK_SIZE
 
-    return free_chunks
+class ChunkAllocator:
+    """Allocator of filesystem chunks.
 
+    Keeps a bitmap of the free chunks, so chunks can be allocated and freed
+    without rescanning the filesystem. Chunks are allocated lowest index
+    first, like MicroPython does on an empty filesystem.
+    """
 
-def set_persistent_page(ih: IntelHex, device_info: DeviceInfo) -> None:
+    def __init__(self, chunk_count: int, free_chunks: Iterable[int]) -> None:
+        """
+        :param chunk_count: Total number of chunks in the filesystem.
+        :param free_chunks: 1-based indices of the chunks currently free.
+        """
+        self.chunk_count = chunk_count
+        """Total number of chunks in the filesystem."""
+        # Byte per chunk index (index 0 unused), 1 if the chunk is free
+        self._bitmap = bytearray(chunk_count + 1)
+        for chunk_index in free_chunks:
+            self._bitmap[chunk_index] = 1
+        self._free_count = self._bitmap.count(1)
+        # No free chunks exist below this index
+        self._lowest_free = 1
+
+    @classmethod
+    def from_hex(cls, ih: HexImage, device_info: DeviceInfo) -> "ChunkAllocator":
+        """Create an allocator with the free chunks of a filesystem.
+
+        :param ih: The HexImage object.
+        :param device_info: Device information from the hex file.
+        :returns: A new ChunkAllocator.
+        """
+        return cls(get_chunk_count(device_info), get_free_chunks(ih, device_info))
+
+    def copy(self) -> "ChunkAllocator":
+        """Return an independent copy of this allocator."""
+        allocator = ChunkAllocator(self.chunk_count, ())
+        allocator._bitmap[:] = self._bitmap
+        allocator._free_count = self._free_count
+        allocator._lowest_free = self._lowest_free
+        return allocator
+
+    @property
+    def free_count(self) -> int:
+        """Number of free chunks."""
+        return self._free_count
+
+    @property
+    def used_count(self) -> int:
+        """Number of chunks in use."""
+        return self.chunk_count - self._free_count
+
+    @property
+    def largest_free_run(self) -> int:
+        """Length of the longest run of consecutive free chunks."""
+        return max(map(len, self._bitmap[1:].split(b"\x00")))
+
+    @property
+    def fragmentation(self) -> float:
+        """Fraction of free chunks outside the longest free run (0.0 to 1.0)."""
+        if not self._free_count:
+            return 0.0
+        return 1 - self.largest_free_run / self._free_count
+
+    def is_free(self, chunk_index: int) -> bool:
+        """Check if a chunk is free.
+
+        :param chunk_index: 1-based chunk index.
+        :returns: True if the chunk is free.
+        """
+        return 0 < chunk_index <= self.chunk_count and self._bitmap[chunk_index] == 1
+
+    def allocate(self, count: int) -> list[int]:
+        """Allocate the lowest free chunks.
+
+        :param count: Number of chunks to allocate.
+        :returns: The allocated 1-based chunk indices, in ascending order.
+        :raises StorageFullError: If there aren't enough free chunks.
+        """
+        if count > self._free_count:
+            raise StorageFullError(
+                f"Need {count} chunks, have {self._free_count} free."
+            )
+        chunks: list[int] = []
+        chunk_index = self._lowest_free
+        for _ in range(count):
+            chunk_index = self._bitmap.find(1, chunk_index)
+            self._bitmap[chunk_index] = 0
+            chunks.append(chunk_index)
+        self._free_count -= count
+        if chunks:
+            self._lowest_free = chunks[-1] + 1
+        return chunks
+
+    def free(self, chunks: Iterable[int]) -> None:
+        """Return chunks to the free pool.
+
+        :param chunks: 1-based indices of the chunks to free.
+        """
+        for chunk_index in chunks:
+            if not 0 < chunk_index <= self.chunk_count:
+                raise ValueError(f"Invalid chunk index: {chunk_index}")
+            if not self._bitmap[chunk_index]:
+                self._bitmap[chunk_index] = 1
+                self._free_count += 1
+                self._lowest_free = min(self._lowest_free, chunk_index)
+
+
+def set_persistent_page(ih: HexImage, device_info: DeviceInfo) -> None:
     """Set the persistent page marker in the last filesystem page.
 
     The last page of the filesystem is reserved for persistent data
     and is marked with a special marker byte.
 
-    :param ih: The Intel Hex object to modify.
+    :param ih: The HexImage object to modify.
     :param device_info: Device information from the hex file.
     """
     last_page_addr = get_last_page_address(device_info)
@@ -341,33 +556,21 @@ def generate_file_header(filename: str, content: bytes) -> bytes:
 
 
 def build_file_chunks(
-    filename: str, content: bytes, free_chunks: list[int]
-) -> tuple[list[tuple[int, bytes]], int]:
+    filename: str, content: bytes, allocator: ChunkAllocator
+) -> list[tuple[int, bytes]]:
     """Build the chunk data for a file.
 
-    Creates all the chunks needed to store the file, using the provided
-    free chunk indices.
+    Creates all the chunks needed to store the file, allocating them from
+    the provided chunk allocator.
 
     :param filename: The name of the file.
     :param content: The file content.
-    :param free_chunks: List of available chunk indices.
-    :returns: Tuple of (list of (chunk_index, chunk_bytes), chunks_used)
+    :param allocator: Allocator of the free filesystem chunks.
+    :returns: List of (chunk_index, chunk_bytes) tuples.
     :raises InvalidFileError: If the filename is too long or empty.
     :raises StorageFullError: If there aren't enough free chunks.
     """
-    # Validate file
-    if not filename:
-        raise InvalidFileError("File must have a filename")
-
-    filename_bytes = filename.encode("utf-8")
-    if len(filename_bytes) > MAX_FILENAME_LENGTH:
-        raise InvalidFileError(
-            f"Filename '{filename}' is too long "
-            f"(max {MAX_FILENAME_LENGTH} bytes, got {len(filename_bytes)})"
-        )
-
-    if len(content) == 0:
-        raise InvalidFileError(f"File '{filename}' must have content")
+    validate_file(filename, len(content))
 
     # Build the full data stream: header + content + trailing 0xFF
     # MicroPython adds a trailing 0xFF when file fills exactly to chunk boundary
@@ -380,22 +583,20 @@ def build_file_chunks(
     # Calculate how many chunks we need
     chunks_needed = (len(fs_data) + CHUNK_DATA_SIZE - 1) // CHUNK_DATA_SIZE
 
-    if chunks_needed > len(free_chunks):
+    if chunks_needed > allocator.free_count:
         raise StorageFullError(
             f"Not enough space for file '{filename}'. "
-            f"Need {chunks_needed} chunks, have {len(free_chunks)} free."
+            f"Need {chunks_needed} chunks, have {allocator.free_count} free."
         )
 
     # Build the chunks
     result: list[tuple[int, bytes]] = []
     data_index = 0
-    chunks_to_use = free_chunks[:chunks_needed]
+    chunks_to_use = allocator.allocate(chunks_needed)
 
     for i, chunk_idx in enumerate(chunks_to_use):
-        chunk = bytearray(CHUNK_SIZE)
         # Fill with 0xFF first
-        for j in range(CHUNK_SIZE):
-            chunk[j] = 0xFF
+        chunk = bytearray(b"\xff") * CHUNK_SIZE
 
         if i == 0:
             # First chunk: FILE_START marker
@@ -417,20 +618,20 @@ def build_file_chunks(
 
         result.append((chunk_idx, bytes(chunk)))
 
-    return result, chunks_needed
+    return result
 
 
 def add_files_to_hex(
-    ih: IntelHex,
+    ih: HexImage,
     device_info: DeviceInfo,
     files: dict[str, bytes],
 ) -> None:
     """Write files to the MicroPython filesystem in an Intel Hex.
 
-    Modifies the Intel Hex object in place to add the files to the
+    Modifies the HexImage object in place to add the files to the
     filesystem region.
 
-    :param ih: The Intel Hex object to modify.
+    :param ih: The HexImage object to modify.
     :param device_info: Device information from the hex file.
     :param files: Dictionary mapping filenames to their content as bytes.
     :raises InvalidFileError: If any file has invalid name or content.
@@ -441,24 +642,27 @@ def add_files_to_hex(
 
     fs_start = get_fs_start_address(device_info)
 
-    # Get all free chunks initially
-    free_chunks = get_free_chunks(ih, device_info)
-
-    if not free_chunks:
+    allocator = ChunkAllocator.from_hex(ih, device_info)
+    if not allocator.free_count:
         raise StorageFullError("No storage space available in filesystem")
 
-    # Write each file
+    # Build all the chunks first, so nothing is written if a file doesn't fit
+    written_chunks: dict[int, bytes] = {}
     for filename, content in files.items():
-        chunks, chunks_used = build_file_chunks(filename, content, free_chunks)
-
-        # Write chunks to hex
-        for chunk_idx, chunk_data in chunks:
-            chunk_addr = chunk_index_to_address(chunk_idx, fs_start)
-            for i, byte in enumerate(chunk_data):
-                ih[chunk_addr + i] = byte
-
-        # Remove used chunks from free list
-        free_chunks = free_chunks[chunks_used:]
+        written_chunks.update(build_file_chunks(filename, content, allocator))
+
+    # Write each run of consecutive chunks to the hex in a single operation
+    run_start = 0
+    run_data = bytearray()
+    for chunk_idx in sorted(written_chunks):
+        if run_data and chunk_idx != run_start + len(run_data) // CHUNK_SIZE:
+            ih.puts(chunk_index_to_address(run_start, fs_start), run_data)
+            run_data = bytearray()
+        if not run_data:
+            run_start = chunk_idx
+        run_data += written_chunks[chunk_idx]
+    if run_data:
+        ih.puts(chunk_index_to_address(run_start, fs_start), run_data)
 
     # Set persistent page marker
     set_persistent_page(ih, device_info)
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Parsed MicroPython firmware loading and caching.
+
+Parsing a MicroPython hex file and detecting its memory layout is the most
+expensive step of every operation. Applications processing the same firmware
+repeatedly (like a web service injecting user files into a bundled hex) can
+use a FirmwareCache to parse each firmware only once, or a FirmwareTemplate
+to also skip encoding the records outside the filesystem region.
+
+Parsed firmware can also be saved as a binary image file, with the segment
+data and device information, which is loaded without any parsing.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from micropython_microbit_fs.device_info import (
+    DeviceInfo,
+    device_info_from_dict,
+    device_info_to_dict,
+    get_device_info_ih,
+)
+from micropython_microbit_fs.exceptions import InvalidHexError
+from micropython_microbit_fs.file import File, files_to_dict
+from micropython_microbit_fs.filesystem import (
+    add_files_to_hex,
+    get_fs_end_address,
+    get_fs_start_address,
+)
+from micropython_microbit_fs.hex_image import HexData, HexImage, RecordSplit
+from micropython_microbit_fs.hex_utils import load_hex
+
+
+def load_firmware(hex_data: HexData) -> tuple[HexImage, DeviceInfo]:
+    """
+    Parse a MicroPython Intel Hex and detect its device information.
+
+    :param hex_data: Intel Hex file content as a string or ASCII bytes.
+    :returns: Tuple of (parsed hex image, device information).
+
+    :raises InvalidHexError: If the hex data is invalid.
+    :raises NotMicroPythonError: If the hex does not contain MicroPython.
+    """
+    try:
+        ih = load_hex(hex_data)
+    except Exception as e:
+        raise InvalidHexError(f"Failed to parse Intel Hex data: {e}") from e
+    return ih, get_device_info_ih(ih)
+
+
+_IMAGE_MAGIC = b"UPYFSIMG"
+"""First bytes of a firmware image file."""
+
+_IMAGE_FORMAT_VERSION = 2
+"""Version of the firmware image file format."""
+
+_IMAGE_HEADER = struct.Struct("<8sHI")
+"""Image header: magic, format version and metadata JSON length."""
+
+_IMAGE_SEGMENT = struct.Struct("<II")
+"""Segment table entry: start address and length."""
+
+
+def save_firmware_image(
+    path: str | os.PathLike[str],
+    ih: HexImage,
+    device_info: DeviceInfo,
+    sha256: Optional[str] = None,
+) -> None:
+    """
+    Save parsed firmware as a binary image file.
+
+    The file contains a header, the device information, start address, hex
+    digest and source record layout as JSON, a table of segment addresses and
+    lengths, and the segment data. It is written to a unique temporary file
+    first and then renamed, so concurrent readers never see a partial file.
+
+    :param path: Path of the image file to write.
+    :param ih: The parsed hex image.
+    :param device_info: Device information of the firmware.
+    :param sha256: SHA-256 hex digest of the hex file the image was parsed
+        from, checked by load_firmware_image().
+    """
+    metadata = json.dumps(
+        {
+            "device_info": device_info_to_dict(device_info),
+            "start_addr": ih.start_addr,
+            "sha256": sha256,
+            # Only usable with the hex text, to identify it by its digest
+            "source": ih._source_layout() if sha256 is not None else None,
+        }
+    ).encode()
+    segments = ih.segments()
+    parts = [
+        _IMAGE_HEADER.pack(_IMAGE_MAGIC, _IMAGE_FORMAT_VERSION, len(metadata)),
+        metadata,
+        struct.pack("<I", len(segments)),
+    ]
+    parts.extend(_IMAGE_SEGMENT.pack(start, end - start) for start, end in segments)
+    parts.extend(ih.gets(start, end - start) for start, end in segments)
+
+    directory, filename = os.path.split(os.fspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory or None, prefix=f"{filename}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.writelines(parts)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+
+def load_firmware_image(
+    path: str | os.PathLike[str],
+    sha256: Optional[str] = None,
+    source: Optional[str] = None,
+) -> tuple[HexImage, DeviceInfo]:
+    """
+    Load firmware saved by save_firmware_image() with a single file read.
+
+    Without the source hex text, the returned image has no source records,
+    so converting it to a hex file encodes all the records.
+
+    :param path: Path of the image file to read.
+    :param sha256: If given, the SHA-256 hex digest the image was saved with.
+    :param source: The hex file text with the ``sha256`` digest, so the
+        unmodified records are written back verbatim like a parsed image.
+    :returns: Tuple of (hex image, device information).
+    :raises OSError: If the file cannot be read.
+    :raises InvalidHexError: If the file is not a valid firmware image, or
+        it was saved from a different hex file.
+    """
+    with open(path, "rb") as f:
+        data = memoryview(f.read())
+    try:
+        magic, version, metadata_size = _IMAGE_HEADER.unpack_from(data)
+        if magic != _IMAGE_MAGIC or version != _IMAGE_FORMAT_VERSION:
+            raise ValueError("unsupported file format")
+        position = _IMAGE_HEADER.size
+        metadata = json.loads(bytes(data[position : position + metadata_size]))
+        position += metadata_size
+        (segment_count,) = struct.unpack_from("<I", data, position)
+        position += 4
+        segments = list(
+            _IMAGE_SEGMENT.iter_unpack(
+                data[position : position + segment_count * _IMAGE_SEGMENT.size]
+            )
+        )
+        position += segment_count * _IMAGE_SEGMENT.size
+        if position + sum(length for _, length in segments) != len(data):
+            raise ValueError("unexpected file size")
+        device_info = device_info_from_dict(metadata["device_info"])
+    except (ValueError, KeyError, TypeError, struct.error) as e:
+        raise InvalidHexError(f"Invalid firmware image file: {e}") from e
+    if sha256 is not None and metadata.get("sha256") != sha256:
+        raise InvalidHexError("Firmware image file is from a different hex file")
+
+    ih = HexImage()
+    for start, length in segments:
+        ih.puts(start, data[position : position + length].tobytes())
+        position += length
+    ih.start_addr = dict(metadata["start_addr"])
+    if source is not None and sha256 is not None and metadata.get("source"):
+        ih._attach_source(source, metadata["source"])
+    return ih, device_info
+
+
+class FirmwareCache:
+    """
+    Size-bounded LRU cache of parsed MicroPython firmware.
+
+    Entries are keyed by a hash of the hex file content, and each lookup
+    returns a copy-on-write copy of the parsed image, so callers can modify
+    it without affecting the cached firmware. The cache is thread safe, and
+    is pickled (for example to a process pool) as an empty cache with the
+    same maximum size, instead of copying all the firmware.
+
+    Example::
+
+        >>> import micropython_microbit_fs as micropython
+        >>> cache = micropython.FirmwareCache(max_size=4)
+        >>> new_hex = micropython.add_files(micropython_hex, files, cache=cache)
+    """
+
+    def __init__(self, max_size: int = 4) -> None:
+        """
+        :param max_size: Maximum number of firmware entries to keep.
+        """
+        if max_size < 1:
+            raise ValueError("Cache max_size must be at least 1")
+        self.max_size = max_size
+        self.hits = 0
+        """Number of lookups found in the cache."""
+        self.misses = 0
+        """Number of lookups that had to parse the firmware."""
+        self._entries: OrderedDict[bytes, tuple[HexImage, DeviceInfo]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __reduce__(self) -> tuple[type[FirmwareCache], tuple[int]]:
+        # Pickled without the entries or the lock
+        return FirmwareCache, (self.max_size,)
+
+    def get(self, hex_data: HexData) -> tuple[HexImage, DeviceInfo]:
+        """
+        Get the parsed image and device info for a firmware hex.
+
+        :param hex_data: Intel Hex file content as a string or ASCII bytes.
+        :returns: Tuple of (copy of the parsed hex image, device information).
+
+        :raises InvalidHexError: If the hex data is invalid.
+        :raises NotMicroPythonError: If the hex does not contain MicroPython.
+        """
+        if isinstance(hex_data, str):
+            key = hashlib.sha256(hex_data.encode("utf-8")).digest()
+        else:
+            # Same key as the text, hashed without copying the buffer
+            key = hashlib.sha256(hex_data).digest()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+
+        if entry is None:
+            # Parse outside the lock, a duplicate parse is harmless
+            entry = load_firmware(hex_data)
+            with self._lock:
+                self.misses += 1
+                self._entries[key] = entry
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+
+        ih, device_info = entry
+        return ih.copy(), device_info
+
+    def clear(self) -> None:
+        """Remove all the cached firmware."""
+        with self._lock:
+            self._entries.clear()
+
+
+def split_fs_region(
+    ih: HexImage, device_info: DeviceInfo
+) -> tuple[RecordSplit, list[tuple[int, bytes]]]:
+    """
+    Separate the filesystem region data from the rest of the firmware records.
+
+    :param ih: The parsed MicroPython hex image.
+    :param device_info: Device information from the hex file.
+    :returns: Tuple of (records around the filesystem region, list of
+        (address, data) segments inside the filesystem region).
+    """
+    fs_start = get_fs_start_address(device_info)
+    fs_end = get_fs_end_address(device_info)
+    fs_segments: list[tuple[int, bytes]] = []
+    for start, end in ih.iter_segments(fs_start, fs_end):
+        fs_segments.append((start, ih.gets(start, end - start)))
+    return ih.split_records(fs_start, fs_end), fs_segments
+
+
+class FirmwareTemplate:
+    """
+    MicroPython firmware prepared for rendering hex files with new files.
+
+    The firmware is parsed once, and the records before and after the
+    filesystem region are serialised once, so each render only has to
+    encode the filesystem chunks and concatenate the output.
+
+    Example::
+
+        >>> import micropython_microbit_fs as micropython
+        >>> template = micropython.FirmwareTemplate(micropython_hex)
+        >>> new_hex = template.render(files)
+    """
+
+    def __init__(self, hex_data: HexData) -> None:
+        """
+        :param hex_data: Intel Hex file content as a string or ASCII bytes.
+
+        :raises InvalidHexError: If the hex data is invalid.
+        :raises NotMicroPythonError: If the hex does not contain MicroPython.
+        """
+        self._prepare(*load_firmware(hex_data))
+
+    def _prepare(self, ih: HexImage, device_info: DeviceInfo) -> None:
+        """Split the firmware records around the filesystem region."""
+        self.device_info = device_info
+        # Keep any data already in the filesystem region to render from it
+        self._split, self._fs_segments = split_fs_region(ih, device_info)
+
+    @classmethod
+    def from_image(cls, ih: HexImage, device_info: DeviceInfo) -> FirmwareTemplate:
+        """
+        Create a template from already parsed firmware.
+
+        For example from MicroPythonHex.load_firmware(), to render a bundled
+        hex without parsing it.
+
+        :param ih: The parsed MicroPython hex image, it is not modified.
+        :param device_info: Device information of the firmware.
+        :returns: A new FirmwareTemplate.
+        """
+        template = cls.__new__(cls)
+        template._prepare(ih, device_info)
+        return template
+
+    def render(self, files: list[File]) -> str:
+        """
+        Create a hex file with the files added to the firmware filesystem.
+
+        The output is the same as add_files() with the template firmware.
+
+        :param files: List of File objects to inject into the filesystem.
+        :returns: New Intel Hex file content with the files injected.
+
+        :raises InvalidFileError: If a file has invalid name or content.
+        :raises StorageFullError: If the files don't fit in the filesystem.
+        """
+        return self._split.prefix + self.render_records(files) + self._split.suffix
+
+    def render_records(self, files: list[File]) -> str:
+        """
+        Encode only the filesystem region records with the files added.
+
+        The full hex file is the firmware records before the filesystem,
+        these records, and the firmware records after the filesystem, see
+        render_batch().
+
+        :param files: List of File objects to inject into the filesystem.
+        :returns: The Intel Hex records of the filesystem region.
+
+        :raises InvalidFileError: If a file has invalid name or content.
+        :raises StorageFullError: If the files don't fit in the filesystem.
+        """
+        fs = HexImage()
+        for address, data in self._fs_segments:
+            fs.puts(address, data)
+        add_files_to_hex(fs, self.device_info, files_to_dict(files))
+        return self._split.encode(fs)
+
+    def render_batch(
+        self, file_lists: list[list[File]], workers: Optional[int] = None
+    ) -> list[str]:
+        """
+        Create a hex file for each list of files, using a process pool.
+
+        The template is sent once to each worker process, and the workers
+        only return the filesystem region records, which are joined with the
+        firmware records in this process.
+
+        :param file_lists: Lists of File objects, one per hex file.
+        :param workers: Number of worker processes, defaults to the number of
+            CPUs. With one worker the hex files are rendered in this process.
+        :returns: The new hex files, in the same order as the file lists.
+
+        :raises InvalidFileError: If a file has invalid name or content.
+        :raises StorageFullError: If the files don't fit in the filesystem.
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = min(workers, len(file_lists))
+        if workers <= 1:
+            return [self.render(files) for files in file_lists]
+
+        chunksize = max(1, len(file_lists) // (workers * 4))
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_batch_worker, initargs=(self,)
+        ) as executor:
+            records = executor.map(
+                _render_batch_records, file_lists, chunksize=chunksize
+            )
+            return [self._split.prefix + r + self._split.suffix for r in records]
+
+
+_batch_template: Optional[FirmwareTemplate] = None
+"""Template of a render_batch() worker process."""
+
+
+def _init_batch_worker(template: FirmwareTemplate) -> None:
+    global _batch_template
+    _batch_template = template
+
+
+def _render_batch_records(files: list[File]) -> str:
+    assert _batch_template is not None
+    return _batch_template.render_records(files)
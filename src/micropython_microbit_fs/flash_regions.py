@@ -23,12 +23,12 @@ https://github.com/microbit-foundation/micropython-microbit-v2/blob/v2.0.0-beta.
 
 from __future__ import annotations
 
+import struct
 from dataclasses import dataclass
 
-from intelhex import IntelHex
-
 from micropython_microbit_fs import hex_utils as ihex
 from micropython_microbit_fs.device_info import DEVICE_SPECS, DeviceInfo, DeviceVersion
+from micropython_microbit_fs.hex_image import HexReader
 
 FLASH_REGIONS_MAGIC_1 = 0x597F30FE
 """First magic value for flash regions table."""
@@ -61,7 +61,6 @@ REG_COUNT_SIZE = 2
 PAGE_SIZE_LOG2_SIZE = 2
 MAGIC_2_SIZE = 4
 
-# Header total size
 HEADER_SIZE = (
     MAGIC_1_SIZE
     + VERSION_SIZE
@@ -70,6 +69,11 @@ HEADER_SIZE = (
     + PAGE_SIZE_LOG2_SIZE
     + MAGIC_2_SIZE
 )
+"""Size of the table header, at the end of the page."""
+
+HEADER_LAYOUT = struct.Struct("<IHHHHI")
+"""Header fields in address order: MAGIC_1, VERSION, TABLE_LEN, REG_COUNT,
+P_SIZE and MAGIC_2."""
 
 # Header field offsets from end of page (reading backwards)
 OFFSET_MAGIC_2 = MAGIC_2_SIZE
@@ -85,6 +89,7 @@ ROW_HASH_TYPE_SIZE = 1
 ROW_START_PAGE_SIZE = 2
 ROW_LENGTH_SIZE = 4
 ROW_HASH_DATA_SIZE = 8
+
 ROW_SIZE = (
     ROW_ID_SIZE
     + ROW_HASH_TYPE_SIZE
@@ -92,6 +97,11 @@ ROW_SIZE = (
     + ROW_LENGTH_SIZE
     + ROW_HASH_DATA_SIZE
 )
+"""Size of a region row, the rows are stored before the header."""
+
+ROW_LAYOUT = struct.Struct("<BBHII4x")
+"""Row fields in address order: ID, HT, START_PAGE, LENGTH and HASH_DATA,
+of which only the lower 4 bytes are used."""
 
 # Region row field offsets from end of row (reading backwards)
 ROW_OFFSET_HASH_DATA = ROW_HASH_DATA_SIZE
@@ -139,112 +149,95 @@ class TableHeader:
     end_address: int
 
 
-def _find_table_header(ih: IntelHex, page_size: int) -> TableHeader | None:
+def _find_table_header(
+    ih: HexReader,
+    page_size: int,
+    flash_size: int = DEVICE_SPECS[DeviceVersion.V2].flash_size,
+) -> TableHeader | None:
     """
-    Search for the Flash Regions Table header by scanning page boundaries.
+    Search for the Flash Regions Table header at the end of the flash pages.
 
-    :param ih: IntelHex object containing the hex data.
+    The table is the last data of the MicroPython region, below the
+    filesystem, so the pages are checked from the end of flash downwards.
+    Addresses above the flash (like the UICR) are not scanned, and the data
+    ranges of the image are not needed, so a lazy HexIndex only decodes the
+    records of the pages read.
+
+    :param ih: HexImage or HexIndex object containing the hex data.
     :param page_size: Flash page size to scan (default: 4096 for V2).
+    :param flash_size: Size of the flash, the end address of the last page.
     :returns: TableHeader if found, None otherwise.
     """
-    # Get the address range in the hex file
-    min_addr = ih.minaddr()
-    max_addr = ih.maxaddr()
-
-    # Check if hex file is empty or has no valid data
-    if min_addr is None or max_addr is None:
-        return None
-
-    # Scan pages from end to beginning, looking for magic values
-    # Start from the first page boundary after min_addr
-    start_page = (min_addr // page_size) * page_size
-    end_page = ((max_addr // page_size) + 1) * page_size
-
-    for page_start in range(start_page, end_page, page_size):
-        page_end = page_start + page_size
-
-        # Read magic values from end of page
-        magic_1_addr = page_end - OFFSET_MAGIC_1
-        magic_2_addr = page_end - OFFSET_MAGIC_2
-
-        # Check if addresses are in range
-        if magic_1_addr < min_addr or magic_2_addr + 4 > max_addr + 1:
-            continue
-
-        magic_1 = ihex.read_uint32(ih, magic_1_addr)
-        magic_2 = ihex.read_uint32(ih, magic_2_addr)
-
+    for page_end in range(flash_size, HEADER_SIZE - 1, -page_size):
+        (
+            magic_1,
+            version,
+            table_length,
+            region_count,
+            page_size_log2,
+            magic_2,
+        ) = HEADER_LAYOUT.unpack(ih.gets(page_end - HEADER_SIZE, HEADER_SIZE))
         if magic_1 == FLASH_REGIONS_MAGIC_1 and magic_2 == FLASH_REGIONS_MAGIC_2:
-            # Found the table header
-            version = ihex.read_uint16(ih, page_end - OFFSET_VERSION)
-            table_length = ihex.read_uint16(ih, page_end - OFFSET_TABLE_LEN)
-            region_count = ihex.read_uint16(ih, page_end - OFFSET_REG_COUNT)
-            page_size_log2 = ihex.read_uint16(ih, page_end - OFFSET_PAGE_SIZE_LOG2)
-
             return TableHeader(
                 page_size_log2=page_size_log2,
                 page_size=2**page_size_log2,
                 region_count=region_count,
                 table_length=table_length,
                 version=version,
-                start_address=page_end - OFFSET_MAGIC_1,
+                start_address=page_end - HEADER_SIZE,
                 end_address=page_end,
             )
 
     return None
 
 
-def _read_region_row(ih: IntelHex, row_end_address: int) -> RegionRow:
+def _read_region_rows(ih: HexReader, header: TableHeader) -> list[RegionRow]:
     """
-    Read a region row from the Flash Regions Table.
+    Read all the region rows of the Flash Regions Table.
 
-    :param ih: IntelHex object.
-    :param row_end_address: Address where this row ends.
-    :returns: RegionRow with the parsed data.
+    :param ih: HexImage or HexIndex object.
+    :param header: Header of the table, the rows are stored before it.
+    :returns: RegionRow list with the parsed data, from the row next to the
+        header to the first row in memory.
     """
-    region_id = ihex.read_uint8(ih, row_end_address - ROW_OFFSET_ID)
-    hash_type = ihex.read_uint8(ih, row_end_address - ROW_OFFSET_HASH_TYPE)
-    start_page = ihex.read_uint16(ih, row_end_address - ROW_OFFSET_START_PAGE)
-    length_bytes = ihex.read_uint32(ih, row_end_address - ROW_OFFSET_LENGTH)
-
-    # Read hash data (8 bytes, but we only need the lower 4 bytes for pointer)
-    hash_data_addr = row_end_address - ROW_OFFSET_HASH_DATA
-    hash_data = ihex.read_uint32(ih, hash_data_addr)
-
-    # If hash type is pointer, read the string it points to
-    hash_pointer_data = ""
-    if hash_type == RegionHashType.POINTER:
-        hash_pointer_data = ihex.read_string(ih, hash_data)
-
-    return RegionRow(
-        id=region_id,
-        start_page=start_page,
-        length_bytes=length_bytes,
-        hash_type=hash_type,
-        hash_data=hash_data,
-        hash_pointer_data=hash_pointer_data,
-    )
+    rows_start = header.start_address - header.region_count * ROW_SIZE
+    rows_data = ih.gets(rows_start, header.region_count * ROW_SIZE)
+
+    rows = []
+    for region_id, hash_type, start_page, length_bytes, hash_data in reversed(
+        list(ROW_LAYOUT.iter_unpack(rows_data))
+    ):
+        # If hash type is pointer, read the string it points to
+        hash_pointer_data = ""
+        if hash_type == RegionHashType.POINTER:
+            hash_pointer_data = ihex.read_string(ih, hash_data)
+        rows.append(
+            RegionRow(
+                id=region_id,
+                start_page=start_page,
+                length_bytes=length_bytes,
+                hash_type=hash_type,
+                hash_data=hash_data,
+                hash_pointer_data=hash_pointer_data,
+            )
+        )
+    return rows
 
 
-def get_device_info_from_flash_regions(ih: IntelHex) -> DeviceInfo | None:
+def get_device_info_from_flash_regions(ih: HexReader) -> DeviceInfo | None:
     """
-    Extract DeviceInfo from Flash Regions Table in an IntelHex object.
+    Extract DeviceInfo from Flash Regions Table in a HexImage or HexIndex object.
 
     This is the primary detection method for micro:bit V2 MicroPython.
 
-    :param ih: IntelHex object containing the hex data.
+    :param ih: HexImage or HexIndex object containing the hex data.
     :returns: DeviceInfo if valid Flash Regions Table is found, None otherwise.
     """
     header = _find_table_header(ih, DEVICE_SPECS[DeviceVersion.V2].page_size)
     if header is None:
         return None
 
-    # Read all region rows
-    regions: dict[int, RegionRow] = {}
-    for i in range(header.region_count):
-        row_end_address = header.start_address - i * ROW_SIZE
-        row = _read_region_row(ih, row_end_address)
-        regions[row.id] = row
+    regions = {row.id: row for row in _read_region_rows(ih, header)}
 
     # Check for required regions
     if FlashRegionId.MICROPYTHON not in regions:
@@ -0,0 +1,980 @@
+#!/usr/bin/env python3
+"""
+Segment based Intel Hex parser and writer.
+
+MicroPython hex files contain several hundred KBs of data, and storing it one
+byte per dictionary entry (as the ``intelhex`` library does) makes parsing and
+serialising the hex the most expensive part of every operation.
+
+This module decodes the Intel Hex records directly into contiguous
+``bytearray`` segments keyed by their base address. Addresses without data
+read as the padding value (0xFF), matching the behaviour of erased flash.
+
+The original record text is kept alongside the segments, so that when the
+image is serialised only the address ranges modified after parsing are
+re-encoded, and every other record is written back verbatim.
+
+Only the record types used by micro:bit hex files are supported:
+```
+| 00 Data | 01 End Of File | 02 Extended Segment Address |
+| 03 Start Segment Address | 04 Extended Linear Address | 05 Start Linear Address |
+```
+"""
+
+from __future__ import annotations
+
+import binascii
+import io
+import mmap
+from bisect import bisect_right
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import Any, NamedTuple, Optional, Protocol, Union
+
+from micropython_microbit_fs.exceptions import InvalidHexError
+
+HexData = Union[str, bytes, bytearray, memoryview, mmap.mmap]
+"""Intel Hex file content, as a string or an ASCII encoded buffer."""
+
+
+class HexReader(Protocol):
+    """Read access to Intel Hex data, implemented by HexImage and HexIndex."""
+
+    def __getitem__(self, address: int) -> int: ...
+
+    def gets(self, address: int, length: int) -> bytes: ...
+
+    def minaddr(self) -> Optional[int]: ...
+
+    def maxaddr(self) -> Optional[int]: ...
+
+    def segments(self) -> list[tuple[int, int]]: ...
+
+    def view(self, address: int, length: int) -> memoryview: ...
+
+
+def hex_data_to_text(hex_data: HexData) -> str:
+    """
+    Return Intel Hex file content as a string.
+
+    Buffers are decoded as ASCII in one step, without an intermediate copy.
+
+    :param hex_data: Intel Hex file content as a string or ASCII bytes.
+    :returns: The hex file content as a string.
+    :raises InvalidHexError: If the buffer contains non-ASCII characters.
+    """
+    if isinstance(hex_data, str):
+        return hex_data
+    try:
+        return str(hex_data, "ascii")
+    except UnicodeDecodeError as e:
+        raise InvalidHexError(
+            f"Invalid non-ASCII character at position {e.start}"
+        ) from e
+
+
+class RecordType:
+    """Intel Hex record type values."""
+
+    DATA = 0x00
+    """Data record."""
+
+    END_OF_FILE = 0x01
+    """End of file record."""
+
+    EXTENDED_SEGMENT_ADDRESS = 0x02
+    """Extended segment address record (bits 4-19 of the address)."""
+
+    START_SEGMENT_ADDRESS = 0x03
+    """Start segment address record (CS:IP registers)."""
+
+    EXTENDED_LINEAR_ADDRESS = 0x04
+    """Extended linear address record (upper 16 bits of the address)."""
+
+    START_LINEAR_ADDRESS = 0x05
+    """Start linear address record (EIP register)."""
+
+
+RECORD_DATA_SIZE = 16
+"""Number of data bytes written per data record."""
+
+END_OF_FILE_RECORD = ":00000001FF"
+"""The End Of File record, identical in all hex files."""
+
+
+def encode_record(record_type: int, offset: int, data: bytes | bytearray = b"") -> str:
+    """
+    Encode a single Intel Hex record.
+
+    :param record_type: The record type (see RecordType).
+    :param offset: The 16-bit address offset field.
+    :param data: The record data bytes.
+    :returns: The record as an uppercase ASCII string, without line ending.
+    """
+    record = bytearray((len(data), (offset >> 8) & 0xFF, offset & 0xFF, record_type))
+    record += data
+    record.append(-sum(record) & 0xFF)
+    return ":" + record.hex().upper()
+
+
+def _decode_record(line: str, line_number: int) -> bytes:
+    """
+    Decode and validate an Intel Hex record line.
+
+    :param line: The record line, without line ending.
+    :param line_number: Line number used in error messages.
+    :returns: All the record bytes (length, offset, type, data and checksum).
+    :raises InvalidHexError: If the record is malformed.
+    """
+    if line[0] != ":":
+        raise InvalidHexError(f"Line {line_number}: Record does not start with ':'")
+    try:
+        record = binascii.unhexlify(line[1:])
+    except (binascii.Error, ValueError) as e:
+        raise InvalidHexError(f"Line {line_number}: Invalid hex characters") from e
+    if len(record) < 5 or len(record) != record[0] + 5:
+        raise InvalidHexError(f"Line {line_number}: Invalid record length")
+    if sum(record) & 0xFF:
+        raise InvalidHexError(f"Line {line_number}: Invalid record checksum")
+    return record
+
+
+def _merge_ranges(ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Sort and merge overlapping or touching (start, end) address ranges."""
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _intersects(ranges: list[tuple[int, int]], start: int, end: int) -> bool:
+    """Check if the [start, end) range intersects any of the sorted ranges."""
+    # Index of the last range starting before ``end``
+    i = bisect_right(ranges, (end,)) - 1
+    return i >= 0 and ranges[i][1] > start
+
+
+class _SourceBlock(NamedTuple):
+    """Run of source record lines containing one contiguous range of data."""
+
+    start: int
+    """First data address in the block."""
+
+    end: int
+    """End data address (exclusive)."""
+
+    text_start: int
+    """Offset in the source text of the first line in the block."""
+
+    text_end: int
+    """Offset in the source text after the last data record of the block."""
+
+    entry_base: int
+    """Extended address in effect before the first line of the block."""
+
+    exit_base: int
+    """Extended address in effect after the last line of the block."""
+
+
+_ENCODE_SLICE_SIZE = 0x10000
+"""Characters encoded at a time by _RecordWriter.getbytes()."""
+
+
+class _RecordWriter:
+    """Accumulates Intel Hex output, tracking the current extended address."""
+
+    def __init__(self, newline: str = "\n", base: Optional[int] = 0) -> None:
+        self.parts: list[str] = []
+        self.newline = newline
+        # A None base is set by the first set_base() call without a record
+        self.base = base
+        self.split_index = 0
+        self.split_base = 0
+        self.suffix_base: Optional[int] = None
+
+    def raw(self, text: str) -> None:
+        """Add already encoded record lines."""
+        if text:
+            self.parts.append(text)
+            if not text.endswith("\n"):
+                self.parts.append(self.newline)
+
+    def record(self, record_type: int, offset: int, data: bytes | bytearray) -> None:
+        """Encode and add a single record."""
+        self.parts.append(encode_record(record_type, offset, data) + self.newline)
+
+    def set_base(self, base: int) -> None:
+        """Add an extended address record if the base address changes."""
+        if base == self.base:
+            return
+        if self.base is None:
+            # The output after a split point provides its own base address
+            self.suffix_base = self.base = base
+            return
+        if base & 0xFFFF == 0:
+            value = base >> 16
+            record_type = RecordType.EXTENDED_LINEAR_ADDRESS
+        else:
+            value = base >> 4
+            record_type = RecordType.EXTENDED_SEGMENT_ADDRESS
+        self.record(record_type, 0, value.to_bytes(2, "big"))
+        self.base = base
+
+    def data(self, address: int, data: bytes | bytearray) -> None:
+        """Add data records, split at 64 KB boundaries."""
+        position = 0
+        while position < len(data):
+            current = address + position
+            self.set_base(current & ~0xFFFF)
+            length = min(
+                RECORD_DATA_SIZE,
+                len(data) - position,
+                0x10000 - (current & 0xFFFF),
+            )
+            self.record(
+                RecordType.DATA,
+                current & 0xFFFF,
+                data[position : position + length],
+            )
+            position += length
+
+    def split(self) -> None:
+        """Mark the current position as the split point of the output."""
+        assert self.base is not None
+        self.split_index = len(self.parts)
+        self.split_base = self.base
+        self.base = None
+
+    def getvalue(self, start: int = 0, end: Optional[int] = None) -> str:
+        """Return the output with the End Of File record."""
+        output = "".join(self.parts[start:end])
+        if end is None:
+            output += END_OF_FILE_RECORD + self.newline
+        return output
+
+    def getbytes(self) -> bytes:
+        """Return the output with the End Of File record as ASCII bytes.
+
+        Each part is encoded into the output buffer, so the full output is
+        never joined as a string.
+        """
+        output = io.BytesIO()
+        for part in self.parts:
+            # Large runs of source records are encoded in slices
+            for i in range(0, len(part), _ENCODE_SLICE_SIZE):
+                output.write(part[i : i + _ENCODE_SLICE_SIZE].encode("ascii"))
+        output.write((END_OF_FILE_RECORD + self.newline).encode("ascii"))
+        return output.getvalue()
+
+
+@dataclass(frozen=True)
+class RecordSplit:
+    """
+    Intel Hex output split around an address range without data.
+
+    Created by HexImage.split_records(), the data for the excluded address
+    range can then be encoded between the prefix and suffix with join().
+    """
+
+    prefix: str
+    """Records before the excluded range."""
+
+    suffix: str
+    """Records after the excluded range, including the End Of File record."""
+
+    prefix_base: int
+    """Extended address in effect at the end of the prefix."""
+
+    suffix_base: Optional[int]
+    """Extended address required at the start of the suffix, if any."""
+
+    newline: str
+    """Line ending used by the records."""
+
+    def join(self, image: HexImage) -> str:
+        """
+        Encode the data from an image between the prefix and suffix records.
+
+        :param image: Image containing only data inside the excluded range.
+        :returns: Intel Hex file content as a string.
+        """
+        return self.prefix + self.encode(image) + self.suffix
+
+    def encode(self, image: HexImage) -> str:
+        """
+        Encode only the records that go between the prefix and suffix.
+
+        :param image: Image containing only data inside the excluded range.
+        :returns: The records for the image data, as a string.
+        """
+        writer = _RecordWriter(self.newline, self.prefix_base)
+        for start, end in image.segments():
+            writer.data(start, image.gets(start, end - start))
+        if self.suffix_base is not None:
+            writer.set_base(self.suffix_base)
+        return writer.getvalue(end=len(writer.parts))
+
+
+class HexImage:
+    """
+    Memory image of an Intel Hex file, stored as contiguous data segments.
+
+    Supports the subset of the ``intelhex.IntelHex`` interface used by this
+    package: byte indexing, ``gets``/``puts`` for byte ranges,
+    ``minaddr``/``maxaddr`` and ``segments``.
+    """
+
+    def __init__(self) -> None:
+        self.padding = 0xFF
+        """Value returned for addresses without data."""
+
+        self.start_addr: dict[str, int] = {}
+        """Start address registers, ``{"CS", "IP"}`` or ``{"EIP"}`` keys."""
+
+        # Sorted segment base addresses, and segment data keyed by base address
+        self._starts: list[int] = []
+        self._segments: dict[int, bytearray] = {}
+
+        # Parsed source text, to write back the records that have not changed
+        self._source: Optional[str] = None
+        self._source_blocks: list[_SourceBlock] = []
+        self._source_tail = (0, 0)
+        self._source_start_addr: dict[str, int] = {}
+        self._newline = "\n"
+        # Address ranges modified since the source was parsed
+        self._dirty: list[list[int]] = []
+        # Base addresses of the segments shared with copies of this image
+        self._shared: set[int] = set()
+
+    @classmethod
+    def from_string(cls, hex_data: str) -> HexImage:
+        """
+        Parse Intel Hex records into a new image.
+
+        :param hex_data: Intel Hex file content as a string.
+        :returns: The parsed HexImage.
+        :raises InvalidHexError: If the hex data is malformed.
+        """
+        image = cls()
+        image._load_records(hex_data)
+        return image
+
+    @classmethod
+    def from_bytes(
+        cls, hex_data: bytes | bytearray | memoryview | mmap.mmap
+    ) -> HexImage:
+        """
+        Parse Intel Hex records from an ASCII encoded buffer.
+
+        The buffer can be any object supporting the buffer protocol, like a
+        memoryview or an mmap of a hex file, and it is decoded in one step
+        without an intermediate bytes copy.
+
+        :param hex_data: Intel Hex file content as ASCII bytes.
+        :returns: The parsed HexImage.
+        :raises InvalidHexError: If the hex data is malformed.
+        """
+        return cls.from_string(hex_data_to_text(hex_data))
+
+    def _load_records(self, text: str) -> None:
+        """Decode record lines and build the segment and source block lists."""
+        pieces: list[tuple[int, bytearray]] = []
+        blocks: list[_SourceBlock] = []
+        base_address = 0
+        piece: Optional[bytearray] = None
+        piece_start = 0
+        piece_end = -1
+        block_text_start = 0
+        block_entry_base = 0
+        block_exit_base = 0
+        data_text_end = 0
+        tail_end = len(text)
+
+        line_number = 0
+        position = 0
+        while position < len(text):
+            line_start = position
+            line_end = text.find("\n", position)
+            position = len(text) if line_end < 0 else line_end + 1
+            line_number += 1
+            line = text[line_start:position].strip()
+            if not line:
+                continue
+            record = _decode_record(line, line_number)
+            record_type = record[3]
+
+            if record_type == RecordType.DATA:
+                address = base_address + ((record[1] << 8) | record[2])
+                if piece is not None and address == piece_end:
+                    piece += record[4:-1]
+                else:
+                    if piece is not None:
+                        blocks.append(
+                            _SourceBlock(
+                                piece_start,
+                                piece_end,
+                                block_text_start,
+                                data_text_end,
+                                block_entry_base,
+                                block_exit_base,
+                            )
+                        )
+                        block_text_start = data_text_end
+                        block_entry_base = block_exit_base
+                    piece = bytearray(record[4:-1])
+                    piece_start = address
+                    pieces.append((address, piece))
+                piece_end = address + record[0]
+                data_text_end = position
+                block_exit_base = base_address
+            elif record_type == RecordType.END_OF_FILE:
+                tail_end = line_start
+                break
+            elif record_type in (
+                RecordType.EXTENDED_SEGMENT_ADDRESS,
+                RecordType.EXTENDED_LINEAR_ADDRESS,
+            ):
+                if record[0] != 2:
+                    raise InvalidHexError(
+                        f"Line {line_number}: Invalid extended address record"
+                    )
+                shift = 4 if record_type == RecordType.EXTENDED_SEGMENT_ADDRESS else 16
+                base_address = ((record[4] << 8) | record[5]) << shift
+            elif record_type == RecordType.START_SEGMENT_ADDRESS:
+                if record[0] != 4:
+                    raise InvalidHexError(
+                        f"Line {line_number}: Invalid start segment address record"
+                    )
+                self.start_addr = {
+                    "CS": (record[4] << 8) | record[5],
+                    "IP": (record[6] << 8) | record[7],
+                }
+            elif record_type == RecordType.START_LINEAR_ADDRESS:
+                if record[0] != 4:
+                    raise InvalidHexError(
+                        f"Line {line_number}: Invalid start linear address record"
+                    )
+                self.start_addr = {"EIP": int.from_bytes(record[4:8], "big")}
+            else:
+                raise InvalidHexError(
+                    f"Line {line_number}: Unsupported record type 0x{record_type:02X}"
+                )
+
+        if piece is not None:
+            blocks.append(
+                _SourceBlock(
+                    piece_start,
+                    piece_end,
+                    block_text_start,
+                    data_text_end,
+                    block_entry_base,
+                    block_exit_base,
+                )
+            )
+            block_text_start = data_text_end
+
+        self._set_segments(pieces)
+        self._source = text
+        self._source_blocks = blocks
+        self._source_tail = (block_text_start, tail_end)
+        self._source_start_addr = dict(self.start_addr)
+        first_line_end = text.find("\n")
+        if first_line_end > 0 and text[first_line_end - 1] == "\r":
+            self._newline = "\r\n"
+
+    def _iter_source_records(
+        self, block: _SourceBlock
+    ) -> Iterator[tuple[int, int, int, int, int, int]]:
+        """
+        Iterate over the record lines of a source block.
+
+        :param block: The source block to scan.
+        :returns: Iterator of (text_start, text_end, record_type, address,
+            length, base_address) tuples. The address is only set for data
+            records, and the base address is the one in effect after the line.
+            Blank lines have a record type of -1.
+        """
+        assert self._source is not None
+        text = self._source
+        base_address = block.entry_base
+        position = block.text_start
+        while position < block.text_end:
+            line_start = position
+            line_end = text.find("\n", position, block.text_end)
+            position = block.text_end if line_end < 0 else line_end + 1
+            line = text[line_start:position].strip()
+            if not line:
+                yield line_start, position, -1, 0, 0, base_address
+                continue
+            record = binascii.unhexlify(line[1:])
+            record_type = record[3]
+            address = 0
+            if record_type == RecordType.DATA:
+                address = base_address + ((record[1] << 8) | record[2])
+            elif record_type == RecordType.EXTENDED_SEGMENT_ADDRESS:
+                base_address = ((record[4] << 8) | record[5]) << 4
+            elif record_type == RecordType.EXTENDED_LINEAR_ADDRESS:
+                base_address = ((record[4] << 8) | record[5]) << 16
+            yield line_start, position, record_type, address, record[0], base_address
+
+    def _mark_dirty(self, start: int, end: int) -> None:
+        """Record an address range modified after parsing the source."""
+        if self._source is None:
+            return
+        if self._dirty and self._dirty[-1][1] == start:
+            self._dirty[-1][1] = end
+        else:
+            self._dirty.append([start, end])
+
+    def _set_segments(self, pieces: list[tuple[int, bytearray]]) -> None:
+        """Sort and join adjacent data pieces into the segment list."""
+        pieces.sort(key=lambda p: p[0])
+        self._starts = []
+        self._segments = {}
+        segment_end = -1
+        for address, data in pieces:
+            if not data:
+                continue
+            if address < segment_end:
+                raise InvalidHexError(f"Overlapping data at address 0x{address:08X}")
+            if address == segment_end:
+                self._segments[self._starts[-1]] += data
+            else:
+                self._starts.append(address)
+                self._segments[address] = data
+            segment_end = address + len(data)
+
+    def _segment_index(self, address: int) -> int:
+        """Return the index of the segment containing an address, or -1."""
+        i = bisect_right(self._starts, address) - 1
+        if i >= 0:
+            start = self._starts[i]
+            if address - start < len(self._segments[start]):
+                return i
+        return -1
+
+    def __getitem__(self, address: int) -> int:
+        i = bisect_right(self._starts, address) - 1
+        if i >= 0:
+            start = self._starts[i]
+            segment = self._segments[start]
+            if address - start < len(segment):
+                return segment[address - start]
+        return self.padding
+
+    def __setitem__(self, address: int, value: int) -> None:
+        i = self._segment_index(address)
+        if i >= 0:
+            start = self._starts[i]
+            self._own_segment(start)[address - start] = value
+            self._mark_dirty(address, address + 1)
+        else:
+            self.puts(address, bytes((value,)))
+
+    def gets(self, address: int, length: int) -> bytes:
+        """
+        Read a range of bytes, filling addresses without data with padding.
+
+        :param address: Start address to read from.
+        :param length: Number of bytes to read.
+        :returns: The bytes at the address range.
+        """
+        end = address + length
+        i = self._segment_index(address)
+        if i >= 0:
+            start = self._starts[i]
+            segment = self._segments[start]
+            if end <= start + len(segment):
+                return bytes(segment[address - start : end - start])
+
+        result = bytearray([self.padding]) * length
+        first = max(bisect_right(self._starts, address) - 1, 0)
+        for start in self._starts[first:]:
+            if start >= end:
+                break
+            segment = self._segments[start]
+            copy_start = max(start, address)
+            copy_end = min(start + len(segment), end)
+            if copy_start < copy_end:
+                result[copy_start - address : copy_end - address] = segment[
+                    copy_start - start : copy_end - start
+                ]
+        return bytes(result)
+
+    def view(self, address: int, length: int) -> memoryview:
+        """
+        Read a range of bytes without copying them, if possible.
+
+        A range inside a single segment is returned as a read-only view of
+        the segment data. The segment is then treated like a segment shared
+        with a copy, so later writes copy it first and the view never
+        changes. Other ranges are read with ``gets``.
+
+        :param address: Start address to read from.
+        :param length: Number of bytes to read.
+        :returns: Read-only memoryview of the bytes at the address range.
+        """
+        i = self._segment_index(address)
+        if i >= 0:
+            start = self._starts[i]
+            segment = self._segments[start]
+            if address + length <= start + len(segment):
+                self._shared.add(start)
+                offset = address - start
+                return memoryview(segment).toreadonly()[offset : offset + length]
+        return memoryview(self.gets(address, length))
+
+    def puts(self, address: int, data: bytes | bytearray) -> None:
+        """
+        Write a range of bytes, creating or joining segments as needed.
+
+        :param address: Start address to write to.
+        :param data: The bytes to write.
+        """
+        if not data:
+            return
+        end = address + len(data)
+        self._mark_dirty(address, end)
+        i = self._segment_index(address)
+        if i >= 0:
+            start = self._starts[i]
+            if end <= self.segment_end(start):
+                self._own_segment(start)[address - start : end - start] = data
+                return
+
+        # Join all segments overlapping or touching the written range
+        first = bisect_right(self._starts, address) - 1
+        if first < 0 or self.segment_end(self._starts[first]) < address:
+            first += 1
+        last = bisect_right(self._starts, end)
+        joined = self._starts[first:last]
+
+        new_start = min(address, joined[0]) if joined else address
+        if joined and joined[0] == new_start:
+            # Extend the first segment in place instead of copying it
+            new_segment = self._own_segment(joined.pop(0))
+        else:
+            new_segment = bytearray()
+        for start in joined:
+            segment = self._segments.pop(start)
+            self._shared.discard(start)
+            offset = start - new_start
+            # Any gap between segments is covered by the new data
+            new_segment.extend(bytes(offset - len(new_segment)))
+            new_segment[offset:] = segment
+        new_segment[address - new_start : end - new_start] = data
+
+        self._starts[first:last] = [new_start]
+        self._segments[new_start] = new_segment
+
+    def _own_segment(self, start: int) -> bytearray:
+        """Return a segment for writing, copying it first if it is shared."""
+        if start in self._shared:
+            self._shared.discard(start)
+            self._segments[start] = bytearray(self._segments[start])
+        return self._segments[start]
+
+    def segment_end(self, start: int) -> int:
+        """Return the end address (exclusive) of the segment at ``start``."""
+        return start + len(self._segments[start])
+
+    def segments(self) -> list[tuple[int, int]]:
+        """
+        Return the address ranges containing data.
+
+        :returns: List of (start, end) tuples, end address exclusive.
+        """
+        return [(start, self.segment_end(start)) for start in self._starts]
+
+    def iter_segments(
+        self, start: Optional[int] = None, end: Optional[int] = None
+    ) -> Iterator[tuple[int, int]]:
+        """
+        Iterate over the address ranges containing data within a range.
+
+        The first segment is found with a binary search, so only the
+        segments overlapping the range are visited.
+
+        :param start: Start of the address range, or None for no limit.
+        :param end: End of the address range (exclusive), or None for no limit.
+        :returns: Iterator of (start, end) tuples, clipped to the range.
+        """
+        first = 0
+        if start is not None:
+            first = max(bisect_right(self._starts, start) - 1, 0)
+        for segment_start in self._starts[first:]:
+            if end is not None and segment_start >= end:
+                break
+            segment_end = self.segment_end(segment_start)
+            if start is not None:
+                if segment_end <= start:
+                    continue
+                segment_start = max(segment_start, start)
+            yield segment_start, segment_end if end is None else min(segment_end, end)
+
+    def has_data(self, address: int, length: int = 1, partial: bool = False) -> bool:
+        """
+        Check if an address range contains data, in O(log segments) time.
+
+        :param address: Start address of the range.
+        :param length: Number of bytes in the range.
+        :param partial: If True, check if any address in the range has data,
+            instead of all of them.
+        :returns: True if the range is covered by data.
+        """
+        if length <= 0:
+            return False
+        if partial:
+            i = bisect_right(self._starts, address + length - 1) - 1
+            return i >= 0 and self.segment_end(self._starts[i]) > address
+        # Adjacent segments are always joined, so the range is in one segment
+        i = self._segment_index(address)
+        return i >= 0 and address + length <= self.segment_end(self._starts[i])
+
+    def minaddr(self) -> Optional[int]:
+        """Return the lowest address with data, or None if the image is empty."""
+        return self._starts[0] if self._starts else None
+
+    def maxaddr(self) -> Optional[int]:
+        """Return the highest address with data, or None if the image is empty."""
+        return self.segment_end(self._starts[-1]) - 1 if self._starts else None
+
+    def addresses(self) -> list[int]:
+        """Return a sorted list of every address containing data."""
+        return [a for start, end in self.iter_segments() for a in range(start, end)]
+
+    def _source_layout(self) -> Optional[dict[str, Any]]:
+        """
+        Return the source record blocks as JSON data, see _attach_source().
+
+        :returns: The source layout, or None if the image was not parsed or
+            has been modified since.
+        """
+        if (
+            self._source is None
+            or self._dirty
+            or self.start_addr != self._source_start_addr
+        ):
+            return None
+        return {
+            "blocks": [list(block) for block in self._source_blocks],
+            "tail": list(self._source_tail),
+            "newline": self._newline,
+        }
+
+    def _attach_source(self, source: str, layout: dict[str, Any]) -> None:
+        """
+        Attach the source text of an unmodified image rebuilt from its data.
+
+        The records are then written back verbatim like in a parsed image.
+
+        :param source: The hex text the image data was parsed from.
+        :param layout: The layout returned by _source_layout() after parsing.
+        """
+        self._source = source
+        self._source_blocks = [_SourceBlock(*block) for block in layout["blocks"]]
+        start, end = layout["tail"]
+        self._source_tail = (start, end)
+        self._source_start_addr = dict(self.start_addr)
+        self._newline = layout["newline"]
+        self._dirty = []
+
+    def copy(self) -> HexImage:
+        """
+        Return an independent copy of this image.
+
+        The data segments are shared copy-on-write, so copying is cheap and
+        only the segments written to are duplicated.
+        """
+        image = HexImage()
+        image.padding = self.padding
+        image.start_addr = dict(self.start_addr)
+        image._starts = list(self._starts)
+        image._segments = dict(self._segments)
+        self._shared = set(self._starts)
+        image._shared = set(self._starts)
+        # The source text and blocks are never modified, so can be shared
+        image._source = self._source
+        image._source_blocks = self._source_blocks
+        image._source_tail = self._source_tail
+        image._source_start_addr = self._source_start_addr
+        image._newline = self._newline
+        image._dirty = [list(r) for r in self._dirty]
+        return image
+
+    def to_string(self, preserve_records: bool = True) -> str:
+        """
+        Serialise the image as Intel Hex records.
+
+        By default the records from the parsed hex are written back verbatim,
+        and only the address ranges modified since then are re-encoded.
+        Images not created from a hex string are written with the same layout
+        as ``intelhex.IntelHex.write_hex_file``.
+
+        :param preserve_records: Keep the original records where possible. If
+            False, all the data is re-encoded with the IntelHex layout.
+        :returns: Intel Hex file content as a string.
+        """
+        return self._write(preserve_records).getvalue()
+
+    def to_bytes(self, preserve_records: bool = True) -> bytes:
+        """
+        Serialise the image as ASCII encoded Intel Hex records.
+
+        The records are encoded into a bytes buffer, without creating the
+        whole hex file as a string first.
+
+        :param preserve_records: Keep the original records where possible, as
+            in to_string().
+        :returns: Intel Hex file content as bytes.
+        """
+        return self._write(preserve_records).getbytes()
+
+    def _write(self, preserve_records: bool) -> _RecordWriter:
+        """Write the records for to_string() and to_bytes()."""
+        if (
+            not preserve_records
+            or self._source is None
+            or self.start_addr != self._source_start_addr
+        ):
+            return self._encode_all()
+        return self._encode_changes()
+
+    def split_records(self, start: int, end: int) -> RecordSplit:
+        """
+        Serialise the image records around an address range.
+
+        The records are written as in to_string(), but the data between the
+        start and end addresses is left out, so that new data can be encoded
+        in its place by RecordSplit.join() without writing the whole image.
+
+        :param start: Start address of the excluded range.
+        :param end: End address (exclusive) of the excluded range.
+        :returns: The records before and after the excluded range.
+        """
+        writer = self._encode_changes(exclude=(start, end))
+        return RecordSplit(
+            prefix=writer.getvalue(end=writer.split_index),
+            suffix=writer.getvalue(start=writer.split_index),
+            prefix_base=writer.split_base,
+            suffix_base=writer.suffix_base,
+            newline=self._newline,
+        )
+
+    def _write_range(self, writer: _RecordWriter, start: int, end: int) -> None:
+        """Add data records for all the data inside an address range."""
+        first = max(bisect_right(self._starts, start) - 1, 0)
+        for segment_start in self._starts[first:]:
+            if segment_start >= end:
+                break
+            segment = self._segments[segment_start]
+            write_start = max(segment_start, start)
+            write_end = min(segment_start + len(segment), end)
+            if write_start < write_end:
+                writer.data(
+                    write_start,
+                    segment[write_start - segment_start : write_end - segment_start],
+                )
+
+    def _encode_changes(
+        self, exclude: Optional[tuple[int, int]] = None
+    ) -> _RecordWriter:
+        """
+        Write the source records, re-encoding only modified address ranges.
+
+        :param exclude: Optional address range to leave out of the output,
+            splitting the writer output at its position.
+        :returns: The writer containing the output.
+        """
+        writer = _RecordWriter(self._newline)
+        if self._source is None:
+            # Without a source all the data has to be encoded
+            source = ""
+            writer.base = self._initial_base()
+            self._write_start_address(writer)
+            dirty = self.segments()
+        else:
+            source = self._source
+            dirty = [(start, end) for start, end in self._dirty]
+        if exclude is not None:
+            dirty.append(exclude)
+        dirty = _merge_ranges(dirty)
+
+        # Source records partially modified are re-encoded in full
+        split_blocks: set[int] = set()
+        record_ranges: list[tuple[int, int]] = []
+        for i, block in enumerate(self._source_blocks):
+            if not _intersects(dirty, block.start, block.end):
+                continue
+            split_blocks.add(i)
+            for record in self._iter_source_records(block):
+                record_type, address, length = record[2:5]
+                if record_type == RecordType.DATA and _intersects(
+                    dirty, address, address + length
+                ):
+                    record_ranges.append((address, address + length))
+        dirty = _merge_ranges(dirty + record_ranges)
+        pending = dirty[::-1]
+
+        def write_pending(limit: int) -> None:
+            while pending and pending[-1][0] < limit:
+                start, end = pending.pop()
+                if exclude is not None and start <= exclude[0] < end:
+                    self._write_range(writer, start, exclude[0])
+                    writer.split()
+                    self._write_range(writer, exclude[1], end)
+                else:
+                    self._write_range(writer, start, end)
+
+        for i, block in enumerate(self._source_blocks):
+            write_pending(block.start)
+            if i not in split_blocks:
+                writer.set_base(block.entry_base)
+                writer.raw(source[block.text_start : block.text_end])
+                writer.base = block.exit_base
+                continue
+            for record in self._iter_source_records(block):
+                line_start, line_end, record_type, address, length, base = record
+                if record_type == RecordType.DATA:
+                    if _intersects(dirty, address, address + length):
+                        continue
+                    write_pending(address)
+                    writer.set_base(base)
+                writer.raw(source[line_start:line_end])
+                if record_type in (
+                    RecordType.EXTENDED_SEGMENT_ADDRESS,
+                    RecordType.EXTENDED_LINEAR_ADDRESS,
+                ):
+                    writer.base = base
+        write_pending(1 << 64)
+
+        writer.raw(source[self._source_tail[0] : self._source_tail[1]])
+        return writer
+
+    def _encode_all(self) -> _RecordWriter:
+        """Write all the data with the same layout as IntelHex."""
+        writer = _RecordWriter(base=self._initial_base())
+        self._write_start_address(writer)
+        for start in self._starts:
+            writer.data(start, self._segments[start])
+        return writer
+
+    def _initial_base(self) -> int:
+        """Base address for a new output, -1 forces a first address record."""
+        max_address = self.maxaddr()
+        return -1 if max_address is not None and max_address > 0xFFFF else 0
+
+    def _write_start_address(self, writer: _RecordWriter) -> None:
+        """Add the start address record, if the image has one."""
+        if "EIP" in self.start_addr:
+            eip = self.start_addr["EIP"].to_bytes(4, "big")
+            writer.record(RecordType.START_LINEAR_ADDRESS, 0, eip)
+        elif self.start_addr:
+            cs_ip = self.start_addr["CS"].to_bytes(2, "big") + self.start_addr[
+                "IP"
+            ].to_bytes(2, "big")
+            writer.record(RecordType.START_SEGMENT_ADDRESS, 0, cs_ip)
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Lazy, read-only access to Intel Hex data.
+
+Detecting the device information of a MicroPython hex only needs a few dozen
+bytes from the UICR, the Flash Regions Table and the version string, but
+parsing the whole file decodes and validates every record.
+
+A HexIndex only locates the extended address records when it is created.
+The data records of a 64KB address block are indexed by their address the
+first time the block is read, which also checks the start code, header and
+record type of its records, and a record is only fully decoded and validated when its
+data is read.
+"""
+
+from __future__ import annotations
+
+import binascii
+from bisect import bisect_left, bisect_right
+from itertools import repeat
+from operator import itemgetter
+from typing import NamedTuple, NoReturn, Optional
+
+from micropython_microbit_fs.exceptions import InvalidHexError
+from micropython_microbit_fs.hex_image import (
+    END_OF_FILE_RECORD,
+    HexData,
+    HexImage,
+    RecordType,
+    _decode_record,
+    _merge_ranges,
+    hex_data_to_text,
+)
+
+_MAX_RECORD_LENGTH = 0xFF
+"""Largest data length of a single record."""
+
+_EXTENDED_ADDRESS_PREFIX = ":020000"
+"""Start of the Extended Segment and Linear Address records."""
+
+_RECORD_TYPE_FIELDS = frozenset(
+    f"{record_type:02X}"
+    for record_type in range(RecordType.DATA, RecordType.START_LINEAR_ADDRESS + 1)
+)
+"""Record type fields of the supported record types."""
+
+_LENGTH_FIELD = itemgetter(slice(1, 3))
+"""Get the data length field from a record line."""
+
+_OFFSET_FIELD = itemgetter(slice(3, 7))
+"""Get the address offset field from a record line."""
+
+
+class _Block(NamedTuple):
+    """Text span of data records sharing the same extended address."""
+
+    base: int
+    text_start: int
+    text_end: int
+
+
+class _BlockIndex(NamedTuple):
+    """Data records in a block, sorted by address."""
+
+    offsets: list[int]
+    lengths: list[int]
+    lines: list[str]
+
+
+class HexIndex:
+    """
+    Read-only view of Intel Hex data that decodes records on demand.
+
+    Implements the read methods of HexImage used for device detection:
+    byte indexing, ``gets`` and ``minaddr``/``maxaddr``. Lines that are not
+    records, or have an unsupported record type, raise InvalidHexError when
+    their block is indexed, but the data
+    and checksum are only validated for the records that are read.
+    """
+
+    def __init__(self, hex_data: HexData) -> None:
+        """
+        :param hex_data: Intel Hex file content as a string or ASCII bytes.
+        :raises InvalidHexError: If an extended address record is malformed.
+        """
+        self.padding = 0xFF
+        """Value returned for addresses without data."""
+
+        self._text = hex_data_to_text(hex_data)
+        self._blocks: list[_Block] = []
+        self._indexes: dict[int, _BlockIndex] = {}
+        self._decoded: dict[tuple[int, int], bytes] = {}
+        # Last address range looked up by __getitem__, and its data if any
+        self._last: tuple[int, int, Optional[bytes]] = (0, 0, None)
+        self._find_blocks()
+
+        # Blocks sorted by address, to find the blocks covering an address
+        self._order = sorted(range(len(self._blocks)), key=self._block_base)
+        self._bases = [self._blocks[i].base for i in self._order]
+
+    def _block_base(self, block_id: int) -> int:
+        return self._blocks[block_id].base
+
+    def _find_blocks(self) -> None:
+        """Split the text at each extended address record."""
+        text = self._text
+        end = text.find(END_OF_FILE_RECORD[:9])
+        if end < 0:
+            end = len(text)
+
+        base = 0
+        block_start = 0
+        position = text.find(_EXTENDED_ADDRESS_PREFIX, 0, end)
+        while position >= 0:
+            line_end = text.find("\n", position, end)
+            if line_end < 0:
+                line_end = end
+            record_type = text[position + 7 : position + 9]
+            if record_type in ("02", "04"):
+                self._blocks.append(_Block(base, block_start, position))
+                record = self._decode(text[position:line_end], position)
+                if record[0] != 2:
+                    line_number = self._line_number(position)
+                    raise InvalidHexError(
+                        f"Line {line_number}: Invalid extended address record"
+                    )
+                value = (record[4] << 8) | record[5]
+                base = value << 16 if record_type == "04" else value << 4
+                block_start = line_end
+            position = text.find(_EXTENDED_ADDRESS_PREFIX, line_end, end)
+        self._blocks.append(_Block(base, block_start, end))
+
+    def _index(self, block_id: int) -> _BlockIndex:
+        """Index the data records of a block by their address."""
+        index = self._indexes.get(block_id)
+        if index is not None:
+            return index
+
+        block = self._blocks[block_id]
+        lines = self._text[block.text_start : block.text_end].split("\n")
+        self._check_headers(lines, block.text_start)
+        lines = [line for line in lines if line[7:9] == "00" and line[1:3] != "00"]
+        try:
+            offsets = list(map(int, map(_OFFSET_FIELD, lines), repeat(16)))
+            lengths = list(map(int, map(_LENGTH_FIELD, lines), repeat(16)))
+        except ValueError as e:
+            raise InvalidHexError(f"Invalid record header: {e}") from e
+        index = _BlockIndex(offsets, lengths, lines)
+        if offsets != sorted(offsets):
+            order = sorted(range(len(offsets)), key=offsets.__getitem__)
+            index = _BlockIndex(
+                [offsets[i] for i in order],
+                [lengths[i] for i in order],
+                [lines[i] for i in order],
+            )
+        self._indexes[block_id] = index
+        return index
+
+    def _check_headers(self, lines: list[str], position: int) -> None:
+        """
+        Check the start code, header and record type of every line in a block.
+
+        Only the record data and checksum are left to be validated when the
+        record is read.
+        """
+        headers = [line[1:9] for line in lines if line[:1] == ":" and len(line) >= 11]
+        if len(headers) == len(lines) - lines.count(""):
+            try:
+                binascii.unhexlify("".join(headers))
+            except (binascii.Error, ValueError):
+                pass
+            else:
+                if {header[6:] for header in headers} <= _RECORD_TYPE_FIELDS:
+                    return
+        for line in lines:
+            if not line.strip():
+                continue
+            if line[:1] == ":" and len(line) >= 11:
+                try:
+                    record_type = binascii.unhexlify(line[1:9])[3]
+                except (binascii.Error, ValueError):
+                    pass
+                else:
+                    if record_type <= RecordType.START_LINEAR_ADDRESS:
+                        continue
+                    self._raise_first_error(self._text.find(line, position))
+            # Raises the error with the line number of the invalid record
+            self._decode(line, position)
+
+    def _raise_first_error(self, position: int) -> NoReturn:
+        """
+        Raise the error of the full parser for an unsupported record.
+
+        The text is parsed up to the record at ``position``, so an earlier
+        invalid record in the file is reported instead, like HexImage does.
+        """
+        line_end = self._text.find("\n", position)
+        HexImage.from_string(self._text[: None if line_end < 0 else line_end])
+        line_number = self._line_number(position)
+        raise InvalidHexError(f"Line {line_number}: Unsupported record type")
+
+    def _line_number(self, position: int) -> int:
+        """Return the line number of a text position."""
+        return self._text.count("\n", 0, position) + 1
+
+    def _decode(self, line: str, position: int) -> bytes:
+        """Decode a record, only counting its line number if it is invalid."""
+        line = line.strip()
+        try:
+            return _decode_record(line, 0)
+        except InvalidHexError:
+            line_number = self._line_number(self._text.find(line, position))
+            _decode_record(line, line_number)
+            raise
+
+    def _record_data(self, block_id: int, i: int) -> bytes:
+        """Decode and validate the data of a record in a block."""
+        key = (block_id, i)
+        data = self._decoded.get(key)
+        if data is None:
+            index = self._index(block_id)
+            text_start = self._blocks[block_id].text_start
+            record = self._decode(index.lines[i], text_start)
+            data = self._decoded[key] = record[4:-1]
+        return data
+
+    def gets(self, address: int, length: int) -> bytes:
+        """
+        Read a range of bytes, filling addresses without data with padding.
+
+        :param address: Start address to read from.
+        :param length: Number of bytes to read.
+        :returns: The bytes at the address range.
+        """
+        end = address + length
+        result = bytearray([self.padding]) * length
+        # Records can extend up to 255 bytes past the end of their block
+        first = bisect_left(self._bases, address - 0xFFFF - _MAX_RECORD_LENGTH)
+        last = bisect_right(self._bases, end - 1)
+        for block_id in self._order[first:last]:
+            base = self._blocks[block_id].base
+            index = self._index(block_id)
+            i = bisect_left(index.offsets, address - base - _MAX_RECORD_LENGTH)
+            j = bisect_right(index.offsets, end - 1 - base)
+            for k in range(i, j):
+                record_start = base + index.offsets[k]
+                if record_start + index.lengths[k] <= address:
+                    continue
+                data = self._record_data(block_id, k)
+                start = max(address, record_start)
+                stop = min(end, record_start + len(data))
+                if start < stop:
+                    result[start - address : stop - address] = data[
+                        start - record_start : stop - record_start
+                    ]
+        return bytes(result)
+
+    def view(self, address: int, length: int) -> memoryview:
+        """
+        Read a range of bytes without copying them, if possible.
+
+        A range inside a single record is returned as a view of the decoded
+        record data, other ranges are read with ``gets``.
+
+        :param address: Start address to read from.
+        :param length: Number of bytes to read.
+        :returns: Read-only memoryview of the bytes at the address range.
+        """
+        start, end, data = self._last = self._locate(address)
+        if data is not None and address + length <= end:
+            return memoryview(data)[address - start : address - start + length]
+        return memoryview(self.gets(address, length))
+
+    def __getitem__(self, address: int) -> int:
+        start, end, data = self._last
+        if not start <= address < end:
+            start, end, data = self._last = self._locate(address)
+        return self.padding if data is None else data[address - start]
+
+    def _locate(self, address: int) -> tuple[int, int, Optional[bytes]]:
+        """
+        Find the record containing an address.
+
+        :param address: Address to look up.
+        :returns: Tuple of (start, end, data) with the record address range
+            and data, or with data None for the range without data from the
+            address to the next record.
+        """
+        last = bisect_right(self._bases, address)
+        gap_end = self._bases[last] if last < len(self._bases) else 1 << 64
+        first = bisect_left(self._bases, address - 0xFFFF - _MAX_RECORD_LENGTH)
+        for block_id in self._order[first:last]:
+            base = self._blocks[block_id].base
+            index = self._index(block_id)
+            i = bisect_left(index.offsets, address - base - _MAX_RECORD_LENGTH)
+            j = bisect_right(index.offsets, address - base)
+            for k in range(i, j):
+                record_start = base + index.offsets[k]
+                if address < record_start + index.lengths[k]:
+                    data = self._record_data(block_id, k)
+                    return record_start, record_start + len(data), data
+            if j < len(index.offsets):
+                gap_end = min(gap_end, base + index.offsets[j])
+        return address, gap_end, None
+
+    def segments(self) -> list[tuple[int, int]]:
+        """
+        Return the address ranges containing data.
+
+        Only the record headers are read, the record data is not decoded.
+
+        :returns: List of (start, end) tuples, end address exclusive.
+        """
+        records: list[tuple[int, int]] = []
+        for block_id in self._order:
+            base = self._blocks[block_id].base
+            index = self._index(block_id)
+            records.extend(
+                (base + offset, base + offset + length)
+                for offset, length in zip(index.offsets, index.lengths)
+            )
+        # Blocks with the same extended address can have interleaved records
+        return _merge_ranges(records)
+
+    def minaddr(self) -> Optional[int]:
+        """Return the lowest address with data, or None if there is no data."""
+        addresses: list[int] = []
+        for block_id in self._order:
+            index = self._index(block_id)
+            if index.offsets:
+                addresses.append(self._blocks[block_id].base + index.offsets[0])
+        return min(addresses, default=None)
+
+    def maxaddr(self) -> Optional[int]:
+        """Return the highest address with data, or None if there is no data."""
+        addresses: list[int] = []
+        for block_id in self._order:
+            index = self._index(block_id)
+            if not index.offsets:
+                continue
+            # Only the last records can reach the end of the block data
+            i = bisect_left(index.offsets, index.offsets[-1] - _MAX_RECORD_LENGTH)
+            base = self._blocks[block_id].base
+            addresses.extend(
+                base + index.offsets[k] + index.lengths[k] - 1
+                for k in range(i, len(index.offsets))
+            )
+        return max(addresses, default=None)
@@ -1,51 +1,74 @@
 #!/usr/bin/env python3
 """Intel Hex utilities for reading data from hex files."""
 
-from io import StringIO
+from __future__ import annotations
 
-from intelhex import IntelHex
+import mmap
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
 
+from micropython_microbit_fs.hex_image import HexData, HexImage, HexReader
 
-def load_hex(hex_data: str) -> IntelHex:
+
+def load_hex(hex_data: HexData) -> HexImage:
+    """
+    Load Intel Hex data from a string or an ASCII encoded buffer.
+
+    :param hex_data: Intel Hex file content as a string, bytes, or buffer.
+    :returns: HexImage object for accessing the data.
+    """
+    if isinstance(hex_data, str):
+        return HexImage.from_string(hex_data)
+    return HexImage.from_bytes(hex_data)
+
+
+@contextmanager
+def map_hex_file(path: str | os.PathLike[str]) -> Iterator[HexData]:
     """
-    Load Intel Hex data from a string.
+    Memory-map an Intel Hex file for reading.
 
-    :param hex_data: Intel Hex file content as a string.
-    :returns: IntelHex object for accessing the data.
+    The file content is read from the page cache without a bytes copy of the
+    file, the parsers then decode the buffer to a string once.
+
+    :param path: Path to the Intel Hex file.
+    :returns: Context manager yielding a read-only buffer with the file content.
     """
-    ih = IntelHex()
-    ih.loadhex(StringIO(hex_data))
-    return ih
+    with open(path, "rb") as f:
+        # Empty files cannot be mapped
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
 
 
-def hex_to_string(ih: IntelHex) -> str:
+def hex_to_string(ih: HexImage) -> str:
     """
-    Convert an IntelHex object back to a hex string.
+    Convert a HexImage object back to a hex string.
 
-    :param ih: IntelHex object.
+    :param ih: HexImage object.
     :returns: Intel Hex file content as a string.
     """
-    output = StringIO()
-    ih.write_hex_file(output)
-    return output.getvalue()
+    return ih.to_string()
 
 
-def read_uint8(ih: IntelHex, address: int) -> int:
+def read_uint8(ih: HexReader, address: int) -> int:
     """
     Read an unsigned 8-bit integer from the hex data.
 
-    :param ih: IntelHex object.
+    :param ih: HexImage or HexIndex object.
     :param address: Address to read from.
     :returns: The byte value at the address.
     """
     return int(ih[address])
 
 
-def read_uint16(ih: IntelHex, address: int, little_endian: bool = True) -> int:
+def read_uint16(ih: HexReader, address: int, little_endian: bool = True) -> int:
     """
     Read an unsigned 16-bit integer from the hex data.
 
-    :param ih: IntelHex object.
+    :param ih: HexImage or HexIndex object.
     :param address: Address to read from.
     :param little_endian: If True, use little-endian byte order (default: True).
     :returns: The 16-bit value at the address.
@@ -56,11 +79,11 @@ def read_uint16(ih: IntelHex, address: int, little_endian: bool = True) -> int:
         return int((ih[address] << 8) | ih[address + 1])
 
 
-def read_uint32(ih: IntelHex, address: int, little_endian: bool = True) -> int:
+def read_uint32(ih: HexReader, address: int, little_endian: bool = True) -> int:
     """
     Read an unsigned 32-bit integer from the hex data.
 
-    :param ih: IntelHex object.
+    :param ih: HexImage or HexIndex object.
     :param address: Address to read from.
     :param little_endian: If True, use little-endian byte order (default: True).
     :returns: The 32-bit value at the address.
@@ -81,51 +104,49 @@ def read_uint32(ih: IntelHex, address: int, little_endian: bool = True) -> int:
         )
 
 
-def read_bytes(ih: IntelHex, address: int, length: int) -> bytes:
+def read_bytes(ih: HexReader, address: int, length: int) -> memoryview:
     """
     Read a sequence of bytes from the hex data.
 
-    :param ih: IntelHex object.
+    :param ih: HexImage or HexIndex object.
     :param address: Start address to read from.
     :param length: Number of bytes to read.
-    :returns: The bytes at the address range.
+    :returns: Read-only view of the bytes at the address range, without
+        copying them when the range is contiguous data.
     """
-    return bytes(ih[address + i] for i in range(length))
+    return ih.view(address, length)
 
 
-def read_string(ih: IntelHex, address: int, max_length: int = 256) -> str:
+def read_string(ih: HexReader, address: int, max_length: int = 256) -> str:
     """
     Read a null-terminated string from the hex data.
 
-    :param ih: IntelHex object.
+    :param ih: HexImage or HexIndex object.
     :param address: Start address to read from.
     :param max_length: Maximum length to read (default 256).
     :returns: The string at the address (decoded as UTF-8).
     """
-    chars = []
-    for i in range(max_length):
-        byte = ih[address + i]
-        if byte == 0:
-            break
-        chars.append(byte)
-    return bytes(chars).decode("utf-8", errors="replace")
+    data = ih.view(address, max_length).tobytes()
+    end = data.find(b"\0")
+    if end >= 0:
+        data = data[:end]
+    return data.decode("utf-8", errors="replace")
 
 
-def has_data_at(ih: IntelHex, address: int, length: int = 1) -> bool:
+def has_data_at(
+    ih: HexImage, address: int, length: int = 1, partial: bool = False
+) -> bool:
     """
     Check if the hex file has data at the specified address range.
 
-    The intelhex library returns 0xFF for addresses without data,
-    so we check if the address is within the actual data range.
+    HexImage returns 0xFF for addresses without data, so the range is
+    checked against the image segments.
 
-    :param ih: IntelHex object.
+    :param ih: HexImage object.
     :param address: Start address to check.
     :param length: Number of bytes to check (default 1).
-    :returns: True if there is data at all addresses in the range.
-    """
-    if not ih.minaddr() <= address <= ih.maxaddr():
-        return False
-    if not ih.minaddr() <= address + length - 1 <= ih.maxaddr():
-        return False
-    # Check if any address in range is in the actual data
-    return any(addr in ih.addresses() for addr in range(address, address + length))
+    :param partial: If True, check for data at any address in the range.
+    :returns: True if there is data at all addresses in the range, or at any
+        of them with ``partial``.
+    """
+    return ih.has_data(address, length, partial=partial)
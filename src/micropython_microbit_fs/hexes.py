@@ -19,33 +19,203 @@ not the filename.
 Example paths:
     - hexes/microbitv1/v1.1.1/micropython-microbit-v1.1.1.hex
     - hexes/microbitv2/v2.1.2/micropython-microbit-v2.1.2.hex
+
+Each version folder also contains a `metadata.json` file with the device
+information of the hex file, precomputed so that it doesn't have to be parsed.
+The metadata files are generated with `python make.py hex-metadata`.
+
+The parsed firmware of a bundled hex can be saved as a binary image in the
+user cache directory the first time it is loaded, see
+MicroPythonHex.load_firmware().
 """
 
 from __future__ import annotations
 
+import hashlib
+import json
+import os
 import re
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, field
+from functools import cache
 from importlib import resources
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Optional
 
 from packaging.version import Version
 
-from micropython_microbit_fs.exceptions import HexNotFoundError
+from micropython_microbit_fs.device_info import (
+    DeviceInfo,
+    device_info_from_dict,
+    device_info_to_dict,
+)
+from micropython_microbit_fs.exceptions import HexNotFoundError, InvalidHexError
+from micropython_microbit_fs.filesystem import (
+    ChunkAllocator,
+    get_fs_end_address,
+    get_fs_start_address,
+)
+from micropython_microbit_fs.firmware import (
+    load_firmware,
+    load_firmware_image,
+    save_firmware_image,
+)
+from micropython_microbit_fs.hex_image import HexImage
+from micropython_microbit_fs.hex_utils import load_hex
 
 # Regex patterns for device/version folders
 DEVICE_FOLDER_PATTERN = re.compile(r"^microbitv(\d+)$")
 VERSION_FOLDER_PATTERN = re.compile(r"^v(\d+\.\d+\.\d+)$")
 
+METADATA_FILENAME = "metadata.json"
+"""Name of the file with the precomputed metadata in each version folder."""
+
+CACHE_DIR_ENV = "MICROBIT_FS_CACHE_DIR"
+"""Environment variable to set the cache directory of get_cache_dir()."""
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, init=False)
 class MicroPythonHex:
     """Metadata and contents for a bundled MicroPython hex file."""
 
     file_path: Path
     version: str
     device_version: int
-    content: str
+    content: str = field(compare=False, repr=False)
+    """The hex file content. If None is given to the constructor, it's read
+    from ``file_path`` the first time it's used."""
+
+    device_info: DeviceInfo
+    """Device information of the MicroPython hex."""
+
+    fs_start_address: int
+    """Effective filesystem start address, see get_fs_start_address()."""
+
+    fs_end_address: int
+    """Effective filesystem end address, see get_fs_end_address()."""
+
+    free_chunks: int
+    """Number of free filesystem chunks in the hex file."""
+
+    sha256: str
+    """SHA-256 hex digest of the hex file content."""
+
+    def __init__(
+        self,
+        file_path: Path,
+        version: str,
+        device_version: int,
+        content: Optional[str],
+        device_info: DeviceInfo,
+        fs_start_address: int,
+        fs_end_address: int,
+        free_chunks: int,
+        sha256: str,
+    ) -> None:
+        if content is not None and not isinstance(content, str):
+            raise TypeError(
+                f"MicroPythonHex content must be a str or None, "
+                f"not {type(content).__name__}"
+            )
+        # The dataclass is frozen, so the fields are set with object.__setattr__
+        object.__setattr__(self, "file_path", file_path)
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "device_version", device_version)
+        if content is not None:
+            # Otherwise it's read by __getattr__ on first use
+            object.__setattr__(self, "content", content)
+        object.__setattr__(self, "device_info", device_info)
+        object.__setattr__(self, "fs_start_address", fs_start_address)
+        object.__setattr__(self, "fs_end_address", fs_end_address)
+        object.__setattr__(self, "free_chunks", free_chunks)
+        object.__setattr__(self, "sha256", sha256)
+
+    if not TYPE_CHECKING:
+        # Hidden from type checkers, so other unknown attributes are errors
+
+        def __getattr__(self, name: str) -> Any:
+            """Read the content the first time it's used, and keep it."""
+            if name != "content" or "file_path" not in self.__dict__:
+                raise AttributeError(
+                    f"{type(self).__name__!r} object has no attribute {name!r}"
+                )
+            content = self.file_path.read_text()
+            object.__setattr__(self, "content", content)
+            return content
+
+    def load_firmware(self) -> tuple[HexImage, DeviceInfo]:
+        """Load the parsed firmware from a binary image in the user cache.
+
+        The first time, the hex is parsed and saved as a binary image in the
+        cache directory (see get_cache_dir()), so later calls, also from other
+        processes, only have to read the image and hex files. An image saved
+        from a hex file with a different SHA-256 digest is ignored and
+        replaced.
+
+        The returned image keeps the hex records like a parsed hex, so it can
+        be used with add_files() or FirmwareTemplate.from_image().
+
+        :return: Tuple of (hex image, device information).
+        """
+        image_path = get_cache_dir() / f"{self.sha256}.bin"
+        content = self.content
+        try:
+            return load_firmware_image(image_path, self.sha256, content)
+        except (OSError, InvalidHexError):
+            pass
+
+        ih = load_hex(content)
+        try:
+            image_path.parent.mkdir(parents=True, exist_ok=True)
+            content_sha256 = hashlib.sha256(content.encode()).hexdigest()
+            save_firmware_image(image_path, ih, self.device_info, content_sha256)
+        except OSError:
+            # The cache is optional, for example in a read-only file system
+            pass
+        return ih, self.device_info
+
+
+def get_cache_dir() -> Path:
+    """Get the directory for the binary images of the bundled hex files.
+
+    Defaults to the user cache directory, and can be changed with the
+    ``MICROBIT_FS_CACHE_DIR`` environment variable.
+
+    :return: Path to the cache directory, it might not exist yet.
+    """
+    cache_dir = os.environ.get(CACHE_DIR_ENV)
+    if cache_dir:
+        return Path(cache_dir)
+    if sys.platform == "win32":
+        base_dir = Path(os.environ.get("LOCALAPPDATA", Path.home()))
+    else:
+        base_dir = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    return base_dir / "micropython-microbit-fs"
+
+
+def build_hex_metadata(hex_content: str) -> dict[str, Any]:
+    """Parse a MicroPython hex file to create its metadata.
+
+    :param hex_content: The MicroPython Intel Hex file content.
+    :return: JSON serialisable metadata, as stored in the metadata file.
+    """
+    ih, device_info = load_firmware(hex_content)
+    return {
+        "sha256": hashlib.sha256(hex_content.encode()).hexdigest(),
+        "device_info": device_info_to_dict(device_info),
+        "fs_start_address": get_fs_start_address(device_info),
+        "fs_end_address": get_fs_end_address(device_info),
+        "free_chunks": ChunkAllocator.from_hex(ih, device_info).free_count,
+    }
+
+
+def _read_metadata(hex_file: Path) -> dict[str, Any]:
+    """Read the metadata file of a hex, or parse the hex if there isn't one."""
+    metadata_path = hex_file.parent / METADATA_FILENAME
+    if metadata_path.exists():
+        metadata: dict[str, Any] = json.loads(metadata_path.read_text())
+        return metadata
+    return build_hex_metadata(hex_file.read_text())
 
 
 def _get_hexes_dir() -> Path:
@@ -54,6 +224,40 @@ def _get_hexes_dir() -> Path:
     return Path(str(resources.files("micropython_microbit_fs") / "hexes"))
 
 
+@cache
+def _get_bundled_index() -> dict[int, dict[str, Path]]:
+    """Find the bundled hex files, only walking the hexes directory once.
+
+    :return: Mapping of device version to a mapping of MicroPython versions to
+        their hex file path, sorted newest first.
+    """
+    index: dict[int, dict[str, Path]] = {}
+    for device_dir in _get_hexes_dir().iterdir():
+        device_match = DEVICE_FOLDER_PATTERN.match(device_dir.name)
+        if not device_dir.is_dir() or not device_match:
+            continue
+        hex_paths: dict[str, Path] = {}
+        for version_folder in device_dir.iterdir():
+            if not version_folder.is_dir():
+                continue
+            match = VERSION_FOLDER_PATTERN.match(version_folder.name)
+            if match:
+                # Hex filename is not important, but ensure exactly one exists
+                hex_files = [
+                    p for p in version_folder.iterdir() if p.suffix.lower() == ".hex"
+                ]
+                if len(hex_files) != 1:
+                    raise HexNotFoundError(
+                        f"Unexpected number of hex files found in path {version_folder} (should be exactly 1)."
+                    )
+                hex_paths[match.group(1)] = hex_files[0]
+        index[int(device_match.group(1))] = {
+            version: hex_paths[version]
+            for version in sorted(hex_paths, key=Version, reverse=True)
+        }
+    return index
+
+
 def list_bundled_versions(device_version: Optional[int] = None) -> dict[int, list[str]]:
     """List available MicroPython versions.
 
@@ -66,50 +270,10 @@ def list_bundled_versions(device_version: Optional[int] = None) -> dict[int, lis
     :param device_version: The micro:bit device version (1 or 2). ``None`` lists all.
     :return: Mapping of device version to sorted versions (newest first).
     """
-    hexes_dir = _get_hexes_dir()
-
-    # Determine which device folders to inspect
-    target_devices: list[int]
-    if device_version is None:
-        target_devices = []
-        for entry in hexes_dir.iterdir():
-            if not entry.is_dir():
-                continue
-            match = DEVICE_FOLDER_PATTERN.match(entry.name)
-            if match:
-                target_devices.append(int(match.group(1)))
-    else:
-        target_devices = [device_version]
-
-    versions_by_device: dict[int, list[str]] = {}
-
-    for target in target_devices:
-        device_dir = hexes_dir / f"microbitv{target}"
-        versions: list[str] = []
-
-        if device_dir.exists():
-            for version_folder in device_dir.iterdir():
-                if not version_folder.is_dir():
-                    continue
-                match = VERSION_FOLDER_PATTERN.match(version_folder.name)
-                if match:
-                    semver = match.group(1)
-                    # Hex filename is not important, but ensure exactly one exists
-                    hex_files = [
-                        p
-                        for p in version_folder.iterdir()
-                        if p.suffix.lower() == ".hex"
-                    ]
-                    if len(hex_files) != 1:
-                        raise HexNotFoundError(
-                            f"Unexpected number of hex files found in path {version_folder} (should be exactly 1)."
-                        )
-                    versions.append(semver)
-
-        versions.sort(key=lambda v: Version(v), reverse=True)
-        versions_by_device[target] = versions
-
-    return versions_by_device
+    index = _get_bundled_index()
+    if device_version is not None:
+        return {device_version: list(index.get(device_version, {}))}
+    return {device: list(versions) for device, versions in index.items()}
 
 
 def get_bundled_hex(
@@ -117,10 +281,14 @@ def get_bundled_hex(
 ) -> MicroPythonHex:
     """Get a bundled MicroPython hex file and metadata.
 
+    The hex file content is only read when the ``content`` attribute is used,
+    and the returned objects are cached, so repeated calls are free.
+
     :param device_version: The micro:bit device version (1 or 2).
     :param version: Optional MicroPython version string (e.g., "1.1.0").
         If not provided, returns the latest available version.
-    :return: A frozen dataclass with filename, version string, and file contents.
+    :return: A frozen dataclass with filename, version string, file contents,
+        and the precomputed device information.
     :raises HexNotFoundError: If no hex file is found for the specified
         device/version.
 
@@ -136,16 +304,15 @@ def get_bundled_hex(
         >>> hex_file.content[:2]
         '::'
     """
-    available_versions_map = list_bundled_versions(device_version)
-    available_versions = available_versions_map.get(device_version, [])
+    available_versions = _get_bundled_index().get(device_version, {})
     if not available_versions:
         raise HexNotFoundError(
             f"No bundled MicroPython hex files found for micro:bit V{device_version}."
         )
 
     if version is None:
-        # Use the latest version (first in the sorted list)
-        selected_version = available_versions[0]
+        # Use the latest version (first in the sorted index)
+        selected_version = next(iter(available_versions))
     else:
         if version not in available_versions:
             raise HexNotFoundError(
@@ -154,13 +321,37 @@ def get_bundled_hex(
             )
         selected_version = version
 
-    # list_bundled_versions() ensures a single hex file exists in the version folder
-    hex_path = _get_hexes_dir() / f"microbitv{device_version}" / f"v{selected_version}"
-    hex_files = [p for p in hex_path.iterdir() if p.suffix.lower() == ".hex"]
-    hex_file = hex_files[0]
+    return _load_bundled_hex(device_version, selected_version)
+
+
+@cache
+def _load_bundled_hex(device_version: int, version: str) -> MicroPythonHex:
+    """Create the MicroPythonHex of a bundled hex from its metadata."""
+    hex_file = _get_bundled_index()[device_version][version]
+    metadata = _read_metadata(hex_file)
     return MicroPythonHex(
         file_path=hex_file,
-        version=selected_version,
+        version=version,
         device_version=device_version,
-        content=hex_file.read_text(),
+        content=None,
+        device_info=device_info_from_dict(metadata["device_info"]),
+        fs_start_address=metadata["fs_start_address"],
+        fs_end_address=metadata["fs_end_address"],
+        free_chunks=metadata["free_chunks"],
+        sha256=metadata["sha256"],
     )
+
+
+def write_bundled_metadata() -> list[Path]:
+    """Generate the metadata file for every bundled hex file.
+
+    :return: Paths of the metadata files written.
+    """
+    written: list[Path] = []
+    for hex_files in _get_bundled_index().values():
+        for hex_file in hex_files.values():
+            metadata = build_hex_metadata(hex_file.read_text())
+            metadata_path = hex_file.parent / METADATA_FILENAME
+            metadata_path.write_text(json.dumps(metadata, indent=2) + "\n")
+            written.append(metadata_path)
+    return written
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Editable in-memory MicroPython filesystem.
+
+The add_files() function parses the firmware and serialises a new hex file on
+every call, and can only add files into free chunks. A MicroPythonFilesystem
+loads the firmware and its chunk table once, and then files can be written,
+removed and renamed any number of times before generating a new hex file.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from typing import Optional
+
+from micropython_microbit_fs.file import File, files_to_dict
+from micropython_microbit_fs.filesystem import (
+    CHUNK_SIZE,
+    ChunkAllocator,
+    FileEntry,
+    build_file_chunks,
+    chunk_index_to_address,
+    get_chunk_count,
+    get_fs_end_address,
+    get_fs_start_address,
+    read_file_entries,
+    set_persistent_page,
+)
+from micropython_microbit_fs.firmware import (
+    FirmwareCache,
+    load_firmware,
+    split_fs_region,
+)
+from micropython_microbit_fs.hex_image import HexData, HexImage
+
+
+class MicroPythonFilesystem:
+    """
+    MicroPython filesystem of a hex file that can be modified in memory.
+
+    Example::
+
+        >>> import micropython_microbit_fs as micropython
+        >>> fs = micropython.MicroPythonFilesystem(micropython_hex)
+        >>> fs.write("main.py", b"print('Hello!')")
+        >>> fs.rename("main.py", "hello.py")
+        >>> fs.ls()
+        ['hello.py']
+        >>> new_hex = fs.to_hex()
+    """
+
+    def __init__(self, hex_data: HexData, cache: Optional[FirmwareCache] = None):
+        """
+        :param hex_data: Intel Hex file content as a string or ASCII bytes.
+        :param cache: Optional FirmwareCache to reuse previously parsed firmware.
+
+        :raises InvalidHexError: If the hex data is invalid.
+        :raises NotMicroPythonError: If the hex does not contain MicroPython.
+        :raises FilesystemError: If the filesystem structure is corrupted.
+        """
+        if cache is not None:
+            ih, self.device_info = cache.get(hex_data)
+        else:
+            ih, self.device_info = load_firmware(hex_data)
+        self._fs_start = get_fs_start_address(self.device_info)
+        chunk_count = get_chunk_count(self.device_info)
+
+        self._split, self._fs_segments = split_fs_region(ih, self.device_info)
+        # Full flash pages of the loaded filesystem region, to compare with
+        self._fs_end = get_fs_end_address(self.device_info)
+        page_size = self.device_info.flash_page_size
+        self._pages_start = self._fs_start - self._fs_start % page_size
+        self._loaded_pages = ih.gets(
+            self._pages_start, self._fs_end - self._pages_start
+        )
+        self._fs_data = bytearray(ih.gets(self._fs_start, chunk_count * CHUNK_SIZE))
+        self._allocator = ChunkAllocator.from_hex(ih, self.device_info)
+        self._files = read_file_entries(ih, self.device_info)
+        # Chunks written or erased since the hex was loaded
+        self._modified: set[int] = set()
+
+    def ls(self) -> list[str]:
+        """
+        List the files in the filesystem.
+
+        :returns: The filenames, in the order they are stored.
+        """
+        return sorted(self._files, key=lambda name: self._files[name].chunks[0])
+
+    def exists(self, filename: str) -> bool:
+        """
+        Check if a file exists in the filesystem.
+
+        :param filename: Name of the file.
+        :returns: True if the file exists.
+        """
+        return filename in self._files
+
+    def read(self, filename: str) -> bytes:
+        """
+        Read the content of a file.
+
+        :param filename: Name of the file.
+        :returns: The file content.
+        :raises FileNotFoundError: If the file does not exist.
+        """
+        return self._get_entry(filename).content
+
+    def files(self) -> list[File]:
+        """
+        Get all the files in the filesystem.
+
+        :returns: List of File objects, in the order they are stored.
+        """
+        return [File(name, self._files[name].content) for name in self.ls()]
+
+    @property
+    def free_space(self) -> int:
+        """Free filesystem space in bytes, comparable to File.size_fs."""
+        return self._allocator.free_count * CHUNK_SIZE
+
+    def write(self, filename: str, content: bytes) -> None:
+        """
+        Write a file, replacing it if it already exists.
+
+        :param filename: Name of the file.
+        :param content: The file content.
+        :raises InvalidFileError: If the file has invalid name or content.
+        :raises StorageFullError: If the file doesn't fit in the filesystem.
+            The filesystem is not modified in this case.
+        """
+        entry = self._files.get(filename)
+        if entry is not None and entry.content == content:
+            # Leave the chunks of unchanged files in place
+            return
+        self._store(filename, content, replaces=filename)
+
+    def sync(self, files: list[File]) -> list[str]:
+        """
+        Make the filesystem contain exactly the given files.
+
+        The new files are compared with the files already in the filesystem,
+        and only the chunks of the files that have been added, changed or
+        removed are rewritten. Unchanged files stay in the same chunks.
+
+        :param files: List of File objects the filesystem should contain.
+        :returns: Names of the files that have been added, changed or removed.
+        :raises InvalidFileError: If a file has invalid name or content, or
+            there are duplicate filenames.
+        :raises StorageFullError: If the files don't fit in the filesystem.
+            The filesystem is not modified in this case.
+        """
+        new_files = files_to_dict(files)
+        removed = [name for name in self.ls() if name not in new_files]
+        changed = [
+            name
+            for name, content in new_files.items()
+            if name not in self._files or self._files[name].content != content
+        ]
+
+        state = (
+            self._allocator.copy(),
+            dict(self._files),
+            bytearray(self._fs_data),
+            set(self._modified),
+        )
+        try:
+            # Remove files first to free their chunks for the changed files
+            for name in removed:
+                self.remove(name)
+            for name in changed:
+                self._store(name, new_files[name], replaces=name)
+        except Exception:
+            self._allocator, self._files, self._fs_data, self._modified = state
+            raise
+        return removed + changed
+
+    def remove(self, filename: str) -> None:
+        """
+        Remove a file.
+
+        :param filename: Name of the file.
+        :raises FileNotFoundError: If the file does not exist.
+        """
+        entry = self._get_entry(filename)
+        del self._files[filename]
+        self._allocator.free(entry.chunks)
+        self._erase_chunks(entry.chunks)
+
+    def rename(self, filename: str, new_filename: str) -> None:
+        """
+        Rename a file.
+
+        :param filename: Current name of the file.
+        :param new_filename: New name for the file.
+        :raises FileNotFoundError: If the file does not exist.
+        :raises FileExistsError: If a file with the new name already exists.
+        :raises InvalidFileError: If the new name is invalid.
+        :raises StorageFullError: If the renamed file doesn't fit.
+        """
+        entry = self._get_entry(filename)
+        if new_filename == filename:
+            return
+        if new_filename in self._files:
+            raise FileExistsError(f"File already exists: {new_filename}")
+        # The name is stored in the first chunk, so the file is written again
+        self._store(new_filename, entry.content, replaces=filename)
+
+    def to_hex(self) -> str:
+        """
+        Generate the hex file with the current filesystem.
+
+        Only the filesystem records are encoded, the firmware records are
+        reused from the loaded hex.
+
+        :returns: Intel Hex file content as a string.
+        """
+        return self._split.join(self._fs_image())
+
+    def page_delta(self) -> list[tuple[int, bytes]]:
+        """
+        Get the flash pages that differ from the loaded hex file.
+
+        Only these pages need to be written to a board already flashed with
+        the loaded hex to update its filesystem, for example with partial
+        flashing.
+
+        :returns: List of (page_address, page_bytes) tuples, sorted by
+            address, with the full content of each flash page.
+        """
+        page_size = self.device_info.flash_page_size
+        fs = self._fs_image()
+        pages = self._loaded_pages[: self._fs_start - self._pages_start] + fs.gets(
+            self._fs_start, self._fs_end - self._fs_start
+        )
+        delta: list[tuple[int, bytes]] = []
+        for offset in range(0, len(pages), page_size):
+            page = pages[offset : offset + page_size]
+            if page != self._loaded_pages[offset : offset + page_size]:
+                delta.append((self._pages_start + offset, page))
+        return delta
+
+    def _fs_image(self) -> HexImage:
+        """Create a HexImage with the current filesystem region data."""
+        fs = HexImage()
+        for address, data in self._unmodified_segments():
+            fs.puts(address, data)
+        for first, last in self._chunk_runs(
+            i for i in self._modified if not self._allocator.is_free(i)
+        ):
+            offset = (first - 1) * CHUNK_SIZE
+            fs.puts(
+                chunk_index_to_address(first, self._fs_start),
+                self._fs_data[offset : last * CHUNK_SIZE],
+            )
+        if self._modified:
+            set_persistent_page(fs, self.device_info)
+        return fs
+
+    def _get_entry(self, filename: str) -> FileEntry:
+        entry = self._files.get(filename)
+        if entry is None:
+            raise FileNotFoundError(f"File not found: {filename}")
+        return entry
+
+    def _store(self, filename: str, content: bytes, replaces: str) -> None:
+        """Write a file in place of another (or the same) file, if it exists."""
+        allocator = self._allocator.copy()
+        replaced = self._files.get(replaces)
+        if replaced is not None:
+            allocator.free(replaced.chunks)
+        chunks = build_file_chunks(filename, content, allocator)
+
+        # The new chunks have been built, so the filesystem can be modified
+        self._allocator = allocator
+        if replaced is not None:
+            del self._files[replaces]
+            self._erase_chunks(replaced.chunks)
+        for chunk_index, chunk_data in chunks:
+            offset = (chunk_index - 1) * CHUNK_SIZE
+            self._fs_data[offset : offset + CHUNK_SIZE] = chunk_data
+            self._modified.add(chunk_index)
+        self._files[filename] = FileEntry([i for i, _ in chunks], content)
+
+    def _erase_chunks(self, chunks: list[int]) -> None:
+        for chunk_index in chunks:
+            offset = (chunk_index - 1) * CHUNK_SIZE
+            self._fs_data[offset : offset + CHUNK_SIZE] = b"\xff" * CHUNK_SIZE
+            self._modified.add(chunk_index)
+
+    @staticmethod
+    def _chunk_runs(chunks: Iterable[int]) -> list[tuple[int, int]]:
+        """Group chunk indices into (first, last) runs of consecutive chunks."""
+        runs: list[tuple[int, int]] = []
+        for chunk_index in sorted(chunks):
+            if runs and runs[-1][1] + 1 == chunk_index:
+                runs[-1] = (runs[-1][0], chunk_index)
+            else:
+                runs.append((chunk_index, chunk_index))
+        return runs
+
+    def _unmodified_segments(self) -> list[tuple[int, bytes]]:
+        """Return the loaded filesystem region data outside modified chunks."""
+        excluded = [
+            (
+                chunk_index_to_address(first, self._fs_start),
+                chunk_index_to_address(last + 1, self._fs_start),
+            )
+            for first, last in self._chunk_runs(self._modified)
+        ]
+        segments: list[tuple[int, bytes]] = []
+        for address, data in self._fs_segments:
+            start, end = address, address + len(data)
+            for excluded_start, excluded_end in excluded:
+                if excluded_end <= start or excluded_start >= end:
+                    continue
+                if start < excluded_start:
+                    segments.append(
+                        (start, data[start - address : excluded_start - address])
+                    )
+                start = max(start, excluded_end)
+            if start < end:
+                segments.append((start, data[start - address :]))
+        return segments
@@ -15,14 +15,12 @@ https://microbit-micropython.readthedocs.io/en/latest/devguide/hexformat.html
 
 from __future__ import annotations
 
-from intelhex import IntelHex
+import struct
+from typing import NamedTuple
 
 from micropython_microbit_fs.device_info import DEVICE_SPECS, DeviceInfo
-from micropython_microbit_fs.hex_utils import (
-    read_string,
-    read_uint16,
-    read_uint32,
-)
+from micropython_microbit_fs.hex_image import HexReader
+from micropython_microbit_fs.hex_utils import read_string
 
 # UICR addresses
 UICR_START = 0x10001000
@@ -30,7 +28,14 @@ UICR_CUSTOMER_OFFSET = 0x80
 UICR_CUSTOMER_UPY_OFFSET = 0x40
 UICR_UPY_START = UICR_START + UICR_CUSTOMER_OFFSET + UICR_CUSTOMER_UPY_OFFSET
 
-# UICR field addresses
+UICR_UPY_SIZE = 28
+"""Size of the MicroPython UICR data, from UICR_UPY_START."""
+
+UICR_UPY_LAYOUT = struct.Struct("<IIIHHIII")
+"""MicroPython UICR fields in address order: magic value, end marker, page
+size (log2), start page, pages used, delimiter, version string address and
+flash regions terminator."""
+# UICR field addresses, the fields of UICR_UPY_LAYOUT
 UicrAddress = {
     "MAGIC": UICR_UPY_START + 0,  # 4 bytes - Magic value,
     "END_MARKER": UICR_UPY_START + 4,  # 4 bytes - End marker
@@ -43,36 +48,56 @@ UicrAddress = {
 }
 
 
-def get_device_info_from_uicr(ih: IntelHex) -> DeviceInfo | None:
+class UicrData(NamedTuple):
+    """MicroPython data stored in the UICR."""
+
+    magic: int
+    end_marker: int
+    page_size_log2: int
+    start_page: int
+    pages_used: int
+    delimiter: int
+    version_address: int
+    regions_terminator: int
+
+
+def read_uicr_data(ih: HexReader) -> UicrData:
+    """
+    Read all the MicroPython UICR fields with a single read.
+
+    :param ih: HexImage or HexIndex object containing the hex data.
+    :returns: UicrData with the field values, 0xFF filled if not present.
+    """
+    data = ih.gets(UICR_UPY_START, UICR_UPY_SIZE)
+    return UicrData._make(UICR_UPY_LAYOUT.unpack(data))
+
+
+def get_device_info_from_uicr(ih: HexReader) -> DeviceInfo | None:
     """
-    Extract DeviceInfo from UICR data in an IntelHex object.
+    Extract DeviceInfo from UICR data in a HexImage or HexIndex object.
 
-    :param ih: IntelHex object containing the hex data.
+    :param ih: HexImage or HexIndex object containing the hex data.
     :returns: DeviceInfo if valid MicroPython UICR data is found, None otherwise.
     """
-    magic = read_uint32(ih, UicrAddress["MAGIC"])
-    page_size_log2 = read_uint32(ih, UicrAddress["PAGE_SIZE"])
-    start_page = read_uint16(ih, UicrAddress["START_PAGE"])
-    pages_used = read_uint16(ih, UicrAddress["PAGES_USED"])
-    version_address = read_uint32(ih, UicrAddress["VERSION_LOC"])
+    uicr = read_uicr_data(ih)
 
     for device in DEVICE_SPECS.values():
-        if device.uicr_magic == magic:
+        if device.uicr_magic == uicr.magic:
             device_spec = device
             break
     else:
         # Unknown magic value
         return None
 
-    page_size = 2**page_size_log2
+    page_size = 2**uicr.page_size_log2
     flash_size = device_spec.flash_size
-    flash_start = start_page * page_size
+    flash_start = uicr.start_page * page_size
     flash_end = flash_start + device_spec.flash_size
     runtime_start = flash_start
-    runtime_end = pages_used * page_size
+    runtime_end = uicr.pages_used * page_size
     fs_start = runtime_end
     fs_end = device_spec.fs_end_address
-    version = read_string(ih, version_address)
+    version = read_string(ih, uicr.version_address)
     device_version = device_spec.device_version
 
     return DeviceInfo(
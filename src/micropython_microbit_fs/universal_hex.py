@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Universal Hex files for the micro:bit V1 and V2.
+
+A Universal Hex contains the Intel Hex records for several boards. The
+records of each board are grouped in sections, starting with an Extended
+Linear Address record followed by a Block Start record with the board ID,
+and ending with a Block End record:
+
+```
+:020000040000FA          Extended Linear Address
+:0400000A9900C0DEBB      Block Start (board ID 0x9900, micro:bit V1)
+:10000000...             Data records
+:0000000BF5              Block End, its data is padding
+:020000040000FA
+:0400000A9903C0DEB8      Block Start (board ID 0x9903, micro:bit V2)
+:1000000D...             Custom Data records
+:0000000BF5
+:00000001FF              End Of File
+```
+
+The V1 data uses standard Data records, so that older V1 DAPLink versions
+can flash the V1 section, and other boards use Custom Data records, which
+are ignored by older interface firmware. The "blocks" format splits the
+board data into 512 byte blocks instead of a single section per board, and
+is also read by split_universal_hex().
+"""
+
+from __future__ import annotations
+
+import binascii
+
+from micropython_microbit_fs.exceptions import InvalidHexError
+from micropython_microbit_fs.hex_image import (
+    END_OF_FILE_RECORD,
+    HexData,
+    RecordType,
+    _decode_record,
+    encode_record,
+    hex_data_to_text,
+)
+
+
+class UniversalRecordType:
+    """Intel Hex record types added by the Universal Hex format."""
+
+    BLOCK_START = 0x0A
+    """Start of a board block or section, with the board ID as data."""
+
+    BLOCK_END = 0x0B
+    """End of a board block or section, with padding data."""
+
+    PADDED_DATA = 0x0C
+    """Padding data to align a block or section, ignored."""
+
+    CUSTOM_DATA = 0x0D
+    """Data records for boards other than the micro:bit V1."""
+
+    OTHER_DATA = 0x0E
+    """Data not written to the board flash, ignored."""
+
+
+V1_BOARD_ID = 0x9900
+"""DAPLink board ID of the micro:bit V1."""
+
+V2_BOARD_ID = 0x9903
+"""DAPLink board ID of the micro:bit V2."""
+
+V1_BOARD_IDS = (0x9900, 0x9901)
+"""All the micro:bit V1 board ID revisions, their sections use Data records."""
+
+_BLOCK_START_SUFFIX = b"\xc0\xde"
+"""Last two bytes of the Block Start record data."""
+
+_SECTION_ALIGNMENT = 512
+"""Sections are padded to a multiple of this number of characters."""
+
+_PADDING_RECORD_SIZE = 16
+"""Minimum data size of the padding records, larger if the hex records are."""
+
+
+def is_universal_hex(hex_data: HexData) -> bool:
+    """
+    Check if the hex data is a Universal Hex.
+
+    Only the first records are checked, the Block Start record is always the
+    first or second record.
+
+    :param hex_data: Intel Hex file content as a string or ASCII bytes.
+    :returns: True if the hex data starts with a Universal Hex section.
+    """
+    text = hex_data_to_text(hex_data[:64])
+    return any(line[7:9] == "0A" for line in text.splitlines()[:2])
+
+
+def split_universal_hex(hex_data: HexData) -> dict[int, str]:
+    """
+    Split a Universal Hex into an Intel Hex file for each board.
+
+    The records are processed in a single pass, Custom Data records are
+    converted to Data records and the Universal Hex specific records are
+    dropped.
+
+    :param hex_data: Universal Hex file content as a string or ASCII bytes.
+    :returns: Dictionary mapping the board IDs to their Intel Hex content, in
+        the order the boards appear in the Universal Hex.
+    :raises InvalidHexError: If the data is not a valid Universal Hex.
+    """
+    text = hex_data_to_text(hex_data)
+    newline = "\r\n" if "\r\n" in text[:1024] else "\n"
+    boards: dict[int, list[str]] = {}
+    # Records of the current board, and the last extended address in each
+    board_lines: list[str] = []
+    last_address: dict[int, str] = {}
+    board_id = -1
+    pending_address = ""
+
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        if not line:
+            continue
+        record_type = _record_type(line, line_number)
+        if record_type in (RecordType.DATA, UniversalRecordType.CUSTOM_DATA):
+            if board_id < 0:
+                raise InvalidHexError(
+                    f"Line {line_number}: Data record before a Block Start record"
+                )
+            if pending_address:
+                _add_address(board_lines, last_address, board_id, pending_address)
+                pending_address = ""
+            if record_type == RecordType.DATA:
+                board_lines.append(line)
+            else:
+                record = _decode_record(line, line_number)
+                board_lines.append(
+                    encode_record(
+                        RecordType.DATA, record[1] << 8 | record[2], record[4:-1]
+                    )
+                )
+        elif record_type == RecordType.EXTENDED_LINEAR_ADDRESS:
+            # Usually the first record of a block, before the Block Start
+            _decode_record(line, line_number)
+            pending_address = line
+        elif record_type == UniversalRecordType.BLOCK_START:
+            record = _decode_record(line, line_number)
+            if record[0] != 4 or record[6:8] != _BLOCK_START_SUFFIX:
+                raise InvalidHexError(f"Line {line_number}: Invalid Block Start record")
+            board_id = record[4] << 8 | record[5]
+            board_lines = boards.setdefault(board_id, [])
+            if pending_address:
+                _add_address(board_lines, last_address, board_id, pending_address)
+                pending_address = ""
+        elif record_type == RecordType.END_OF_FILE:
+            break
+        elif record_type in (
+            UniversalRecordType.BLOCK_END,
+            UniversalRecordType.PADDED_DATA,
+            UniversalRecordType.OTHER_DATA,
+        ):
+            continue
+        elif board_id >= 0 and record_type in (
+            RecordType.EXTENDED_SEGMENT_ADDRESS,
+            RecordType.START_SEGMENT_ADDRESS,
+            RecordType.START_LINEAR_ADDRESS,
+        ):
+            board_lines.append(line)
+        else:
+            _decode_record(line, line_number)
+            raise InvalidHexError(
+                f"Line {line_number}: Unexpected record type 0x{record_type:02X}"
+            )
+
+    if not boards:
+        raise InvalidHexError("Universal Hex does not contain any Block Start record")
+    return {
+        board: newline.join(lines + [END_OF_FILE_RECORD, ""])
+        for board, lines in boards.items()
+    }
+
+
+def _record_type(line: str, line_number: int) -> int:
+    """Get the record type of a line, only validating the record header."""
+    if line[0] == ":" and len(line) >= 11:
+        try:
+            return binascii.unhexlify(line[1:9])[3]
+        except (binascii.Error, ValueError):
+            pass
+    # Raises the error for the invalid record
+    _decode_record(line, line_number)
+    raise InvalidHexError(f"Line {line_number}: Invalid record")
+
+
+def _add_address(
+    board_lines: list[str], last_address: dict[int, str], board_id: int, line: str
+) -> None:
+    """Add an Extended Linear Address record, unless it's already in effect."""
+    if last_address.get(board_id) != line:
+        board_lines.append(line)
+        last_address[board_id] = line
+
+
+def create_universal_hex(hexes: list[tuple[int, HexData]]) -> str:
+    """
+    Combine Intel Hex files for different boards into a Universal Hex.
+
+    Each hex file becomes a section, padded to a multiple of 512 characters.
+
+    :param hexes: List of (board_id, hex_data) tuples, the V1 hex should be
+        first so that older V1 DAPLink versions can flash it.
+    :returns: Universal Hex file content.
+    :raises InvalidHexError: If a hex file contains invalid records.
+    """
+    newline = "\n"
+    sections: list[str] = []
+    for board_id, hex_data in hexes:
+        lines = hex_data_to_text(hex_data).splitlines()
+        # The section starts with the extended address of its first record
+        address_record = encode_record(RecordType.EXTENDED_LINEAR_ADDRESS, 0, b"\0\0")
+        first_line = 1
+        if lines and lines[0][7:9] == "04":
+            address_record = lines.pop(0)
+            _decode_record(address_record, 1)
+            first_line = 2
+        section = [
+            address_record,
+            encode_record(
+                UniversalRecordType.BLOCK_START,
+                0,
+                board_id.to_bytes(2, "big") + _BLOCK_START_SUFFIX,
+            ),
+        ]
+        data_type = (
+            RecordType.DATA
+            if board_id in V1_BOARD_IDS
+            else UniversalRecordType.CUSTOM_DATA
+        )
+        padding_size = _PADDING_RECORD_SIZE
+        for line_number, line in enumerate(lines, start=first_line):
+            if not line:
+                continue
+            record = _decode_record(line, line_number)
+            record_type = record[3]
+            if record_type == RecordType.END_OF_FILE:
+                break
+            if record_type == RecordType.DATA:
+                padding_size = max(padding_size, record[0])
+                if data_type != RecordType.DATA:
+                    line = encode_record(
+                        data_type, record[1] << 8 | record[2], record[4:-1]
+                    )
+            section.append(line)
+        sections.append(_pad_section(section, newline, padding_size))
+    return "".join(sections) + END_OF_FILE_RECORD + newline
+
+
+def _pad_section(lines: list[str], newline: str, padding_size: int) -> str:
+    """
+    Join the section lines, with padding records to align it.
+
+    The padding uses Padded Data records no longer than the section Data
+    records (DAPLink reads the records into a small buffer), and the
+    remaining characters go into the Block End record.
+    """
+    # A record with n data bytes takes 11 + 2n characters plus the new line
+    empty_record = 11 + len(newline)
+    # The Block End record is always added, so it's counted from the start
+    size = sum(len(line) + len(newline) for line in lines) + empty_record
+    padding = -size % _SECTION_ALIGNMENT
+    padding_records = []
+    while padding > padding_size * 2:
+        data_size = min(padding_size, (padding - empty_record) // 2)
+        padding_records.append(
+            encode_record(UniversalRecordType.PADDED_DATA, 0, b"\xff" * data_size)
+        )
+        padding -= empty_record + data_size * 2
+    padding_records.append(
+        encode_record(UniversalRecordType.BLOCK_END, 0, b"\xff" * (padding // 2))
+    )
+    return newline.join(lines + padding_records + [""])
@@ -40,3 +40,20 @@ def makecode_hex() -> str:
     """Load the MakeCode hex file (non-MicroPython)."""
     hex_path = FIXTURES_DIR / "makecode.hex"
     return hex_path.read_text()
+
+
+UPY_HEX_FILES = ["upy-v1.0.1.hex", "upy-v2-beta-uicr.hex", "upy-v2-beta-region.hex"]
+
+
+@pytest.fixture(scope="session", params=UPY_HEX_FILES)
+def upy_hex(request: pytest.FixtureRequest) -> str:
+    """Load each of the MicroPython hex files."""
+    hex_path: Path = FIXTURES_DIR / request.param
+    return hex_path.read_text()
+
+
+@pytest.fixture(scope="session", params=[*UPY_HEX_FILES, "makecode.hex"])
+def any_hex(request: pytest.FixtureRequest) -> str:
+    """Load each of the MicroPython hex files and the MakeCode hex file."""
+    hex_path: Path = FIXTURES_DIR / request.param
+    return hex_path.read_text()
@@ -1,13 +1,27 @@
 """Tests for the add_files function."""
 
+import mmap
+from pathlib import Path
+
 import pytest
 
 from micropython_microbit_fs import (
     File,
     InvalidFileError,
+    InvalidHexError,
+    NotMicroPythonError,
     add_files,
+    add_files_bytes,
+    add_files_from_path,
+    get_device_info,
+    get_device_info_from_path,
     get_files,
+    get_files_from_path,
 )
+from micropython_microbit_fs.exceptions import StorageFullError
+from micropython_microbit_fs.filesystem import add_files_to_hex
+from micropython_microbit_fs.firmware import load_firmware
+from micropython_microbit_fs.hex_image import HexImage
 from micropython_microbit_fs.hex_utils import hex_to_string, load_hex
 
 
@@ -145,6 +159,78 @@ class TestAddFilesErrors:
         with pytest.raises(InvalidFileError, match="Duplicate file name"):
             add_files(upy_v1_hex, files)
 
+    def test_storage_full_leaves_hex_unmodified(self, upy_v1_hex: str) -> None:
+        """If a file doesn't fit, none of the files should be written."""
+        ih, device_info = load_firmware(upy_v1_hex)
+        files = {"small.py": b"a = 1", "big.bin": b"\x00" * 100_000}
+        with pytest.raises(StorageFullError):
+            add_files_to_hex(ih, device_info, files)
+        assert hex_to_string(ih) == upy_v1_hex
+
+
+class TestAddFilesBytes:
+    """Tests for bytes and buffer input and output."""
+
+    def test_bytes_output_matches_string(self, upy_v2_region_hex: str) -> None:
+        """add_files_bytes should return the add_files output as ASCII bytes."""
+        files = [File.from_text("main.py", "print('Hello')")]
+        hex_bytes = upy_v2_region_hex.encode("ascii")
+
+        result = add_files_bytes(hex_bytes, files)
+        assert isinstance(result, bytes)
+        assert result == add_files(upy_v2_region_hex, files).encode("ascii")
+        assert add_files(memoryview(hex_bytes), files) == result.decode("ascii")
+
+    @pytest.mark.parametrize("preserve_records", [True, False])
+    def test_image_bytes_output(self, upy_v1_hex: str, preserve_records: bool) -> None:
+        """Images should encode the same records as bytes and as a string."""
+        image = HexImage.from_string(upy_v1_hex)
+        image.puts(0x3C900, b"\x01\x02")
+
+        assert image.to_bytes(preserve_records) == image.to_string(
+            preserve_records
+        ).encode("ascii")
+
+    def test_mmap_input(self, fixtures_dir: Path, upy_v1_hex: str) -> None:
+        """A memory-mapped hex file should be accepted by all functions."""
+        hex_path = fixtures_dir / "upy-v1.0.1.hex"
+        with hex_path.open("rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            assert get_device_info(mm) == get_device_info(upy_v1_hex)
+            assert get_files(mm) == []
+            mm.close()
+
+    def test_non_ascii_bytes(self) -> None:
+        """Non-ASCII bytes should raise InvalidHexError."""
+        with pytest.raises(InvalidHexError):
+            add_files_bytes(b":00000001FF\n\xff", [])
+
+
+class TestAddFilesFromPath:
+    """Tests for the path based functions."""
+
+    def test_path_functions_match_string_functions(
+        self, tmp_path: Path, upy_v2_uicr_hex: str
+    ) -> None:
+        """The path functions should give the same results as with a string."""
+        files = [File.from_text("main.py", "print('Hello')")]
+        hex_path = tmp_path / "micropython.hex"
+        hex_path.write_text(upy_v2_uicr_hex)
+
+        new_hex = add_files_from_path(hex_path, files)
+        assert new_hex == add_files(upy_v2_uicr_hex, files)
+        assert get_device_info_from_path(str(hex_path)) == get_device_info(new_hex)
+
+        hex_path.write_text(new_hex)
+        assert get_files_from_path(hex_path) == files
+
+    def test_empty_file(self, tmp_path: Path) -> None:
+        """An empty file should raise NotMicroPythonError, like an empty string."""
+        hex_path = tmp_path / "empty.hex"
+        hex_path.write_bytes(b"")
+        with pytest.raises(NotMicroPythonError):
+            get_files_from_path(hex_path)
+
 
 class TestContentBoundaries:
     """Tests for content size boundary conditions."""
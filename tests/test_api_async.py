@@ -0,0 +1,96 @@
+"""Tests for the asyncio API functions."""
+
+import asyncio
+from collections.abc import AsyncIterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from micropython_microbit_fs import (
+    File,
+    FirmwareCache,
+    add_files,
+    add_files_async,
+    get_device_info,
+    get_device_info_async,
+    get_files,
+    get_files_async,
+)
+from micropython_microbit_fs.exceptions import StorageFullError
+
+
+async def _file_source(files: list[File]) -> AsyncIterator[File]:
+    for file in files:
+        await asyncio.sleep(0)
+        yield file
+
+
+class TestAsyncApi:
+    """Tests for the async variants of the API functions."""
+
+    def test_add_files_async_list(self, upy_v1_hex: str) -> None:
+        """The result should match add_files."""
+        files = [File("main.py", b"print('async')")]
+        new_hex = asyncio.run(add_files_async(upy_v1_hex, files))
+        assert new_hex == add_files(upy_v1_hex, files)
+
+    def test_add_files_async_iterable(self, upy_v2_region_hex: str) -> None:
+        """Files from an async iterable should be added."""
+        files = [File("a.py", b"a"), File("b.py", b"b")]
+        new_hex = asyncio.run(add_files_async(upy_v2_region_hex, _file_source(files)))
+        assert get_files(new_hex) == files
+
+    def test_get_files_async_cache(self, upy_v1_hex: str) -> None:
+        """The cache should be used from the executor threads."""
+        hex_data = add_files(upy_v1_hex, [File("a.py", b"a")])
+        cache = FirmwareCache()
+
+        async def read_concurrently() -> list[list[File]]:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                return await asyncio.gather(
+                    *(get_files_async(hex_data, cache, executor) for _ in range(3))
+                )
+
+        results = asyncio.run(read_concurrently())
+        assert results == [[File("a.py", b"a")]] * 3
+        assert cache.hits + cache.misses == 3
+
+    def test_process_executor(self, upy_v2_uicr_hex: str) -> None:
+        """The work should run in a process pool executor."""
+
+        async def run() -> object:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                return await get_device_info_async(upy_v2_uicr_hex, executor=executor)
+
+        assert asyncio.run(run()) == get_device_info(upy_v2_uicr_hex)
+
+    def test_process_executor_with_cache(self, upy_v1_hex: str) -> None:
+        """A cache should be sent empty to the process pool executor."""
+        cache = FirmwareCache()
+        cache.get(upy_v1_hex)
+        files = [File("main.py", b"print('process')")]
+
+        async def run() -> str:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                return await add_files_async(upy_v1_hex, files, cache, executor)
+
+        assert asyncio.run(run()) == add_files(upy_v1_hex, files)
+        assert (cache.hits, cache.misses) == (0, 1)
+
+    def test_errors_are_raised(self, upy_v1_hex: str) -> None:
+        """Errors from the executor should be raised by the coroutine."""
+        files = [File("big.bin", b"x" * 100_000)]
+        with pytest.raises(StorageFullError):
+            asyncio.run(add_files_async(upy_v1_hex, files))
+
+    def test_cancellation(self, upy_v1_hex: str) -> None:
+        """Cancelling the task should raise CancelledError in the caller."""
+
+        async def cancel() -> None:
+            task = asyncio.create_task(get_files_async(upy_v1_hex))
+            await asyncio.sleep(0)
+            task.cancel()
+            await task
+
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(cancel())
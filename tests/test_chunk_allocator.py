@@ -0,0 +1,74 @@
+"""Tests for the filesystem chunk allocator."""
+
+import pytest
+
+from micropython_microbit_fs import File, add_files
+from micropython_microbit_fs.exceptions import StorageFullError
+from micropython_microbit_fs.filesystem import ChunkAllocator, get_chunk_count
+from micropython_microbit_fs.firmware import load_firmware
+
+
+class TestChunkAllocator:
+    """Tests for the ChunkAllocator class."""
+
+    def test_allocate_lowest_first(self) -> None:
+        """Chunks should be allocated in ascending order from the lowest."""
+        allocator = ChunkAllocator(10, [2, 3, 5, 8, 9])
+        assert allocator.allocate(2) == [2, 3]
+        assert allocator.allocate(2) == [5, 8]
+        assert allocator.free_count == 1
+        assert allocator.used_count == 9
+
+    def test_free_chunks_are_reused(self) -> None:
+        """Freed chunks should be allocated again, lowest first."""
+        allocator = ChunkAllocator(10, range(1, 11))
+        allocator.allocate(6)
+        allocator.free([2, 4])
+        assert allocator.is_free(2)
+        assert not allocator.is_free(3)
+        assert allocator.allocate(3) == [2, 4, 7]
+
+    def test_free_twice_counts_once(self) -> None:
+        """Freeing an already free chunk should not change the free count."""
+        allocator = ChunkAllocator(4, [1])
+        allocator.free([1, 2, 2])
+        assert allocator.free_count == 2
+
+    def test_free_invalid_index(self) -> None:
+        """Freeing an index outside the filesystem should raise ValueError."""
+        allocator = ChunkAllocator(4, [])
+        with pytest.raises(ValueError):
+            allocator.free([5])
+
+    def test_storage_full(self) -> None:
+        """Allocating more chunks than free should raise and allocate nothing."""
+        allocator = ChunkAllocator(4, [1, 2])
+        with pytest.raises(StorageFullError):
+            allocator.allocate(3)
+        assert allocator.free_count == 2
+
+    def test_fragmentation(self) -> None:
+        """Fragmentation should measure the free chunks outside the longest run."""
+        assert ChunkAllocator(8, range(1, 9)).fragmentation == 0.0
+        assert ChunkAllocator(8, []).fragmentation == 0.0
+
+        allocator = ChunkAllocator(8, [1, 2, 3, 5, 7, 8])
+        assert allocator.largest_free_run == 3
+        assert allocator.fragmentation == pytest.approx(0.5)
+
+    def test_copy_is_independent(self) -> None:
+        """Allocating from a copy should not change the original."""
+        allocator = ChunkAllocator(4, [1, 2, 3, 4])
+        allocator.copy().allocate(2)
+        assert allocator.free_count == 4
+
+    def test_from_hex(self, upy_v1_hex: str) -> None:
+        """Chunks used by files in the hex should not be free."""
+        hex_data = add_files(upy_v1_hex, [File("a.bin", b"\x01" * 200)])
+        ih, device_info = load_firmware(hex_data)
+
+        allocator = ChunkAllocator.from_hex(ih, device_info)
+        assert allocator.chunk_count == get_chunk_count(device_info)
+        assert allocator.used_count == 2
+        assert not allocator.is_free(1)
+        assert allocator.allocate(1) == [3]
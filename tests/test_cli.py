@@ -46,6 +46,27 @@ class TestInfoCommand:
         captured = capsys.readouterr()
         assert "Device: micro:bit V2" in captured.out
 
+    @pytest.mark.parametrize("latest", ["latest", "Latest"])
+    @pytest.mark.parametrize("device_version", [1, 2])
+    def test_info_bundled_hex(
+        self, device_version: int, latest: str, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """Info command should show the bundled hex information."""
+        try:
+            app(["info", f"--v{device_version}={latest}"])
+        except SystemExit as e:
+            assert e.code == 0
+
+        captured = capsys.readouterr()
+        assert f"Device: micro:bit V{device_version}" in captured.out
+        assert "Filesystem size:" in captured.out
+
+    def test_info_requires_single_source(self) -> None:
+        """Info command should fail without a hex file or bundled version."""
+        with pytest.raises(SystemExit) as exc_info:
+            app(["info"])
+        assert "Error" in str(exc_info.value.code)
+
 
 class TestListCommand:
     """Tests for the list command."""
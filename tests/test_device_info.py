@@ -2,8 +2,31 @@
 
 import pytest
 
-from micropython_microbit_fs import DeviceVersion, get_device_info
+from micropython_microbit_fs import DeviceVersion, FirmwareCache, get_device_info
+from micropython_microbit_fs.device_info import DEVICE_SPECS
 from micropython_microbit_fs.exceptions import InvalidHexError, NotMicroPythonError
+from micropython_microbit_fs.flash_regions import (
+    HEADER_LAYOUT,
+    HEADER_SIZE,
+    OFFSET_MAGIC_1,
+    ROW_LAYOUT,
+    ROW_OFFSET_ID,
+    ROW_SIZE,
+    FlashRegionId,
+    _find_table_header,
+    _read_region_rows,
+)
+from micropython_microbit_fs.hex_image import HexImage
+from micropython_microbit_fs.hex_index import HexIndex
+from micropython_microbit_fs.hex_utils import read_uint16, read_uint32
+from micropython_microbit_fs.uicr import (
+    UICR_UPY_LAYOUT,
+    UICR_UPY_SIZE,
+    UICR_UPY_START,
+    UicrAddress,
+    read_uicr_data,
+)
+from micropython_microbit_fs.universal_hex import create_universal_hex
 
 
 class TestGetDeviceInfoV1:
@@ -169,6 +192,89 @@ class TestGetDeviceInfoV2FlashRegions:
         assert info.micropython_version == expected_micropython_versions
 
 
+class TestFindTableHeader:
+    """Tests for locating the Flash Regions Table header."""
+
+    def test_table_in_sparse_image(self, upy_v2_region_hex: str) -> None:
+        """The table should be found between segments far apart."""
+        image = HexImage.from_string(upy_v2_region_hex)
+        header = _find_table_header(image, 4096)
+        assert header is not None
+
+        sparse = HexImage()
+        sparse.puts(0, b"\x00" * 16)
+        sparse.puts(
+            header.end_address - 4096, image.gets(header.end_address - 4096, 4096)
+        )
+        sparse.puts(0x10001014, b"\x00" * 8)
+        assert _find_table_header(sparse, 4096) == header
+
+    def test_result_follows_changes(self, upy_v2_region_hex: str) -> None:
+        """Modifying the image should change the header found."""
+        image = HexImage.from_string(upy_v2_region_hex)
+        header = _find_table_header(image, 4096)
+        assert header is not None
+
+        moved = image.gets(header.start_address, 16)
+        image.puts(header.start_address, b"\xff" * 16)
+        assert _find_table_header(image, 4096) is None
+
+        image.puts(0x7F000 - 16, moved)
+        moved_header = _find_table_header(image, 4096)
+        assert moved_header is not None
+        assert moved_header.end_address == 0x7F000
+
+    def test_lazy_index_reads_few_blocks(self, upy_v2_region_hex: str) -> None:
+        """Only the blocks of the pages read should be indexed."""
+        index = HexIndex(upy_v2_region_hex)
+        header = _find_table_header(index, 4096)
+
+        assert header == _find_table_header(
+            HexImage.from_string(upy_v2_region_hex), 4096
+        )
+        assert len(index._indexes) < len(index._blocks) // 2
+
+
+class TestTableDecoding:
+    """Tests for decoding the UICR and Flash Regions Table fields."""
+
+    def test_layout_sizes(self) -> None:
+        """The struct layouts should match the table and UICR sizes."""
+        assert HEADER_LAYOUT.size == HEADER_SIZE == OFFSET_MAGIC_1
+        assert ROW_LAYOUT.size == ROW_SIZE == ROW_OFFSET_ID
+        assert UICR_UPY_LAYOUT.size == UICR_UPY_SIZE
+
+    def test_uicr_fields(self, upy_v1_hex: str) -> None:
+        """The UICR fields should match reading each address."""
+        image = HexImage.from_string(upy_v1_hex)
+        uicr = read_uicr_data(image)
+
+        assert uicr.magic == DEVICE_SPECS[DeviceVersion.V1].uicr_magic
+        assert uicr.magic == read_uint32(image, UicrAddress["MAGIC"])
+        assert uicr.page_size_log2 == read_uint32(image, UicrAddress["PAGE_SIZE"])
+        assert uicr.start_page == read_uint16(image, UicrAddress["START_PAGE"])
+        assert uicr.pages_used == read_uint16(image, UicrAddress["PAGES_USED"])
+        assert uicr.version_address == read_uint32(image, UicrAddress["VERSION_LOC"])
+        assert UicrAddress["MAGIC"] == UICR_UPY_START
+        assert UicrAddress["REG_TERMINATOR"] + 4 == UICR_UPY_START + UICR_UPY_SIZE
+
+    def test_region_rows(self, upy_v2_region_hex: str) -> None:
+        """All the region rows should be decoded, last row in memory first."""
+        image = HexImage.from_string(upy_v2_region_hex)
+        header = _find_table_header(image, 4096)
+        assert header is not None
+
+        rows = _read_region_rows(image, header)
+
+        assert [row.id for row in rows] == [
+            FlashRegionId.FILESYSTEM,
+            FlashRegionId.MICROPYTHON,
+            FlashRegionId.SOFTDEVICE,
+        ]
+        assert rows[0].start_page * header.page_size == 0x6D000
+        assert rows[1].hash_pointer_data.startswith("micro:bit v2.0.99")
+
+
 class TestGetDeviceInfoErrors:
     """Tests for error handling in device detection."""
 
@@ -182,10 +288,23 @@ class TestGetDeviceInfoErrors:
         with pytest.raises((NotMicroPythonError, ValueError)):
             get_device_info("")
 
-    def test_invalid_hex_raises_error(self) -> None:
-        """Invalid hex data should raise an error."""
-        with pytest.raises((InvalidHexError, NotMicroPythonError, ValueError)):
-            get_device_info("not a valid hex file")
+    @pytest.mark.parametrize("hex_data", ["not a valid hex file", ":zz", ":0000"])
+    def test_invalid_hex_raises_error(self, hex_data: str) -> None:
+        """Invalid hex data should raise InvalidHexError, like get_files."""
+        with pytest.raises(InvalidHexError, match="Line 1"):
+            get_device_info(hex_data)
+
+    def test_universal_hex_cache_and_no_cache(
+        self, upy_v1_hex: str, upy_v2_region_hex: str
+    ) -> None:
+        """A Universal Hex should raise the same error with and without cache."""
+        universal_hex = create_universal_hex(
+            [(0x9900, upy_v1_hex), (0x9903, upy_v2_region_hex)]
+        )
+        with pytest.raises(InvalidHexError, match="Unsupported record type 0x0A") as e:
+            get_device_info(universal_hex, cache=FirmwareCache())
+        with pytest.raises(InvalidHexError, match=str(e.value)):
+            get_device_info(universal_hex)
 
     def test_minimal_valid_hex_raises_not_micropython(self) -> None:
         """A minimal valid Intel Hex without MicroPython should raise error."""
@@ -0,0 +1,260 @@
+"""Tests for the firmware loading and caching."""
+
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from micropython_microbit_fs import (
+    File,
+    FirmwareCache,
+    FirmwareTemplate,
+    InvalidHexError,
+    add_files,
+    add_files_batch,
+    get_device_info,
+    get_files,
+)
+from micropython_microbit_fs.exceptions import StorageFullError
+from micropython_microbit_fs.firmware import (
+    load_firmware,
+    load_firmware_image,
+    save_firmware_image,
+)
+
+
+class TestFirmwareCache:
+    """Tests for the FirmwareCache class."""
+
+    def test_cache_hit(self, upy_v1_hex: str) -> None:
+        """The second lookup of the same hex should not parse it again."""
+        cache = FirmwareCache()
+        ih_1, info_1 = cache.get(upy_v1_hex)
+        ih_2, info_2 = cache.get(upy_v1_hex)
+
+        assert cache.misses == 1
+        assert cache.hits == 1
+        assert info_1 == info_2
+        assert ih_1 is not ih_2
+
+    def test_lru_eviction(
+        self, upy_v1_hex: str, upy_v2_uicr_hex: str, upy_v2_region_hex: str
+    ) -> None:
+        """The least recently used entry should be evicted when full."""
+        cache = FirmwareCache(max_size=2)
+        cache.get(upy_v1_hex)
+        cache.get(upy_v2_uicr_hex)
+        cache.get(upy_v1_hex)
+        cache.get(upy_v2_region_hex)
+        assert len(cache) == 2
+        assert cache.misses == 3
+
+        # V1 was used more recently than V2 UICR, so it's still cached
+        cache.get(upy_v1_hex)
+        assert cache.misses == 3
+        cache.get(upy_v2_uicr_hex)
+        assert cache.misses == 4
+
+    def test_copies_are_independent(self, upy_v1_hex: str) -> None:
+        """Modifying a returned image should not change the cached firmware."""
+        cache = FirmwareCache()
+        ih_1, info = cache.get(upy_v1_hex)
+        ih_1[info.fs_start_address] = 0xFE
+        ih_1[0] = 0x12
+
+        ih_2, _ = cache.get(upy_v1_hex)
+        assert ih_2[info.fs_start_address] == 0xFF
+        assert ih_2[0] == 0x00
+
+    def test_invalid_hex_not_cached(self) -> None:
+        """Invalid hex data should raise and not be stored."""
+        cache = FirmwareCache()
+        with pytest.raises(InvalidHexError):
+            cache.get("not a valid hex file")
+        assert len(cache) == 0
+
+    def test_invalid_max_size(self) -> None:
+        """A cache must be able to hold at least one entry."""
+        with pytest.raises(ValueError):
+            FirmwareCache(max_size=0)
+
+    def test_clear(self, upy_v1_hex: str) -> None:
+        """Clearing the cache should remove all entries."""
+        cache = FirmwareCache()
+        cache.get(upy_v1_hex)
+        cache.clear()
+        assert len(cache) == 0
+
+    def test_pickle_empty(self, upy_v1_hex: str) -> None:
+        """A pickled cache should only keep its maximum size."""
+        cache = FirmwareCache(max_size=2)
+        cache.get(upy_v1_hex)
+
+        data = pickle.dumps(cache)
+        cache_copy = pickle.loads(data)
+
+        assert len(data) < 1000
+        assert len(cache_copy) == 0
+        assert cache_copy.max_size == 2
+        assert cache_copy.get(upy_v1_hex)[1] == get_device_info(upy_v1_hex)
+        assert (cache_copy.hits, cache_copy.misses) == (0, 1)
+        assert len(cache) == 1
+
+
+class TestApiWithCache:
+    """Tests for the API functions using a FirmwareCache."""
+
+    def test_add_files_with_cache(self, upy_v2_region_hex: str) -> None:
+        """Cached and uncached add_files should produce the same hex."""
+        cache = FirmwareCache()
+        files_1 = [File.from_text("main.py", "print('one')")]
+        files_2 = [File.from_text("main.py", "print('two')")]
+
+        result_1 = add_files(upy_v2_region_hex, files_1, cache=cache)
+        result_2 = add_files(upy_v2_region_hex, files_2, cache=cache)
+
+        assert result_1 == add_files(upy_v2_region_hex, files_1)
+        assert result_2 == add_files(upy_v2_region_hex, files_2)
+        assert cache.misses == 1
+        assert cache.hits == 1
+
+    def test_get_files_and_info_with_cache(self, upy_v1_hex: str) -> None:
+        """get_files and get_device_info should share the cached firmware."""
+        cache = FirmwareCache()
+        hex_with_file = add_files(upy_v1_hex, [File.from_text("a.py", "a = 1")])
+
+        files = get_files(hex_with_file, cache=cache)
+        info = get_device_info(hex_with_file, cache=cache)
+
+        assert [f.name for f in files] == ["a.py"]
+        assert info == get_device_info(hex_with_file)
+        assert cache.misses == 1
+        assert cache.hits == 1
+
+
+class TestFirmwareTemplate:
+    """Tests for the FirmwareTemplate class."""
+
+    def test_render_matches_add_files(self, upy_hex: str) -> None:
+        """Rendered hex should be identical to the add_files output."""
+        files = [
+            File.from_text("main.py", "from microbit import *\n" * 40),
+            File.from_text("b.py", "b = 2"),
+        ]
+        template = FirmwareTemplate(upy_hex)
+        assert template.render(files) == add_files(upy_hex, files)
+        assert template.render([]) == add_files(upy_hex, [])
+
+    def test_renders_are_independent(self, upy_v2_region_hex: str) -> None:
+        """Each render should only contain its own files."""
+        template = FirmwareTemplate(upy_v2_region_hex)
+        hex_1 = template.render([File.from_text("one.py", "1")])
+        hex_2 = template.render([File.from_text("two.py", "2")])
+
+        assert [f.name for f in get_files(hex_1)] == ["one.py"]
+        assert [f.name for f in get_files(hex_2)] == ["two.py"]
+
+    def test_render_with_existing_files(self, upy_v1_hex: str) -> None:
+        """Files already in the template firmware should be kept."""
+        hex_with_file = add_files(upy_v1_hex, [File.from_text("a.py", "a = 1")])
+        template = FirmwareTemplate(hex_with_file)
+        new_files = [File.from_text("b.py", "b = 2")]
+
+        new_hex = template.render(new_files)
+        assert new_hex == add_files(hex_with_file, new_files)
+        assert [f.name for f in get_files(new_hex)] == ["a.py", "b.py"]
+
+    def test_render_storage_full(self, upy_v2_region_hex: str) -> None:
+        """Files that don't fit should raise and not affect later renders."""
+        template = FirmwareTemplate(upy_v2_region_hex)
+        with pytest.raises(StorageFullError):
+            template.render([File("big.bin", b"\x00" * 100_000)])
+        assert get_files(template.render([])) == []
+
+
+class TestAddFilesBatch:
+    """Tests for generating many hex files from the same firmware."""
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_matches_add_files(self, upy_v2_region_hex: str, workers: int) -> None:
+        """Each hex should match add_files, in the same order as the inputs."""
+        file_lists = [
+            [File("main.py", f"print({i})".encode() * (i * 10 + 1))] for i in range(5)
+        ]
+        new_hexes = add_files_batch(upy_v2_region_hex, file_lists, workers=workers)
+        assert new_hexes == [add_files(upy_v2_region_hex, f) for f in file_lists]
+
+    def test_storage_full(self, upy_v1_hex: str) -> None:
+        """Errors in a worker process should be raised."""
+        file_lists = [[File("a.py", b"a")], [File("big.bin", b"x" * 100_000)]]
+        with pytest.raises(StorageFullError):
+            add_files_batch(upy_v1_hex, file_lists, workers=2)
+
+
+class TestFirmwareImage:
+    """Tests for saving and loading parsed firmware as a binary image."""
+
+    def test_round_trip(self, upy_hex: str, tmp_path: Path) -> None:
+        """A loaded image should have the same data as the parsed hex."""
+        ih, device_info = load_firmware(upy_hex)
+        save_firmware_image(tmp_path / "fw.bin", ih, device_info)
+
+        loaded, loaded_info = load_firmware_image(tmp_path / "fw.bin")
+
+        assert loaded_info == device_info
+        assert loaded.start_addr == ih.start_addr
+        assert loaded.segments() == ih.segments()
+        for start, end in ih.segments():
+            assert loaded.gets(start, end - start) == ih.gets(start, end - start)
+        files = [File("main.py", b"print('image')")]
+        assert get_files(add_files(loaded.to_string(), files)) == files
+
+    def test_source_records(self, upy_v2_region_hex: str, tmp_path: Path) -> None:
+        """With the source hex, the records should be written back verbatim."""
+        image_path = tmp_path / "fw.bin"
+        save_firmware_image(image_path, *load_firmware(upy_v2_region_hex), "a" * 64)
+
+        loaded, info = load_firmware_image(image_path, "a" * 64, upy_v2_region_hex)
+
+        assert loaded.to_string() == upy_v2_region_hex
+        files = [File("main.py", b"print('image')")]
+        template = FirmwareTemplate.from_image(loaded, info)
+        assert template.render(files) == add_files(upy_v2_region_hex, files)
+
+    def test_invalid_image(self, upy_v1_hex: str, tmp_path: Path) -> None:
+        """Truncated or unrelated files should raise InvalidHexError."""
+        image_path = tmp_path / "fw.bin"
+        save_firmware_image(image_path, *load_firmware(upy_v1_hex))
+        image_path.write_bytes(image_path.read_bytes()[:-1])
+        with pytest.raises(InvalidHexError, match="Invalid firmware image"):
+            load_firmware_image(image_path)
+
+        image_path.write_text(upy_v1_hex)
+        with pytest.raises(InvalidHexError, match="Invalid firmware image"):
+            load_firmware_image(image_path)
+
+    def test_sha256_mismatch(self, upy_v1_hex: str, tmp_path: Path) -> None:
+        """An image saved from another hex file should raise InvalidHexError."""
+        image_path = tmp_path / "fw.bin"
+        save_firmware_image(image_path, *load_firmware(upy_v1_hex), "a" * 64)
+
+        assert load_firmware_image(image_path, "a" * 64)[0].segments()
+        with pytest.raises(InvalidHexError, match="different hex file"):
+            load_firmware_image(image_path, "b" * 64)
+
+    def test_concurrent_saves(self, upy_v1_hex: str, tmp_path: Path) -> None:
+        """Threads saving the same image should not share a temporary file."""
+        image_path = tmp_path / "fw.bin"
+        ih, device_info = load_firmware(upy_v1_hex)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [
+                executor.submit(save_firmware_image, image_path, ih, device_info)
+                for _ in range(16)
+            ]
+            for future in futures:
+                future.result()
+
+        assert [p.name for p in tmp_path.iterdir()] == ["fw.bin"]
+        assert load_firmware_image(image_path)[0].segments() == ih.segments()
@@ -0,0 +1,56 @@
+"""Tests for reading and writing the filesystem region as a raw image."""
+
+import pytest
+
+from micropython_microbit_fs import (
+    File,
+    FilesystemError,
+    add_files,
+    get_device_info,
+    get_files,
+    get_fs_image,
+    set_fs_image,
+)
+from micropython_microbit_fs.filesystem import get_fs_end_address, get_fs_start_address
+
+
+class TestFsImage:
+    """Tests for get_fs_image and set_fs_image."""
+
+    def test_round_trip(self, upy_hex: str) -> None:
+        """An image should move the files into a clean hex file."""
+        files = [File("main.py", b"print('image')\n" * 50), File("b.txt", b"b")]
+        hex_with_files = add_files(upy_hex, files)
+
+        image = get_fs_image(hex_with_files)
+        device_info = get_device_info(upy_hex)
+        assert len(image) == (
+            get_fs_end_address(device_info) - get_fs_start_address(device_info)
+        )
+
+        new_hex = set_fs_image(upy_hex, image)
+        assert get_files(new_hex) == files
+        assert get_fs_image(new_hex) == image
+
+    def test_replaces_existing_files(self, upy_v1_hex: str) -> None:
+        """Files in the target hex should be replaced by the image files."""
+        image = get_fs_image(add_files(upy_v1_hex, [File("a.py", b"a")]))
+        hex_with_files = add_files(upy_v1_hex, [File("b.py", b"b" * 1000)])
+
+        new_hex = set_fs_image(hex_with_files, image)
+
+        assert get_files(new_hex) == [File("a.py", b"a")]
+
+    def test_empty_image(self, upy_v2_region_hex: str) -> None:
+        """An erased image should not add any records."""
+        image = get_fs_image(upy_v2_region_hex)
+        assert image == b"\xff" * len(image)
+        new_hex = set_fs_image(upy_v2_region_hex, image)
+        assert new_hex.count("\n") <= upy_v2_region_hex.count("\n")
+        assert get_files(new_hex) == []
+
+    def test_wrong_size(self, upy_v1_hex: str, upy_v2_region_hex: str) -> None:
+        """An image from an incompatible firmware should be rejected."""
+        image = get_fs_image(upy_v1_hex)
+        with pytest.raises(FilesystemError, match="doesn't match"):
+            set_fs_image(upy_v2_region_hex, image)
@@ -0,0 +1,245 @@
+"""Tests for the segment based Intel Hex parser and writer."""
+
+from io import StringIO
+
+import pytest
+from intelhex import IntelHex
+
+from micropython_microbit_fs.exceptions import InvalidHexError
+from micropython_microbit_fs.hex_image import HexImage, encode_record
+from micropython_microbit_fs.hex_utils import has_data_at
+
+SIMPLE_HEX = (
+    ":020000040003F7\n"
+    ":10C90000FE3F0E746573745F66696C655F312E70EF\n"
+    ":10C910007966726F6D206D6963726F6269742069E8\n"
+    ":00000001FF\n"
+)
+
+
+class TestParse:
+    """Tests for parsing Intel Hex records."""
+
+    def test_single_segment(self) -> None:
+        """Contiguous data records should be joined into one segment."""
+        image = HexImage.from_string(SIMPLE_HEX)
+        assert image.segments() == [(0x3C900, 0x3C920)]
+        assert image.minaddr() == 0x3C900
+        assert image.maxaddr() == 0x3C91F
+        assert image[0x3C900] == 0xFE
+        assert image[0x3C91F] == 0x69
+
+    def test_missing_address_returns_padding(self) -> None:
+        """Addresses without data should read as 0xFF."""
+        image = HexImage.from_string(SIMPLE_HEX)
+        assert image[0] == 0xFF
+        assert image[0x3C920] == 0xFF
+
+    def test_empty_hex(self) -> None:
+        """A hex with only the EOF record has no data."""
+        image = HexImage.from_string(":00000001FF\n")
+        assert image.segments() == []
+        assert image.minaddr() is None
+        assert image.maxaddr() is None
+
+    def test_start_linear_address(self, upy_v1_hex: str) -> None:
+        """Start linear address record should be stored like IntelHex."""
+        ih = IntelHex()
+        ih.loadhex(StringIO(upy_v1_hex))
+        image = HexImage.from_string(upy_v1_hex)
+        assert image.start_addr == ih.start_addr
+
+    def test_invalid_checksum(self) -> None:
+        """A record with a bad checksum should raise InvalidHexError."""
+        with pytest.raises(InvalidHexError, match="checksum"):
+            HexImage.from_string(":10C90000FE3F0E746573745F66696C655F312E70EE\n")
+
+    def test_invalid_length(self) -> None:
+        """A record with a wrong length field should raise InvalidHexError."""
+        with pytest.raises(InvalidHexError, match="length"):
+            HexImage.from_string(":11C90000FE3F0E746573745F66696C655F312E70EE\n")
+
+    def test_invalid_start_character(self) -> None:
+        """A line not starting with ':' should raise InvalidHexError."""
+        with pytest.raises(InvalidHexError, match="':'"):
+            HexImage.from_string("not a valid hex file")
+
+    def test_overlapping_data(self) -> None:
+        """Records writing the same address twice should raise InvalidHexError."""
+        record = encode_record(0x00, 0x0100, b"\x01\x02")
+        with pytest.raises(InvalidHexError, match="Overlapping"):
+            HexImage.from_string(f"{record}\n{record}\n:00000001FF\n")
+
+
+class TestWrite:
+    """Tests for serialising the image back to Intel Hex."""
+
+    def test_output_matches_intelhex(self, any_hex: str) -> None:
+        """Re-encoded output should be identical to the intelhex library output."""
+        ih = IntelHex()
+        ih.loadhex(StringIO(any_hex))
+        expected = StringIO()
+        ih.write_hex_file(expected)
+
+        image = HexImage.from_string(any_hex)
+        assert image.to_string(preserve_records=False) == expected.getvalue()
+
+    def test_unmodified_output_is_verbatim(self, any_hex: str) -> None:
+        """An unmodified image should be written back exactly as it was parsed."""
+        assert HexImage.from_string(any_hex).to_string() == any_hex
+
+    def test_only_modified_records_are_encoded(self, upy_v1_hex: str) -> None:
+        """Records outside the modified range should be kept verbatim."""
+        image = HexImage.from_string(upy_v1_hex)
+        image.puts(0x3C900, b"\x01\x02\x03")
+        image.puts(0x00108, b"\xaa")
+
+        original_lines = upy_v1_hex.splitlines()
+        output_lines = image.to_string().splitlines()
+        added = set(output_lines) - set(original_lines)
+        removed = set(original_lines) - set(output_lines)
+        assert removed == {":100100002401002098870300164B002B00D1144BCC"}
+        assert added == {
+            ":100100002401002098870300AA4B002B00D1144B38",
+            ":03C900000102032E",
+        }
+
+    def test_modified_output_data(self, upy_v2_region_hex: str) -> None:
+        """Output with modified data should contain the same data as IntelHex."""
+        image = HexImage.from_string(upy_v2_region_hex)
+        ih = IntelHex()
+        ih.loadhex(StringIO(upy_v2_region_hex))
+        writes = [(0x6D000, bytes(300)), (0x1FFF8, b"\x11" * 20), (0x10, b"\x22")]
+        for address, data in writes:
+            image.puts(address, data)
+            ih.puts(address, data)
+
+        output_ih = IntelHex()
+        output_ih.loadhex(StringIO(image.to_string()))
+        assert output_ih.todict() == ih.todict()
+
+    @pytest.mark.parametrize("source", [True, False])
+    def test_split_records_join(self, upy_v2_region_hex: str, source: bool) -> None:
+        """Joining data into split records should match writing it to the image."""
+        image = HexImage.from_string(upy_v2_region_hex)
+        if not source:
+            parsed, image = image, HexImage()
+            for start, end in parsed.segments():
+                image.puts(start, parsed.gets(start, end - start))
+        split = image.split_records(0x6D000, 0x73000)
+
+        data = HexImage()
+        data.puts(0x6D080, bytes(300))
+        data.puts(0x72C00, b"\xfd")
+        image.puts(0x6D080, bytes(300))
+        image.puts(0x72C00, b"\xfd")
+        assert split.join(data) == image.to_string()
+
+    def test_encode_record(self) -> None:
+        """Records should be encoded in uppercase with a valid checksum."""
+        assert encode_record(0x04, 0, b"\x00\x03") == ":020000040003F7"
+        assert encode_record(0x01, 0) == ":00000001FF"
+
+
+class TestModify:
+    """Tests for writing data into the image."""
+
+    def test_setitem_inside_segment(self) -> None:
+        """Writing inside a segment should not create new segments."""
+        image = HexImage.from_string(SIMPLE_HEX)
+        image[0x3C905] = 0x42
+        assert image[0x3C905] == 0x42
+        assert image.segments() == [(0x3C900, 0x3C920)]
+
+    def test_setitem_extends_segment(self) -> None:
+        """Writing right after a segment should extend it."""
+        image = HexImage.from_string(SIMPLE_HEX)
+        image[0x3C920] = 0x42
+        assert image.segments() == [(0x3C900, 0x3C921)]
+
+    def test_puts_joins_segments(self) -> None:
+        """Writing over a gap should join the surrounding segments."""
+        image = HexImage()
+        image.puts(0x00, b"\x01\x02")
+        image.puts(0x10, b"\x03\x04")
+        assert image.segments() == [(0x00, 0x02), (0x10, 0x12)]
+
+        image.puts(0x02, bytes(range(14)))
+        assert image.segments() == [(0x00, 0x12)]
+        assert image.gets(0x00, 0x12) == b"\x01\x02" + bytes(range(14)) + b"\x03\x04"
+
+    def test_gets_across_gap(self) -> None:
+        """Reading across a gap should fill it with padding."""
+        image = HexImage()
+        image.puts(0x00, b"\x01\x02")
+        image.puts(0x04, b"\x03")
+        assert image.gets(0x00, 6) == b"\x01\x02\xff\xff\x03\xff"
+
+    def test_copy_is_independent(self) -> None:
+        """Modifying a copy should not change the original image."""
+        image = HexImage.from_string(SIMPLE_HEX)
+        image_copy = image.copy()
+        image_copy[0x3C900] = 0x00
+        assert image[0x3C900] == 0xFE
+
+    def test_view_is_not_modified_by_writes(self) -> None:
+        """A view should keep the data it was created with."""
+        image = HexImage.from_string(SIMPLE_HEX)
+        view = image.view(0x3C900, 4)
+        assert view.readonly
+        assert view == image.gets(0x3C900, 4)
+
+        image[0x3C900] = 0x00
+        image.puts(0x3C920, b"\x01")
+        assert view == bytes.fromhex("FE3F0E74")
+        assert image[0x3C900] == 0x00
+
+    def test_view_across_gap(self) -> None:
+        """A view of a range without contiguous data should be padded."""
+        image = HexImage()
+        image.puts(0x00, b"\x01\x02")
+        assert image.view(0x01, 3) == b"\x02\xff\xff"
+
+
+class TestSegments:
+    """Tests for querying the address ranges with data."""
+
+    @pytest.fixture
+    def image(self) -> HexImage:
+        image = HexImage()
+        image.puts(0x10, b"\x00" * 0x10)
+        image.puts(0x40, b"\x00" * 0x10)
+        image.puts(0x10001000, b"\x00" * 4)
+        return image
+
+    def test_iter_segments(self, image: HexImage) -> None:
+        """Segments should be clipped to the requested range."""
+        assert list(image.iter_segments()) == image.segments()
+        assert list(image.iter_segments(0x18, 0x44)) == [(0x18, 0x20), (0x40, 0x44)]
+        assert list(image.iter_segments(0x20, 0x40)) == []
+        assert list(image.iter_segments(0x48)) == [
+            (0x48, 0x50),
+            (0x10001000, 0x10001004),
+        ]
+        assert list(image.iter_segments(end=0x11)) == [(0x10, 0x11)]
+
+    def test_has_data_full(self, image: HexImage) -> None:
+        """All the addresses of the range should have data."""
+        assert image.has_data(0x10)
+        assert image.has_data(0x10, 0x10)
+        assert not image.has_data(0x10, 0x11)
+        assert not image.has_data(0x20)
+        assert not image.has_data(0x18, 0x30)
+        assert image.has_data(0x10001003)
+        assert not image.has_data(0x10, 0)
+
+    def test_has_data_partial(self, image: HexImage) -> None:
+        """Any address of the range should have data."""
+        assert image.has_data(0x18, 0x30, partial=True)
+        assert image.has_data(0x00, 0x11, partial=True)
+        assert not image.has_data(0x00, 0x10, partial=True)
+        assert not image.has_data(0x20, 0x20, partial=True)
+        assert image.has_data(0x4F, 0x100, partial=True)
+        assert not image.has_data(0x50, 0x100, partial=True)
+        assert has_data_at(image, 0x18, 0x30, partial=True)
+        assert not has_data_at(image, 0x18, 0x30)
@@ -0,0 +1,105 @@
+"""Tests for the lazy Intel Hex index."""
+
+import pytest
+
+from micropython_microbit_fs.device_info import get_device_info_ih
+from micropython_microbit_fs.exceptions import InvalidHexError
+from micropython_microbit_fs.hex_image import HexImage
+from micropython_microbit_fs.hex_index import HexIndex
+from micropython_microbit_fs.hex_utils import read_string
+
+SIMPLE_HEX = (
+    ":020000040003F7\n"
+    ":10C90000FE3F0E746573745F66696C655F312E70EF\n"
+    ":10C910007966726F6D206D6963726F6269742069E8\n"
+    ":00000001FF\n"
+)
+
+
+class TestHexIndex:
+    """Tests for reading data through a HexIndex."""
+
+    def test_reads_match_hex_image(self, any_hex: str) -> None:
+        """Reads around every segment should match the fully parsed image."""
+        image = HexImage.from_string(any_hex)
+        index = HexIndex(any_hex)
+
+        assert index.minaddr() == image.minaddr()
+        assert index.maxaddr() == image.maxaddr()
+        assert index.segments() == image.segments()
+        for start, end in image.segments():
+            assert index.gets(start - 4, end - start + 8) == image.gets(
+                start - 4, end - start + 8
+            )
+            for address in (start - 1, start, end - 1, end):
+                assert index[address] == image[address]
+
+    def test_device_info_matches_hex_image(self, upy_hex: str) -> None:
+        """Device detection should give the same result as the parsed image."""
+        expected = get_device_info_ih(HexImage.from_string(upy_hex))
+        assert get_device_info_ih(HexIndex(upy_hex)) == expected
+
+    def test_unsorted_records(self) -> None:
+        """Records out of address order should be found."""
+        lines = SIMPLE_HEX.splitlines(keepends=True)
+        index = HexIndex(lines[0] + lines[2] + lines[1] + lines[3])
+        assert index[0x3C900] == 0xFE
+        assert index[0x3C91F] == 0x69
+        assert index.maxaddr() == 0x3C91F
+
+    def test_segments_of_repeated_address_blocks(self) -> None:
+        """Records of blocks with the same extended address should be merged."""
+        lines = SIMPLE_HEX.splitlines(keepends=True)
+        index = HexIndex(lines[0] + lines[2] + lines[0] + lines[1] + lines[3])
+        assert index.segments() == [(0x3C900, 0x3C920)]
+
+    def test_view(self) -> None:
+        """Views inside and across records should match the image."""
+        image = HexImage.from_string(SIMPLE_HEX)
+        index = HexIndex(SIMPLE_HEX)
+        for address, length in ((0x3C900, 16), (0x3C904, 4), (0x3C90C, 8)):
+            assert index.view(address, length) == image.view(address, length)
+
+    def test_read_string(self) -> None:
+        """Strings should end at the NUL byte or at the maximum length."""
+        image = HexImage()
+        image.puts(0x100, b"v1.0\0abc\0")
+        index = HexIndex(image.to_string())
+        assert read_string(index, 0x100) == "v1.0"
+        assert read_string(index, 0x105) == "abc"
+        assert read_string(index, 0x100, max_length=2) == "v1"
+
+    def test_empty_hex(self) -> None:
+        """A hex without data records has no addresses."""
+        index = HexIndex(":00000001FF\n")
+        assert index.minaddr() is None
+        assert index.maxaddr() is None
+        assert index[0] == 0xFF
+
+    def test_invalid_record_is_only_detected_when_read(self) -> None:
+        """Malformed records should raise when read, with their line number."""
+        hex_data = SIMPLE_HEX.replace("E8\n", "E9\n")
+        index = HexIndex(hex_data)
+        assert index[0x3C900] == 0xFE
+        with pytest.raises(InvalidHexError, match="Line 3: Invalid record checksum"):
+            index.gets(0x3C910, 16)
+
+    def test_invalid_record_header(self) -> None:
+        """Lines that are not records should raise when the block is indexed."""
+        hex_data = SIMPLE_HEX.replace(":10C910", "10C910")
+        index = HexIndex(hex_data)
+        with pytest.raises(InvalidHexError, match="Line 3: Record does not start"):
+            index.minaddr()
+
+    def test_unsupported_record_type(self) -> None:
+        """Unsupported record types should raise like the full parser."""
+        hex_data = SIMPLE_HEX.replace(":10C91000", ":10C9100A").replace("E8\n", "DE\n")
+        with pytest.raises(InvalidHexError, match="Line 3: Unsupported record type"):
+            HexImage.from_string(hex_data)
+        with pytest.raises(InvalidHexError, match="Line 3: Unsupported record type"):
+            HexIndex(hex_data).minaddr()
+
+    def test_invalid_extended_address(self) -> None:
+        """A malformed extended address record should raise when indexing."""
+        with pytest.raises(InvalidHexError, match="Line 1: Invalid record checksum"):
+            HexIndex(SIMPLE_HEX.replace("F7\n", "F8\n"))
@@ -1,11 +1,27 @@
 """Tests for the hexes module."""
 
+import dataclasses
+import hashlib
+import json
+from pathlib import Path
+
 import pytest
 
 import micropython_microbit_fs as upyfs
+from micropython_microbit_fs.firmware import (
+    load_firmware,
+    load_firmware_image,
+    save_firmware_image,
+)
 from micropython_microbit_fs.hexes import (
+    CACHE_DIR_ENV,
+    METADATA_FILENAME,
     HexNotFoundError,
+    MicroPythonHex,
+    _load_bundled_hex,
+    build_hex_metadata,
     get_bundled_hex,
+    get_cache_dir,
     list_bundled_versions,
 )
 
@@ -116,3 +132,144 @@ class TestGetBundledHex:
         result_files = upyfs.get_files(new_hex)
         assert len(result_files) == 1
         assert result_files[0].name == "main.py"
+
+
+class TestBundledHexMetadata:
+    """Tests for the precomputed bundled hex metadata."""
+
+    @pytest.mark.parametrize("device_version", [1, 2])
+    def test_metadata_matches_hex(self, device_version: int) -> None:
+        """The metadata file should be up to date with the hex file."""
+        hex_file = get_bundled_hex(device_version)
+        metadata_path = hex_file.file_path.parent / METADATA_FILENAME
+        assert metadata_path.exists()
+        assert json.loads(metadata_path.read_text()) == build_hex_metadata(
+            hex_file.content
+        )
+
+    @pytest.mark.parametrize("device_version", [1, 2])
+    def test_bundled_hex_fields(self, device_version: int) -> None:
+        """The metadata should match the parsed hex."""
+        hex_file = get_bundled_hex(device_version)
+        assert hex_file.device_info == upyfs.get_device_info(hex_file.content)
+        assert hex_file.free_chunks * 128 == (
+            upyfs.MicroPythonFilesystem(hex_file.content).free_space
+        )
+        assert hex_file.sha256 == hashlib.sha256(hex_file.content.encode()).hexdigest()
+
+
+class TestBundledHexCache:
+    """Tests for the cached bundled hex lookups."""
+
+    def test_same_object_returned(self) -> None:
+        """Repeated lookups should return the cached object."""
+        assert get_bundled_hex(2) is get_bundled_hex(2, "2.1.2")
+
+    def test_content_is_lazy(self) -> None:
+        """The hex file should only be read when the content is used."""
+        _load_bundled_hex.cache_clear()
+        hex_file = get_bundled_hex(1)
+        assert "content" not in vars(hex_file)
+        assert hex_file.content.startswith(":")
+        assert "content" in vars(hex_file)
+
+    def test_content_field(self) -> None:
+        """The content can be given, and it's not compared or shown in repr."""
+        hex_file = get_bundled_hex(1)
+        with_content = dataclasses.replace(hex_file, content=":00000001FF\n")
+
+        assert with_content.content == ":00000001FF\n"
+        assert with_content == hex_file
+        assert ":00000001FF" not in repr(with_content)
+
+    def test_positional_fields(self) -> None:
+        """The content should stay the fourth field, after device_version."""
+        hex_file = get_bundled_hex(1)
+        names = [f.name for f in dataclasses.fields(MicroPythonHex)]
+        assert names[:4] == ["file_path", "version", "device_version", "content"]
+
+        values = [getattr(hex_file, name) for name in names]
+        assert MicroPythonHex(*values).content is hex_file.content
+        assert dataclasses.replace(hex_file) == hex_file
+
+    def test_content_type(self) -> None:
+        """Content that is not a string should be rejected."""
+        hex_file = get_bundled_hex(1)
+        with pytest.raises(TypeError, match="bytes"):
+            dataclasses.replace(hex_file, content=b":00000001FF\n")  # type: ignore[arg-type]
+
+    def test_versions_list_is_a_copy(self) -> None:
+        """Modifying the returned versions should not change the index."""
+        list_bundled_versions(1)[1].clear()
+        assert list_bundled_versions(1)[1]
+
+
+class TestBundledFirmwareImage:
+    """Tests for the binary image cache of the bundled firmware."""
+
+    @pytest.fixture(autouse=True)
+    def cache_dir(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+        monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path / "cache"))
+        return tmp_path / "cache"
+
+    def test_cache_dir_env(self, cache_dir: Path) -> None:
+        """The environment variable should set the cache directory."""
+        assert get_cache_dir() == cache_dir
+
+    @pytest.mark.parametrize("device_version", [1, 2])
+    def test_image_is_created_and_reused(
+        self, device_version: int, cache_dir: Path
+    ) -> None:
+        """The first load should save the image used by later loads."""
+        hex_file = get_bundled_hex(device_version)
+        ih, device_info = hex_file.load_firmware()
+        image_path = cache_dir / f"{hex_file.sha256}.bin"
+        assert image_path.is_file()
+        assert device_info == hex_file.device_info
+
+        cached_ih, cached_info = hex_file.load_firmware()
+        assert cached_info == device_info
+        assert cached_ih.segments() == ih.segments()
+        # The hex records are written back verbatim, like a parsed hex
+        assert cached_ih.to_string() == hex_file.content
+
+    @pytest.mark.parametrize("device_version", [1, 2])
+    def test_api_uses_image(self, device_version: int, cache_dir: Path) -> None:
+        """Bundled hexes given to the API should match using their content."""
+        hex_file = get_bundled_hex(device_version)
+        files = [upyfs.File("main.py", b"print('cached')")]
+        expected = upyfs.add_files(hex_file.content, files)
+
+        assert upyfs.add_files(hex_file, files) == expected
+        assert (cache_dir / f"{hex_file.sha256}.bin").is_file()
+        assert upyfs.add_files(hex_file, files) == expected
+        assert upyfs.get_files(hex_file) == []
+        template = upyfs.FirmwareTemplate.from_image(*hex_file.load_firmware())
+        assert template.render(files) == expected
+
+    def test_invalid_image_is_replaced(self, cache_dir: Path) -> None:
+        """A corrupted image should be regenerated from the hex file."""
+        hex_file = get_bundled_hex(1)
+        cache_dir.mkdir()
+        image_path = cache_dir / f"{hex_file.sha256}.bin"
+        image_path.write_bytes(b"corrupted")
+
+        _, device_info = hex_file.load_firmware()
+
+        assert device_info == hex_file.device_info
+        assert image_path.stat().st_size > 100_000
+
+    def test_image_of_other_hex_is_replaced(self, cache_dir: Path) -> None:
+        """An image saved from a different hex file should not be used."""
+        hex_file = get_bundled_hex(1)
+        other_hex = get_bundled_hex(2)
+        cache_dir.mkdir()
+        image_path = cache_dir / f"{hex_file.sha256}.bin"
+        save_firmware_image(
+            image_path, *load_firmware(other_hex.content), other_hex.sha256
+        )
+
+        ih, device_info = hex_file.load_firmware()
+
+        assert device_info == hex_file.device_info
+        assert load_firmware_image(image_path, hex_file.sha256)[1] == device_info
@@ -0,0 +1,204 @@
+"""Tests for the editable in-memory MicroPython filesystem."""
+
+import pytest
+
+from micropython_microbit_fs import (
+    File,
+    MicroPythonFilesystem,
+    add_files,
+    get_files,
+    get_page_delta,
+    update_files,
+)
+from micropython_microbit_fs.exceptions import InvalidFileError, StorageFullError
+from micropython_microbit_fs.filesystem import get_fs_end_address
+from micropython_microbit_fs.hex_image import HexImage
+
+
+def _files_dict(hex_data: str) -> dict[str, bytes]:
+    return {file.name: file.content for file in get_files(hex_data)}
+
+
+class TestMicroPythonFilesystem:
+    """Tests for the MicroPythonFilesystem class."""
+
+    def test_unmodified_round_trip(self, upy_v1_hex: str) -> None:
+        """A loaded filesystem without changes should generate the same hex."""
+        hex_data = add_files(upy_v1_hex, [File("a.py", b"a = 1")])
+        fs = MicroPythonFilesystem(hex_data)
+        assert fs.ls() == ["a.py"]
+        assert fs.to_hex() == hex_data
+
+    def test_write_matches_add_files(self, upy_hex: str) -> None:
+        """Writing files into clean firmware should match add_files."""
+        files = [File("main.py", b"print('hi')\n" * 20), File("b.txt", b"b")]
+
+        fs = MicroPythonFilesystem(upy_hex)
+        for file in files:
+            fs.write(file.name, file.content)
+
+        assert fs.to_hex() == add_files(upy_hex, files)
+
+    def test_read_and_exists(self, upy_v1_hex: str) -> None:
+        """Files in the loaded hex should be readable."""
+        hex_data = add_files(upy_v1_hex, [File("a.py", b"a = 1")])
+        fs = MicroPythonFilesystem(hex_data)
+        assert fs.exists("a.py")
+        assert not fs.exists("b.py")
+        assert fs.read("a.py") == b"a = 1"
+        assert fs.files() == [File("a.py", b"a = 1")]
+        with pytest.raises(FileNotFoundError):
+            fs.read("b.py")
+
+    def test_overwrite_and_remove(self, upy_v1_hex: str) -> None:
+        """Replaced and removed files should be updated in the generated hex."""
+        hex_data = add_files(
+            upy_v1_hex,
+            [File("a.py", b"a" * 300), File("b.py", b"b"), File("c.py", b"c")],
+        )
+        fs = MicroPythonFilesystem(hex_data)
+        free_space = fs.free_space
+
+        fs.write("a.py", b"short")
+        fs.remove("c.py")
+        assert fs.free_space == free_space + 3 * 128
+        assert fs.ls() == ["a.py", "b.py"]
+
+        assert _files_dict(fs.to_hex()) == {"a.py": b"short", "b.py": b"b"}
+
+    def test_rename(self, upy_v1_hex: str) -> None:
+        """Renamed files should keep their content."""
+        hex_data = add_files(upy_v1_hex, [File("a.py", b"a"), File("b.py", b"b")])
+        fs = MicroPythonFilesystem(hex_data)
+
+        fs.rename("a.py", "c.py")
+        assert _files_dict(fs.to_hex()) == {"c.py": b"a", "b.py": b"b"}
+        with pytest.raises(FileExistsError):
+            fs.rename("c.py", "b.py")
+        with pytest.raises(FileNotFoundError):
+            fs.rename("a.py", "d.py")
+
+    def test_remove_missing_file(self, upy_v1_hex: str) -> None:
+        """Removing a file that doesn't exist should raise FileNotFoundError."""
+        fs = MicroPythonFilesystem(upy_v1_hex)
+        with pytest.raises(FileNotFoundError):
+            fs.remove("a.py")
+
+    def test_failed_write_leaves_filesystem_unmodified(self, upy_v1_hex: str) -> None:
+        """A file that doesn't fit should not replace the existing file."""
+        fs = MicroPythonFilesystem(upy_v1_hex)
+        fs.write("a.py", b"a")
+        free_space = fs.free_space
+
+        with pytest.raises(StorageFullError):
+            fs.write("a.py", b"a" * (free_space + 1024))
+        with pytest.raises(InvalidFileError):
+            fs.write("", b"a")
+
+        assert fs.free_space == free_space
+        assert _files_dict(fs.to_hex()) == {"a.py": b"a"}
+
+    def test_many_edits(self, upy_v2_region_hex: str) -> None:
+        """Repeated edits should reuse the freed chunks."""
+        fs = MicroPythonFilesystem(upy_v2_region_hex)
+        free_space = fs.free_space
+        for i in range(100):
+            fs.write("main.py", f"print({i})\n".encode() * (i + 1))
+        fs.remove("main.py")
+
+        assert fs.free_space == free_space
+        assert _files_dict(fs.to_hex()) == {}
+
+
+class TestSync:
+    """Tests for replacing the files of a filesystem with a new set."""
+
+    def test_only_changed_files_are_rewritten(self, upy_v1_hex: str) -> None:
+        """Unchanged files should stay in the same chunks."""
+        hex_data = add_files(
+            upy_v1_hex,
+            [File("a.py", b"a" * 300), File("b.py", b"b" * 300), File("c.py", b"c")],
+        )
+        fs = MicroPythonFilesystem(hex_data)
+        chunks = {name: fs._files[name].chunks for name in fs.ls()}
+
+        changed = fs.sync(
+            [File("b.py", b"b" * 300), File("a.py", b"A"), File("d.py", b"d")]
+        )
+
+        assert sorted(changed) == ["a.py", "c.py", "d.py"]
+        assert fs._files["b.py"].chunks == chunks["b.py"]
+        assert fs._modified.isdisjoint(chunks["b.py"])
+        assert _files_dict(fs.to_hex()) == {
+            "a.py": b"A",
+            "b.py": b"b" * 300,
+            "d.py": b"d",
+        }
+
+    def test_unchanged_files(self, upy_v1_hex: str) -> None:
+        """Syncing the same files should not modify the hex."""
+        files = [File("a.py", b"a = 1"), File("b.py", b"b = 2")]
+        hex_data = add_files(upy_v1_hex, files)
+        fs = MicroPythonFilesystem(hex_data)
+        assert fs.sync(files) == []
+        fs.write("a.py", b"a = 1")
+        assert fs.to_hex() == hex_data
+
+    def test_storage_full_leaves_filesystem_unmodified(self, upy_v1_hex: str) -> None:
+        """A sync that doesn't fit should not change any file."""
+        hex_data = add_files(upy_v1_hex, [File("a.py", b"a")])
+        fs = MicroPythonFilesystem(hex_data)
+
+        with pytest.raises(StorageFullError):
+            fs.sync([File("b.py", b"b"), File("c.py", b"c" * fs.free_space)])
+
+        assert fs.ls() == ["a.py"]
+        assert fs.to_hex() == hex_data
+
+    def test_update_files(self, upy_v2_region_hex: str) -> None:
+        """update_files should replace the files in the hex."""
+        hex_data = add_files(
+            upy_v2_region_hex, [File("a.py", b"a"), File("b.py", b"b")]
+        )
+        new_hex = update_files(hex_data, [File("b.py", b"b"), File("c.py", b"c")])
+        assert _files_dict(new_hex) == {"b.py": b"b", "c.py": b"c"}
+
+
+class TestPageDelta:
+    """Tests for the flash pages that differ from the loaded hex."""
+
+    def test_no_changes(self, upy_v1_hex: str) -> None:
+        """An unmodified filesystem should have no page delta."""
+        assert MicroPythonFilesystem(upy_v1_hex).page_delta() == []
+
+    def test_delta_matches_hex(self, upy_hex: str) -> None:
+        """Applying the page delta should give the same flash as the new hex."""
+        base_hex = add_files(
+            upy_hex,
+            [File("a.py", b"a" * 2000), File("b.py", b"b" * 2000)],
+        )
+        fs = MicroPythonFilesystem(base_hex)
+        fs.write("b.py", b"B")
+        delta = fs.page_delta()
+
+        page_size = fs.device_info.flash_page_size
+        base = HexImage.from_string(base_hex)
+        target = HexImage.from_string(fs.to_hex())
+        assert delta
+        for address, page in delta:
+            assert address % page_size == 0
+            assert len(page) == page_size
+            base.puts(address, page)
+        fs_end = get_fs_end_address(fs.device_info)
+        start = delta[0][0] - 64 * page_size
+        assert base.gets(start, fs_end - start) == target.gets(start, fs_end - start)
+
+    def test_unchanged_files_pages_not_in_delta(self, upy_v1_hex: str) -> None:
+        """Only the pages of the changed files should be in the delta."""
+        files = [File("a.py", b"a" * 5000), File("b.py", b"b")]
+        base_hex = add_files(upy_v1_hex, files)
+
+        delta = get_page_delta(base_hex, [files[0], File("b.py", b"B")])
+
+        # Only the page with the chunk of the second file
+        assert len(delta) == 1
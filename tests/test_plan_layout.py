@@ -0,0 +1,70 @@
+"""Tests for planning the filesystem layout without a hex file."""
+
+import pytest
+
+from micropython_microbit_fs import (
+    File,
+    InvalidFileError,
+    MicroPythonFilesystem,
+    add_files,
+    get_device_info,
+    plan_layout,
+)
+from micropython_microbit_fs.exceptions import StorageFullError
+from micropython_microbit_fs.filesystem import plan_file_chunks
+
+
+class TestPlanLayout:
+    """Tests for the plan_layout function."""
+
+    def test_file_chunks(self, upy_v1_hex: str) -> None:
+        """Chunk counts should match the File.size_fs of each file."""
+        files = [File("main.py", b"a" * 500), File("b.py", b"b")]
+        plan = plan_layout(get_device_info(upy_v1_hex), files)
+
+        assert plan.file_chunks == {"main.py": 5, "b.py": 1}
+        assert plan.used_chunks == 6
+        assert plan.free_bytes == MicroPythonFilesystem(upy_v1_hex).free_space - 6 * 128
+        assert plan.fits
+
+    def test_fits_matches_add_files(self, upy_hex: str) -> None:
+        """The largest file that fits according to the plan should be added."""
+        plan = plan_layout(get_device_info(upy_hex), [])
+        size = plan.chunk_count * 126 - len("big.bin") - 3
+
+        fits = [File("big.bin", b"x" * size)]
+        assert plan_layout(get_device_info(upy_hex), fits).free_chunks == 0
+        add_files(upy_hex, fits)
+
+        too_big = [File("big.bin", b"x" * (size + 1))]
+        plan = plan_layout(get_device_info(upy_hex), too_big)
+        assert not plan.fits
+        assert plan.free_chunks == -1
+        assert plan.free_bytes == 0
+        with pytest.raises(StorageFullError):
+            add_files(upy_hex, too_big)
+
+    def test_duplicate_filenames(self, upy_v1_hex: str) -> None:
+        """Duplicate filenames should raise InvalidFileError."""
+        files = [File("a.py", b"a"), File("a.py", b"b")]
+        with pytest.raises(InvalidFileError):
+            plan_layout(get_device_info(upy_v1_hex), files)
+
+    def test_invalid_files_match_add_files(self, upy_v1_hex: str) -> None:
+        """Files rejected by add_files should also be rejected by the plan."""
+        # Under 120 characters, but over 120 bytes in UTF-8
+        files = [File("\u00e9" * 100 + ".py", b"a")]
+        with pytest.raises(InvalidFileError, match="too long"):
+            add_files(upy_v1_hex, files)
+        with pytest.raises(InvalidFileError, match="too long"):
+            plan_layout(get_device_info(upy_v1_hex), files)
+
+    @pytest.mark.parametrize(
+        ("filename", "size"), [("", 1), ("a" * 121, 1), ("main.py", 0)]
+    )
+    def test_plan_file_chunks_validation(
+        self, upy_v1_hex: str, filename: str, size: int
+    ) -> None:
+        """Sizes planned without File objects should be validated."""
+        with pytest.raises(InvalidFileError):
+            plan_file_chunks(get_device_info(upy_v1_hex), {filename: size})
@@ -0,0 +1,150 @@
+"""Tests for the Universal Hex support."""
+
+import pytest
+
+from micropython_microbit_fs import (
+    File,
+    InvalidHexError,
+    add_files_universal,
+    create_universal_hex,
+    get_device_info,
+    get_files,
+    is_universal_hex,
+    split_universal_hex,
+)
+from micropython_microbit_fs.device_info import DeviceVersion
+from micropython_microbit_fs.hex_image import HexImage
+from micropython_microbit_fs.universal_hex import V1_BOARD_ID, V2_BOARD_ID
+
+# Blocks format, with records of two boards interleaved
+BLOCKS_HEX = (
+    ":020000040000FA\n"
+    ":0400000A9900C0DEBB\n"
+    ":1000000000400020218E01005D8E01005F8E010006\n"
+    ":0000000BF5\n"
+    ":020000040000FA\n"
+    ":0400000A9903C0DEB8\n"
+    ":1000000D00040020810A000015070000610A0000AD\n"
+    ":0400000CFFFFFFFFF4\n"
+    ":0000000BF5\n"
+    ":020000040001F9\n"
+    ":0400000A9900C0DEBB\n"
+    ":1000000000400020218E01005D8E01005F8E010006\n"
+    ":0000000BF5\n"
+    ":00000001FF\n"
+)
+
+
+def _files_dict(hex_data: str) -> dict[str, bytes]:
+    return {file.name: file.content for file in get_files(hex_data)}
+
+
+class TestSplitUniversalHex:
+    """Tests for splitting a Universal Hex into board hex files."""
+
+    def test_blocks_format(self) -> None:
+        """Blocks of the same board should be joined in a single hex."""
+        boards = split_universal_hex(BLOCKS_HEX)
+
+        assert list(boards) == [V1_BOARD_ID, V2_BOARD_ID]
+        v1 = HexImage.from_string(boards[V1_BOARD_ID])
+        assert v1.segments() == [(0x0, 0x10), (0x10000, 0x10010)]
+        v2 = HexImage.from_string(boards[V2_BOARD_ID])
+        assert v2.segments() == [(0x0, 0x10)]
+        assert v2.gets(0, 4) == bytes.fromhex("00040020")
+
+    def test_not_universal_hex(self, upy_v1_hex: str) -> None:
+        """A single board hex should not be split."""
+        assert not is_universal_hex(upy_v1_hex)
+        with pytest.raises(InvalidHexError):
+            split_universal_hex(upy_v1_hex)
+
+    @pytest.mark.parametrize(
+        ("line", "message"),
+        [
+            ("hello world", "Line 3: Record does not start with ':'"),
+            (":zz", "Line 3: Invalid hex characters"),
+            (":0000", "Line 3: Invalid record length"),
+            (":1000000Gxx", "Line 3: Invalid hex characters"),
+        ],
+    )
+    def test_invalid_record(self, line: str, message: str) -> None:
+        """Lines that are not records should raise InvalidHexError."""
+        lines = BLOCKS_HEX.splitlines()
+        hex_data = "\n".join(lines[:2] + [line] + lines[2:])
+        with pytest.raises(InvalidHexError, match=message):
+            split_universal_hex(hex_data)
+
+    def test_invalid_block_start(self) -> None:
+        """A Block Start record without the 0xC0DE suffix should be rejected."""
+        hex_data = BLOCKS_HEX.replace(":0400000A9903C0DEB8", ":0400000A99030000B8")
+        with pytest.raises(InvalidHexError, match="Line 6"):
+            split_universal_hex(hex_data)
+
+
+class TestCreateUniversalHex:
+    """Tests for combining board hex files into a Universal Hex."""
+
+    @pytest.fixture
+    def universal_hex(self, upy_v1_hex: str, upy_v2_region_hex: str) -> str:
+        return create_universal_hex(
+            [(V1_BOARD_ID, upy_v1_hex), (V2_BOARD_ID, upy_v2_region_hex)]
+        )
+
+    def test_round_trip(
+        self, universal_hex: str, upy_v1_hex: str, upy_v2_region_hex: str
+    ) -> None:
+        """Splitting a created Universal Hex should give the same data."""
+        assert is_universal_hex(universal_hex)
+        boards = split_universal_hex(universal_hex)
+
+        for board_id, hex_data in (
+            (V1_BOARD_ID, upy_v1_hex),
+            (V2_BOARD_ID, upy_v2_region_hex),
+        ):
+            original = HexImage.from_string(hex_data)
+            split = HexImage.from_string(boards[board_id])
+            assert split.segments() == original.segments()
+            for start, end in original.segments():
+                assert split.gets(start, end - start) == original.gets(
+                    start, end - start
+                )
+
+    def test_sections_are_aligned(self, universal_hex: str) -> None:
+        """Each section should end at a multiple of 512 characters."""
+        position = 0
+        for line in universal_hex.splitlines(keepends=True):
+            position += len(line)
+            if line.startswith(":") and line[7:9] == "0B":
+                assert position % 512 == 0
+
+    def test_padding_records_are_short(self, universal_hex: str) -> None:
+        """No record should be longer than the 16 byte Data records."""
+        sections: list[list[str]] = [[]]
+        for line in universal_hex.splitlines():
+            sections[-1].append(line)
+            if line[7:9] == "0B":
+                sections.append([])
+
+        assert len(sections) == 3
+        for section in sections[:-1]:
+            assert max(int(line[1:3], 16) for line in section) <= 16
+            assert int(section[-1][1:3], 16) <= 16
+
+    def test_v2_uses_custom_data_records(self, universal_hex: str) -> None:
+        """Only the V1 section should use standard Data records."""
+        record_types = {line[7:9] for line in universal_hex.splitlines()}
+        assert {"00", "0A", "0B", "0D"} <= record_types
+
+    def test_add_files_universal(self, universal_hex: str) -> None:
+        """Files should be added to every board section."""
+        files = [File("main.py", b"print('universal')")]
+        new_hex = add_files_universal(universal_hex, files)
+
+        boards = split_universal_hex(new_hex)
+        versions = [
+            get_device_info(board_hex).device_version for board_hex in boards.values()
+        ]
+        assert versions == [DeviceVersion.V1, DeviceVersion.V2]
+        for board_hex in boards.values():
+            assert _files_dict(board_hex) == {"main.py": b"print('universal')"}